@@ -0,0 +1,36 @@
+import signal, threading
+
+from django.core.management.base import BaseCommand
+
+from carts.services import release_expired_holds
+
+
+class Command(BaseCommand):
+    help = (
+        "Give back the stock held by cart items whose CART_HOLD_MINUTES hold "
+        "has lapsed, in batches. Runs once, or every --every seconds until stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=500, help="Holds released per transaction"
+        )
+        parser.add_argument(
+            "--every",
+            type=float,
+            default=0,
+            help="Keep sweeping, waiting this many seconds between sweeps",
+        )
+
+    def handle(self, *args, **options):
+        stopping = threading.Event()
+        if options["every"]:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *_: stopping.set())
+
+        while True:
+            released = release_expired_holds(options["batch_size"])
+            if released or not options["every"]:
+                self.stdout.write(f"Released {released} expired cart holds.")
+            if not options["every"] or stopping.wait(options["every"]):
+                break
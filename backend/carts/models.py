@@ -1,5 +1,7 @@
 import uuid
 from django.db import models
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
 from products.models import Product
 from core.models.accounts import UserAccount
 
@@ -23,6 +25,10 @@ class CartItem(models.Model):
         Product, on_delete=models.CASCADE, related_name="cart_items"
     )
     quantity = models.IntegerField(default=1)
+    # Units of the product held for this cart (Product.reserved) and when
+    # the hold lapses; `manage.py release_expired_holds` gives them back.
+    reserved = models.PositiveIntegerField(default=0)
+    reserved_until = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -31,3 +37,16 @@ class CartItem(models.Model):
 
     class Meta:
         ordering = ["-created_at", "-updated_at"]
+        indexes = [
+            models.Index(fields=["reserved_until"], name="cart_item_hold_idx"),
+        ]
+
+
+@receiver(pre_delete, sender=CartItem)
+def release_deleted_hold(sender, instance, **kwargs):
+    """Give back the stock a cart item holds however it is deleted."""
+    if instance.reserved_until is None:
+        return
+    from carts.services import release_holds
+
+    release_holds(CartItem.objects.filter(pk=instance.pk))
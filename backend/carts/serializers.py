@@ -8,6 +8,7 @@ class CartItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = CartItem
         fields = "__all__"
+        read_only_fields = ["reserved", "reserved_until"]
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
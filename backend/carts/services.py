@@ -1,27 +1,129 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
 from carts.models import Cart, CartItem
 from carts.serializers import CartSerializer, CartItemSerializer
+from products.services import hold_stock, release_stock
 
 
 def create_cart_item(data: dict):
     """
-    Create a new cart item with the provided data.
+    Create a new cart item with the provided data and hold its quantity
+    of the product for the cart.
     """
     serializer = CartItemSerializer(data=data)
-    if serializer.is_valid():
+    if not serializer.is_valid():
+        return None, serializer.errors
+    with transaction.atomic():
         cart_item = serializer.save()
-        return cart_item, None
-    return None, serializer.errors
+        errors = hold_cart_item(cart_item)
+        if errors:
+            transaction.set_rollback(True)
+            return None, errors
+    return cart_item, None
 
 
 def update_cart_item(cart_item: CartItem, data: dict):
     """
-    Update an existing cart item with the provided data.
+    Update an existing cart item with the provided data, holding more or
+    less of the product when its quantity changes.
     """
     serializer = CartItemSerializer(cart_item, data=data, partial=True)
-    if serializer.is_valid():
+    if not serializer.is_valid():
+        return None, serializer.errors
+    with transaction.atomic():
         updated_cart_item = serializer.save()
-        return updated_cart_item, None
-    return None, serializer.errors
+        errors = hold_cart_item(updated_cart_item)
+        if errors:
+            transaction.set_rollback(True)
+            return None, errors
+    return updated_cart_item, None
+
+
+def hold_cart_item(cart_item: CartItem):
+    """
+    Hold the item's quantity of its product for CART_HOLD_MINUTES, so the
+    stock check happens when it is added to the cart rather than at
+    checkout. Only the difference from what the item already holds is
+    taken or given back. Returns a list of errors.
+    """
+    with transaction.atomic():
+        # Locking the item keeps the sweeper from releasing its hold while
+        # it is being changed.
+        held = (
+            CartItem.objects.select_for_update()
+            .filter(pk=cart_item.pk)
+            .values_list("reserved", flat=True)
+            .first()
+        ) or 0
+        quantity = max(cart_item.quantity, 0)
+        if quantity > held:
+            errors = hold_stock({cart_item.product_id: quantity - held})
+            if errors:
+                return errors
+        elif quantity < held:
+            release_stock({cart_item.product_id: held - quantity})
+
+        until = timezone.now() + timedelta(minutes=settings.CART_HOLD_MINUTES)
+        CartItem.objects.filter(pk=cart_item.pk).update(reserved=quantity, reserved_until=until)
+        cart_item.reserved, cart_item.reserved_until = quantity, until
+    return []
+
+
+def release_holds(cart_items) -> int:
+    """
+    Give back the stock held by `cart_items` (a queryset, locked here).
+    Returns the number of holds released.
+    """
+    with transaction.atomic():
+        held = list(
+            cart_items.select_for_update()
+            .filter(reserved_until__isnull=False)
+            .values_list("id", "product_id", "reserved")
+        )
+        _release(held)
+    return len(held)
+
+
+def release_expired_holds(batch_size: int = 500, max_batches: int = None) -> int:
+    """
+    Give back the stock of holds that have lapsed, `batch_size` holds per
+    transaction. Cart items a checkout is working on are locked and are
+    skipped rather than waited for. Returns the number of holds released.
+    """
+    now = timezone.now()
+    released = batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            held = list(
+                CartItem.objects.select_for_update(skip_locked=True)
+                .filter(reserved_until__lt=now)
+                .order_by("reserved_until")
+                .values_list("id", "product_id", "reserved")[:batch_size]
+            )
+            if not held:
+                break
+            _release(held)
+        released += len(held)
+        batches += 1
+    return released
+
+
+def _release(held: list):
+    """Release the (cart item id, product id, units) holds of locked items."""
+    if not held:
+        return
+    CartItem.objects.filter(id__in=[item_id for item_id, *_ in held]).update(
+        reserved=0, reserved_until=None
+    )
+    quantities = Counter()
+    for _, product_id, reserved in held:
+        quantities[product_id] += reserved
+    release_stock({product_id: units for product_id, units in quantities.items() if units})
 
 
 def clear_cart(cart_id: str):
@@ -1,3 +1,103 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from carts.models import CartItem
+from carts.selectors import get_cart_by_customer
+from core.models.accounts import UserAccount
+from core.utils.testing import authenticated_client
+from orders.services import checkout
+from products.models import Product, ProductCategory
+from products.services import decrement_stock
+
+
+class CartHoldTest(TestCase):
+    def setUp(self):
+        category = ProductCategory.objects.create(name="Analgesics")
+        self.product = Product.objects.create(
+            name="Paracetamol", description="", price="5.00", stock=3, category=category
+        )
+        self.ama, self.kofi = [
+            UserAccount.objects.create_user(email=email, role="customer")
+            for email in ("ama@example.com", "kofi@example.com")
+        ]
+
+    def add(self, user, quantity):
+        return authenticated_client(user).post(
+            "/api/carts/cart-items/add/",
+            {"product": str(self.product.id), "quantity": quantity},
+            format="json",
+        )
+
+    def assertStock(self, stock, reserved):
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.reserved), (stock, reserved))
+
+    def checkout(self, user):
+        cart, _ = get_cart_by_customer(user.id)
+        items = list(CartItem.objects.filter(cart=cart).select_related("product"))
+        return checkout(cart, items, {"customer": user.id, "shipping_address": "Accra"})
+
+    def test_adding_to_a_cart_holds_stock(self):
+        self.assertEqual(self.add(self.ama, 2).status_code, 201)
+        self.assertStock(3, 2)
+
+        # Only one unit is left for everyone else.
+        self.assertEqual(self.add(self.kofi, 2).status_code, 400)
+        self.assertFalse(CartItem.objects.filter(cart__customer=self.kofi).exists())
+        _, errors = decrement_stock({self.product.id: 2})
+        self.assertEqual(errors, ["Insufficient stock for product Paracetamol"])
+
+        item = CartItem.objects.get(cart__customer=self.ama)
+        response = authenticated_client(self.ama).put(
+            f"/api/carts/cart-item/{item.id}/update/", {"quantity": 1}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertStock(3, 1)
+
+        authenticated_client(self.ama).delete(f"/api/carts/cart-item/{item.id}/delete/")
+        self.assertStock(3, 0)
+
+    def test_checkout_sells_the_hold(self):
+        self.add(self.ama, 2)
+        with CaptureQueriesContext(connection) as queries:
+            order, errors = self.checkout(self.ama)
+        self.assertIsNone(errors)
+        self.assertEqual(order.total_amount, 10)
+        self.assertStock(1, 0)
+        self.assertFalse(CartItem.objects.filter(cart__customer=self.ama).exists())
+        # The held units are sold without a conditional stock check.
+        self.assertFalse(
+            [
+                query
+                for query in queries.captured_queries
+                if query["sql"].startswith('UPDATE "products_product"') and ">=" in query["sql"]
+            ]
+        )
+
+    def test_lapsed_holds_are_released(self):
+        self.add(self.ama, 2)
+        self.add(self.kofi, 1)
+        CartItem.objects.filter(cart__customer=self.ama).update(
+            reserved_until=timezone.now() - timedelta(minutes=1)
+        )
+
+        output = StringIO()
+        call_command("release_expired_holds", stdout=output)
+        self.assertIn("Released 1 expired cart holds", output.getvalue())
+        self.assertStock(3, 1)
+        self.assertEqual(CartItem.objects.get(cart__customer=self.ama).reserved, 0)
 
-# Create your tests here.
+        # The released units went to someone else, so checking out the
+        # lapsed cart has to check the stock again and fails.
+        decrement_stock({self.product.id: 2})
+        _, errors = self.checkout(self.ama)
+        self.assertEqual(errors, ["Insufficient stock for product Paracetamol"])
+        order, errors = self.checkout(self.kofi)
+        self.assertIsNone(errors)
+        self.assertStock(0, 0)
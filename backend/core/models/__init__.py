@@ -1,2 +1,3 @@
 from core.models.accounts import UserAccount
-from core.models.profiles import Profile
\ No newline at end of file
+from core.models.profiles import Profile
+from core.models.idempotency import IdempotencyKey
@@ -0,0 +1,37 @@
+from core.models._base import *
+
+
+class IdempotencyKey(models.Model):
+    """
+    The response a request sent with an `Idempotency-Key` header produced,
+    replayed to retries of that request until `expires_at`. A row without a
+    status code belongs to a request that is still being processed.
+    """
+
+    id = models.UUIDField(
+        editable=False, unique=True, primary_key=True, default=uuid.uuid4
+    )
+    key = models.CharField(max_length=255)
+    scope = models.CharField(max_length=100)
+    # ID of the user who sent the request, blank for anonymous requests, so
+    # that one client's keys can never replay another client's responses.
+    owner = models.CharField(max_length=64, blank=True)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.scope} {self.key}"
+
+    @property
+    def completed(self):
+        return self.status_code is not None
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["scope", "owner", "key"], name="unique_idempotency_key"
+            ),
+        ]
@@ -1,3 +1,59 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from rest_framework import status, viewsets
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
 
-# Create your tests here.
+from core.models.idempotency import IdempotencyKey
+from core.utils.idempotency import idempotent
+
+
+class CountingViewSet(viewsets.ViewSet):
+    authentication_classes = []
+    calls = 0
+
+    @idempotent("tests.create")
+    def create(self, request):
+        CountingViewSet.calls += 1
+        return Response(
+            {"order": CountingViewSet.calls, "echo": request.data},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class IdempotencyKeyTest(TestCase):
+    def setUp(self):
+        CountingViewSet.calls = 0
+        self.view = CountingViewSet.as_view({"post": "create"})
+        self.factory = APIRequestFactory()
+
+    def post(self, data, key="retry-1"):
+        headers = {"HTTP_IDEMPOTENCY_KEY": key} if key else {}
+        request = self.factory.post("/orders/", data, format="json", **headers)
+        return self.view(request)
+
+    def test_retry_replays_stored_response(self):
+        first = self.post({"cart": "a"})
+        retry = self.post({"cart": "a"})
+        self.assertEqual(CountingViewSet.calls, 1)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+
+        self.post({"cart": "a"}, key="retry-2")
+        self.post({"cart": "a"}, key=None)
+        self.assertEqual(CountingViewSet.calls, 3)
+
+    def test_key_reused_for_another_request_is_rejected(self):
+        self.post({"cart": "a"})
+        response = self.post({"cart": "b"})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(CountingViewSet.calls, 1)
+
+    @override_settings(IDEMPOTENCY_WAIT_TIMEOUT=0)
+    def test_request_in_progress_is_not_run_twice(self):
+        self.post({"cart": "a"})
+        # A record without a response, as left by a request still running.
+        IdempotencyKey.objects.update(status_code=None, response=None)
+        response = self.post({"cart": "a"})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(CountingViewSet.calls, 1)
@@ -1,7 +1,7 @@
-import string, random, sys, io, os
+import string, random, io, os, mimetypes
 from io import BytesIO
 
-from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.core.files.uploadedfile import InMemoryUploadedFile, UploadedFile
 from django.http import HttpRequest
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.authentication import JWTAuthentication
@@ -70,6 +70,22 @@ def valid_uuid(uuid: str) -> bool:
         return False
 
 
+def canonical_uuid(value) -> str | None:
+    """
+    Return `value` as a UUID in canonical (lower-case, hyphenated) form, so
+    it can be compared with ids read from the database, or None when it
+    isn't a UUID string.
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        from uuid import UUID
+
+        return str(UUID(value))
+    except ValueError:
+        return None
+
+
 class InMemoryUploadedFileHandler:
 
     def __init__(self) -> None:
@@ -86,7 +102,7 @@ class InMemoryUploadedFileHandler:
             field_name="ImageField",
             name=file_name if file_name else "seal_image.png",
             content_type="PNG",
-            size=sys.getsizeof(image_buffer),
+            size=image_buffer.getbuffer().nbytes,
             charset=None,
         )
 
@@ -97,30 +113,20 @@ class InMemoryUploadedFileHandler:
 
         file_name = os.path.split(image_path)[-1]
         with open(image_path, "rb") as f:
-            image_data = f.read()
-
-            # Create a BytesIO buffer to hold the image data in memory and write to the buffer
-            buffer = BytesIO()
-            buffer.write(image_data)
+            # BytesIO shares the bytes it is created from, so the file is
+            # held in memory once rather than copied into a second buffer.
+            buffer = BytesIO(f.read())
 
-            # Create an InMemoryUploadedFile object with the buffer, file name, content type, and size
-            uploaded_image = InMemoryUploadedFile(
-                buffer, None, file_name, "image/jpeg", buffer.tell(), None
-            )
-
-            # Seek to the beginning of the buffer
-            uploaded_image.seek(0)
-
-            return uploaded_image
+        return InMemoryUploadedFile(
+            buffer, None, file_name, "image/jpeg", buffer.getbuffer().nbytes, None
+        )
 
     def from_file_path(self, file_path, file_name=None):
         """Create an InMemoryUploadedFile object from a file directory"""
         with open(file_path, "rb") as f:
-            pdf_data = f.read()
+            pdf_file_io = io.BytesIO(f.read())
 
         f_name = file_name if file_name else os.path.split(file_path)[-1]
-
-        pdf_file_io = io.BytesIO(pdf_data)
         content_type = "application/pdf"
 
         pdf_file = InMemoryUploadedFile(
@@ -128,7 +134,7 @@ class InMemoryUploadedFileHandler:
             field_name="file",
             name=f_name,
             content_type=content_type,
-            size=sys.getsizeof(pdf_data),
+            size=pdf_file_io.getbuffer().nbytes,
             charset=None,
         )
         return pdf_file
@@ -145,7 +151,68 @@ class InMemoryUploadedFileHandler:
             field_name=None,
             name=f_name,
             content_type=content_type,
-            size=sys.getsizeof(pdf_file_io),
+            size=pdf_file_io.getbuffer().nbytes,
             charset=None,
         )
         return pdf_file
+
+
+class PathUploadedFile(UploadedFile):
+    """
+    An uploaded file backed by a file on disk that belongs to the caller.
+
+    Like TemporaryUploadedFile it reports its path through
+    `temporary_file_path()`, so form validation (e.g. ImageField) opens the
+    file by path instead of reading it into memory. Unlike a temporary
+    upload the file must not be moved or deleted when it is saved.
+    """
+
+    def __init__(self, file, path, name, content_type, size, charset=None):
+        super().__init__(file, name, content_type, size, charset)
+        self.path = path
+
+    def temporary_file_path(self):
+        return self.path
+
+
+class StreamingUploadedFileHandler:
+    """
+    Wrap files that are already on disk as uploaded files without reading
+    them into memory.
+
+    Validators open the wrapped files by path and storage backends copy them
+    with `chunks()`, so saving a wrapped file streams it 64KB at a time and
+    peak memory stays flat no matter how large the scan or PDF is. Files
+    opened here are closed when the handler is used as a context manager
+    and the block exits.
+    """
+
+    def __init__(self) -> None:
+        self._opened = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for f in self._opened:
+            f.close()
+        self._opened = []
+
+    def from_path(self, file_path, file_name=None, content_type=None):
+        """Create a PathUploadedFile reading lazily from a file path"""
+        f_name = file_name if file_name else os.path.split(file_path)[-1]
+        content_type = content_type or mimetypes.guess_type(f_name)[0]
+
+        f = open(file_path, "rb")
+        self._opened.append(f)
+        return PathUploadedFile(
+            f,
+            path=file_path,
+            name=f_name,
+            content_type=content_type or "application/octet-stream",
+            size=os.fstat(f.fileno()).st_size,
+            charset=None,
+        )
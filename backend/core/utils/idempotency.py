@@ -0,0 +1,132 @@
+import functools, hashlib, json, time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from core.models.idempotency import IdempotencyKey
+
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+
+def idempotent(scope: str):
+    """
+    Make a viewset action safe to retry with an `Idempotency-Key` header.
+
+    The first request with a key runs the action and its response is stored
+    for IDEMPOTENCY_KEY_TTL_HOURS; retries with the same key get the stored
+    response back (marked with an `Idempotent-Replayed` header) without the
+    action running again. A retry that arrives while the first request is
+    still running waits up to IDEMPOTENCY_WAIT_TIMEOUT seconds for it to
+    finish. Requests without the header are handled as before.
+    """
+
+    def decorator(action):
+        @functools.wraps(action)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if not key:
+                return action(self, request, *args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return Response(
+                    {"detail": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            owner = str(request.user.pk) if request.user.is_authenticated else ""
+            fingerprint = request_fingerprint(request)
+            record, claimed = claim_key(scope, owner, key, fingerprint)
+            if not claimed:
+                return replay(record, fingerprint)
+
+            try:
+                response = action(self, request, *args, **kwargs)
+            except BaseException:
+                record.delete()
+                raise
+            if response.status_code >= 500:
+                # Server errors may be transient; let the client retry them.
+                record.delete()
+                return response
+
+            record.status_code = response.status_code
+            record.response = json.loads(JSONRenderer().render(response.data) or "null")
+            record.save(update_fields=["status_code", "response"])
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def request_fingerprint(request) -> str:
+    """Hash of what the request asks for, to catch a key reused for another request."""
+    data = request.data
+    if hasattr(data, "lists"):
+        data = dict(data.lists())
+    payload = json.dumps(
+        [request.method, request.path, data], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def claim_key(scope: str, owner: str, key: str, fingerprint: str):
+    """
+    Return the record for the key and whether this request created it (and
+    so has to do the work). Expired records, and records left behind by a
+    request that died without storing a response, are taken over.
+    """
+    now = timezone.now()
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+    while True:
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    scope=scope,
+                    owner=owner,
+                    key=key,
+                    fingerprint=fingerprint,
+                    expires_at=now + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS),
+                )
+            return record, True
+        except IntegrityError:
+            pass
+
+        record = IdempotencyKey.objects.filter(scope=scope, owner=owner, key=key).first()
+        if record is None:
+            continue
+        stale = not record.completed and record.created_at < now - timedelta(
+            seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT
+        )
+        if record.expires_at <= now or stale:
+            IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at).delete()
+            continue
+        if record.completed or record.fingerprint != fingerprint:
+            return record, False
+        if time.monotonic() >= deadline:
+            return record, False
+        # Another request with this key is still running; wait for it.
+        time.sleep(0.1)
+        now = timezone.now()
+
+
+def replay(record: IdempotencyKey, fingerprint: str) -> Response:
+    if record.fingerprint != fingerprint:
+        return Response(
+            {"detail": f"This {HEADER} was already used for a different request."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if not record.completed:
+        return Response(
+            {"detail": f"A request with this {HEADER} is still being processed."},
+            status=status.HTTP_409_CONFLICT,
+        )
+    response = Response(record.response, status=record.status_code)
+    response["Idempotent-Replayed"] = "true"
+    return response
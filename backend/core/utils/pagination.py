@@ -0,0 +1,161 @@
+import base64, binascii, json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a unique, composite ordering such as ("name", "id").
+
+    A cursor stores the ordering values of the row at the edge of the current
+    page and the next page is fetched with a range filter on those values
+    instead of an OFFSET, so reading page N costs the same as reading page 1
+    as long as the ordering is backed by a matching index.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self, ordering=("-created_at", "id"), page_size=None):
+        self.ordering = tuple(ordering)
+        self.default_page_size = page_size or settings.PAGE_SIZE
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size <= 0:
+                raise ValueError
+        except (KeyError, ValueError):
+            page_size = self.default_page_size
+        return min(page_size, settings.MAX_PAGE_SIZE)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor["r"])
+
+        queryset = queryset.order_by(*self._ordering(reverse))
+        try:
+            # A position that doesn't parse as its field's type is refused
+            # when the filter is built or when the query runs.
+            if cursor:
+                queryset = queryset.filter(self._after(cursor["p"], reverse))
+            results = list(queryset[: self.page_size + 1])
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, instance, reverse: bool):
+        position = [self._position_value(instance, field) for field in self.ordering]
+        payload = json.dumps({"p": position, "r": int(reverse)}, separators=(",", ":"))
+        encoded = base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            # Positions are encoded as strings (see _position_value).
+            if (
+                not isinstance(cursor, dict)
+                or cursor.get("r") not in (0, 1)
+                or not isinstance(cursor.get("p"), list)
+                or len(cursor["p"]) != len(self.ordering)
+                or not all(isinstance(value, str) for value in cursor["p"])
+            ):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def _ordering(self, reverse: bool):
+        if not reverse:
+            return self.ordering
+        return tuple(
+            field[1:] if field.startswith("-") else f"-{field}"
+            for field in self.ordering
+        )
+
+    def _after(self, position, reverse: bool):
+        """
+        Build the lexicographic "comes after this position" filter, e.g. for
+        ("name", "id"): name > n OR (name = n AND id > i).
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, position):
+            descending = field.startswith("-") != reverse
+            name = field.lstrip("-")
+            lookup = "lt" if descending else "gt"
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return condition
+
+    def _position_value(self, instance, field):
+        value = getattr(instance, field.lstrip("-"))
+        if hasattr(value, "isoformat"):
+            return value.isoformat()
+        return str(value)
+
+
+class RankedPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination for results that are already ranked in memory,
+    such as search hits, where an offset is a list slice rather than a scan.
+    """
+
+    def __init__(self):
+        self.default_limit = settings.PAGE_SIZE
+        self.max_limit = settings.MAX_PAGE_SIZE
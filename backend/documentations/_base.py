@@ -16,3 +16,43 @@ class UserInfoSerializer(serializers.Serializer):
     email = serializers.EmailField()
     profile = ProfileSerializer()
     account_type = serializers.CharField()
+
+
+pagination_parameters = [
+    OpenApiParameter(
+        name="cursor",
+        description="Opaque cursor taken from the `next` or `previous` link of a previous page.",
+        location=OpenApiParameter.QUERY,
+        type=OpenApiTypes.STR,
+        required=False,
+    ),
+    OpenApiParameter(
+        name="page_size",
+        description="Number of results per page, capped at the server's maximum page size.",
+        location=OpenApiParameter.QUERY,
+        type=OpenApiTypes.INT,
+        required=False,
+    ),
+]
+
+idempotency_key_parameter = OpenApiParameter(
+    name="Idempotency-Key",
+    description=(
+        "Unique key for this request, e.g. a UUID. Retrying with the same key "
+        "returns the first response instead of repeating the request."
+    ),
+    location=OpenApiParameter.HEADER,
+    type=OpenApiTypes.STR,
+    required=False,
+)
+
+
+def paginated_response(name: str, serializer: serializers.Serializer):
+    return inline_serializer(
+        name=name,
+        fields={
+            "next": serializers.URLField(allow_null=True),
+            "previous": serializers.URLField(allow_null=True),
+            "results": serializer,
+        },
+    )
@@ -28,7 +28,10 @@ list_customer_cart_items_schema = extend_schema(
 
 add_cart_item_schema = extend_schema(
     summary="Add Cart Item",
-    description="This adds a new item to the customer's cart.",
+    description="This adds a new item to the customer's cart and holds its "
+    "quantity of the product for the cart for a limited time, so checkout "
+    "can't fail for lack of stock while the hold lasts. The item is refused "
+    "when there isn't enough stock left to hold.",
     request=inline_serializer(
         name="AddCartItemRequest",
         fields={
@@ -49,7 +52,8 @@ add_cart_item_schema = extend_schema(
 
 update_cart_item_schema = extend_schema(
     summary="Update Cart Item",
-    description="This updates an existing item in the customer's cart.",
+    description="This updates an existing item in the customer's cart. A "
+    "changed quantity changes the stock held for the cart and renews the hold.",
     request=inline_serializer(
         name="UpdateCartItemRequest",
         fields={
@@ -33,6 +33,7 @@ list_customer_orders_schema = extend_schema(
 create_order_schema = extend_schema(
     summary="Create an order by customer",
     description="Create a new order for the authenticated customer",
+    parameters=[idempotency_key_parameter],
     request=inline_serializer(
         name="CreateOrderRequest",
         fields={
@@ -68,6 +69,7 @@ create_order_schema = extend_schema(
 sell_product_schema = extend_schema(
     summary="Sell a product offline",
     description="Sell products in-store",
+    parameters=[idempotency_key_parameter],
     request=inline_serializer(
         name="SellProductRequest",
         fields={
@@ -95,6 +97,65 @@ sell_product_schema = extend_schema(
     tags=["Orders"],
 )
 
+sync_offline_sales_schema = extend_schema(
+    summary="Sync offline in-store sales",
+    description="Record in-store sales a till made while it was offline. Sales "
+    "are identified by the till's client_reference, so syncing the same sales "
+    "again doesn't record them twice. Sales are taken in the order they were "
+    "made and rejected when the stock can't cover them; the result of every "
+    "sale is returned in the order sent.",
+    request=inline_serializer(
+        name="SyncOfflineSalesRequest",
+        fields={
+            "sales": serializers.ListField(
+                child=inline_serializer(
+                    name="OfflineSaleRequestData",
+                    fields={
+                        "client_reference": serializers.CharField(max_length=64),
+                        "sold_at": serializers.DateTimeField(),
+                        "products": serializers.ListField(
+                            child=inline_serializer(
+                                name="OfflineSaleProductsRequestData",
+                                fields={
+                                    "product": serializers.UUIDField(),
+                                    "quantity": serializers.IntegerField(min_value=1),
+                                },
+                            )
+                        ),
+                    },
+                )
+            ),
+        },
+        required=["sales"],
+    ),
+    responses={
+        200: inline_serializer(
+            name="SyncOfflineSalesResponse",
+            fields={
+                "created": serializers.IntegerField(),
+                "duplicate": serializers.IntegerField(),
+                "rejected": serializers.IntegerField(),
+                "results": serializers.ListField(
+                    child=inline_serializer(
+                        name="OfflineSaleResult",
+                        fields={
+                            "client_reference": serializers.CharField(),
+                            "status": serializers.ChoiceField(
+                                choices=["created", "duplicate", "rejected"]
+                            ),
+                            "order": serializers.UUIDField(allow_null=True),
+                            "errors": serializers.ListField(
+                                child=serializers.CharField()
+                            ),
+                        },
+                    )
+                ),
+            },
+        ),
+    },
+    tags=["Orders"],
+)
+
 
 list_pending_orders_schema = extend_schema(
     summary="List Pending orders",
@@ -114,6 +175,107 @@ list_processing_orders_schema = extend_schema(
     tags=["Orders"],
 )
 
+filter_orders_schema = extend_schema(
+    summary="Filter orders",
+    description=(
+        "List a page of orders, newest first, filtered by status, order type, "
+        "customer and creation date. Customers only see their own orders."
+    ),
+    parameters=[
+        OpenApiParameter(
+            name="status",
+            description="Order status; repeat to match any of several.",
+            location=OpenApiParameter.QUERY,
+            type=OpenApiTypes.STR,
+            many=True,
+            required=False,
+        ),
+        OpenApiParameter(
+            name="order_type",
+            description="`ONLINE` or `OFFLINE`; repeat to match either.",
+            location=OpenApiParameter.QUERY,
+            type=OpenApiTypes.STR,
+            many=True,
+            required=False,
+        ),
+        OpenApiParameter(
+            name="customer",
+            description="Customer user ID.",
+            location=OpenApiParameter.QUERY,
+            type=OpenApiTypes.UUID,
+            required=False,
+        ),
+        OpenApiParameter(
+            name="created_after",
+            description="Only orders created at or after this date or datetime.",
+            location=OpenApiParameter.QUERY,
+            type=OpenApiTypes.DATETIME,
+            required=False,
+        ),
+        OpenApiParameter(
+            name="created_before",
+            description="Only orders created before this date or datetime.",
+            location=OpenApiParameter.QUERY,
+            type=OpenApiTypes.DATETIME,
+            required=False,
+        ),
+        *pagination_parameters,
+    ],
+    responses={
+        200: paginated_response("OrderPage", OrderSerializer(many=True)),
+    },
+    tags=["Orders"],
+)
+
+export_orders_schema = extend_schema(
+    summary="Export orders",
+    description=(
+        "Download the orders created in a date range, oldest first, with one "
+        "row per order item, as CSV or newline-delimited JSON. The file is "
+        "streamed as it is read from the database, so any range can be "
+        "exported. Not available to customers."
+    ),
+    parameters=[
+        OpenApiParameter(
+            name="start",
+            description="Only orders created at or after this date or datetime.",
+            location=OpenApiParameter.QUERY,
+            type=OpenApiTypes.DATETIME,
+            required=False,
+        ),
+        OpenApiParameter(
+            name="end",
+            description="Only orders created before this date or datetime.",
+            location=OpenApiParameter.QUERY,
+            type=OpenApiTypes.DATETIME,
+            required=False,
+        ),
+        OpenApiParameter(
+            name="file_format",
+            description="`csv` (default) or `ndjson`.",
+            location=OpenApiParameter.QUERY,
+            type=OpenApiTypes.STR,
+            enum=["csv", "ndjson"],
+            required=False,
+        ),
+    ],
+    responses={
+        (200, "text/csv"): OpenApiTypes.STR,
+        (200, "application/x-ndjson"): OpenApiTypes.STR,
+    },
+    tags=["Orders"],
+)
+
+list_unpaid_orders_schema = extend_schema(
+    summary="List unpaid orders",
+    description="List orders whose latest payment is missing, pending or failed, newest "
+    "first. Not available to customers.",
+    responses={
+        200: OrderSerializer(many=True),
+    },
+    tags=["Orders"],
+)
+
 update_order_status_schema = extend_schema(
     summary="Update order status",
     description="Update the status of an order",
@@ -132,6 +294,60 @@ update_order_status_schema = extend_schema(
     tags=["Orders"],
 )
 
+bulk_update_order_status_schema = extend_schema(
+    summary="Update the status of many orders",
+    description="Move many orders to new statuses at once. Orders only move "
+    "along the allowed transitions (pending to processing, delivered or "
+    "cancelled; processing to pending, delivered or cancelled; delivered and "
+    "cancelled orders are final); other updates, and updates for orders that "
+    "don't exist, are rejected while the rest are applied. The items of "
+    "cancelled orders go back in stock. The result of every update is "
+    "returned in the order sent.",
+    request=inline_serializer(
+        name="BulkUpdateOrderStatusRequest",
+        fields={
+            "updates": serializers.ListField(
+                child=inline_serializer(
+                    name="OrderStatusUpdateRequestData",
+                    fields={
+                        "order": serializers.UUIDField(),
+                        "status": serializers.ChoiceField(
+                            choices=["PENDING", "PROCESSING", "DELIVERED", "CANCELLED"]
+                        ),
+                    },
+                )
+            ),
+        },
+        required=["updates"],
+    ),
+    responses={
+        200: inline_serializer(
+            name="BulkUpdateOrderStatusResponse",
+            fields={
+                "updated": serializers.IntegerField(),
+                "rejected": serializers.IntegerField(),
+                "results": serializers.ListField(
+                    child=inline_serializer(
+                        name="OrderStatusUpdateResult",
+                        fields={
+                            "order": serializers.UUIDField(),
+                            "status": serializers.ChoiceField(
+                                choices=["updated", "rejected"]
+                            ),
+                            "previous_status": serializers.CharField(),
+                            "new_status": serializers.CharField(),
+                            "errors": serializers.ListField(
+                                child=serializers.CharField()
+                            ),
+                        },
+                    )
+                ),
+            },
+        ),
+    },
+    tags=["Orders"],
+)
+
 delete_order_schema = extend_schema(
     summary="Delete an order",
     description="Delete an order",
@@ -5,6 +5,7 @@ from payments.serializers import PaymentSerializer, PaymentMethodSerializer
 initiate_payment_schema = extend_schema(
     summary="Initiate a payment for an order",
     description="Initiate a payment for a specific order using Paystack",
+    parameters=[idempotency_key_parameter],
     request=inline_serializer(
         name="InitiatePaymentRequest",
         fields={
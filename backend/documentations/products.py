@@ -3,15 +3,17 @@ from products.serializers import (
     ProductSerializer,
     ProductCategorySerializer,
     ProductImageSerializer,
+    StockMovementSerializer,
 )
 
 
 list_products_schema = extend_schema(
     summary="List Products",
-    description="This endpoint retrieves a list of all products in the system.",
+    description="This endpoint retrieves a page of products ordered by name.",
+    parameters=pagination_parameters,
     request=ProductSerializer,
     responses={
-        200: ProductSerializer(many=True),
+        200: paginated_response("ProductPage", ProductSerializer(many=True)),
     },
     tags=["Products"],
 )
@@ -37,6 +39,7 @@ create_products_schema = extend_schema(
             "description": serializers.CharField(),
             "price": serializers.DecimalField(max_digits=10, decimal_places=2),
             "stock": serializers.IntegerField(),
+            "low_stock_threshold": serializers.IntegerField(required=False),
             "category": serializers.UUIDField(),
             "product_images": serializers.ListField(child=serializers.ImageField()),
         },
@@ -59,6 +62,7 @@ update_product_schema = extend_schema(
                 max_digits=10, decimal_places=2, required=False
             ),
             "stock": serializers.IntegerField(required=False),
+            "low_stock_threshold": serializers.IntegerField(required=False),
             "category": serializers.UUIDField(required=False),
             "product_images": serializers.ListField(child=serializers.ImageField()),
         },
@@ -69,6 +73,38 @@ update_product_schema = extend_schema(
     tags=["Products"],
 )
 
+list_stock_movements_schema = extend_schema(
+    summary="List Stock Movements",
+    description="This endpoint retrieves a page of a product's stock movements "
+    "(sales, restocks, adjustments and cancellations), newest first. Movements "
+    "older than the retention period are folded into one balance movement.",
+    parameters=pagination_parameters,
+    responses={
+        200: paginated_response("StockMovementPage", StockMovementSerializer(many=True)),
+    },
+    tags=["Products"],
+)
+
+adjust_stock_schema = extend_schema(
+    summary="Adjust Stock",
+    description="This endpoint adds units to a product's stock (a restock) or "
+    "corrects it by a positive or negative quantity (an adjustment) and records "
+    "the movement. Stock can't be taken below zero.",
+    request=inline_serializer(
+        name="AdjustStockRequest",
+        fields={
+            "quantity": serializers.IntegerField(),
+            "kind": serializers.ChoiceField(choices=["RESTOCK", "ADJUSTMENT"], required=False),
+            "note": serializers.CharField(required=False),
+        },
+        required=["quantity"],
+    ),
+    responses={
+        201: StockMovementSerializer(),
+    },
+    tags=["Products"],
+)
+
 delete_product_schema = extend_schema(
     summary="Delete Product",
     description="This endpoint deletes a specific product by its ID.",
@@ -80,19 +116,120 @@ delete_product_schema = extend_schema(
 
 search_products_schema = extend_schema(
     summary="Search Products",
-    description="This endpoint searches for products based on a query string.",
+    description=(
+        "This endpoint searches products by name, brand, description and "
+        "category, tolerating misspellings. Results are ranked by relevance."
+    ),
     parameters=[
         OpenApiParameter(
             name="query",
-            description="Search query string to filter products by name.",
+            description="Search query string.",
             location=OpenApiParameter.QUERY,
             type=OpenApiTypes.STR,
             required=False,
         ),
+        OpenApiParameter(
+            name="limit",
+            description="Number of results to return per page.",
+            location=OpenApiParameter.QUERY,
+            type=OpenApiTypes.INT,
+            required=False,
+        ),
+        OpenApiParameter(
+            name="offset",
+            description="The initial index from which to return the results.",
+            location=OpenApiParameter.QUERY,
+            type=OpenApiTypes.INT,
+            required=False,
+        ),
     ],
     request=ProductSerializer,
     responses={
-        200: ProductSerializer(many=True),
+        200: inline_serializer(
+            name="ProductSearchPage",
+            fields={
+                "count": serializers.IntegerField(),
+                "next": serializers.URLField(allow_null=True),
+                "previous": serializers.URLField(allow_null=True),
+                "results": ProductSerializer(many=True),
+            },
+        ),
+    },
+    tags=["Products"],
+)
+
+
+facet_value_serializer = inline_serializer(
+    name="ProductFacetValue",
+    fields={
+        "value": serializers.CharField(),
+        "label": serializers.CharField(),
+        "count": serializers.IntegerField(),
+    },
+    many=True,
+)
+
+filter_products_schema = extend_schema(
+    summary="Filter Products",
+    description=(
+        "This endpoint retrieves a page of products matching the selected "
+        "facets, ordered by name, together with the number of products in "
+        "the catalog under every facet value. A facet can be given several "
+        "times to match any of its values."
+    ),
+    parameters=[
+        OpenApiParameter(
+            name="category",
+            description="Category ID.",
+            location=OpenApiParameter.QUERY,
+            type=OpenApiTypes.UUID,
+            many=True,
+            required=False,
+        ),
+        OpenApiParameter(
+            name="brand",
+            description="Brand name; an empty value matches products without a brand.",
+            location=OpenApiParameter.QUERY,
+            type=OpenApiTypes.STR,
+            many=True,
+            required=False,
+        ),
+        OpenApiParameter(
+            name="price",
+            description="Price band such as `10-25`, or `100+` for the top band.",
+            location=OpenApiParameter.QUERY,
+            type=OpenApiTypes.STR,
+            many=True,
+            required=False,
+        ),
+        OpenApiParameter(
+            name="availability",
+            description="`in_stock` or `out_of_stock`.",
+            location=OpenApiParameter.QUERY,
+            type=OpenApiTypes.STR,
+            many=True,
+            required=False,
+        ),
+        *pagination_parameters,
+    ],
+    responses={
+        200: inline_serializer(
+            name="ProductFilterPage",
+            fields={
+                "next": serializers.URLField(allow_null=True),
+                "previous": serializers.URLField(allow_null=True),
+                "results": ProductSerializer(many=True),
+                "facets": inline_serializer(
+                    name="ProductFacets",
+                    fields={
+                        "category": facet_value_serializer,
+                        "brand": facet_value_serializer,
+                        "price": facet_value_serializer,
+                        "availability": facet_value_serializer,
+                    },
+                ),
+            },
+        ),
     },
     tags=["Products"],
 )
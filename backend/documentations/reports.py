@@ -0,0 +1,83 @@
+from ._base import *
+from reports.serializers import (
+    CategoryReportSerializer,
+    ProductReportSerializer,
+    SalesReportSerializer,
+)
+
+
+report_parameters = [
+    OpenApiParameter(
+        name="grain",
+        description="Report per `day` (default) or per `hour`.",
+        location=OpenApiParameter.QUERY,
+        type=OpenApiTypes.STR,
+        enum=["day", "hour"],
+        required=False,
+    ),
+    OpenApiParameter(
+        name="start",
+        description="Start of the range (ISO 8601 date or datetime); defaults to 30 days before `end`.",
+        location=OpenApiParameter.QUERY,
+        type=OpenApiTypes.STR,
+        required=False,
+    ),
+    OpenApiParameter(
+        name="end",
+        description="End of the range, exclusive; defaults to now.",
+        location=OpenApiParameter.QUERY,
+        type=OpenApiTypes.STR,
+        required=False,
+    ),
+    OpenApiParameter(
+        name="order_type",
+        description="Only count ONLINE or OFFLINE orders.",
+        location=OpenApiParameter.QUERY,
+        type=OpenApiTypes.STR,
+        enum=["ONLINE", "OFFLINE"],
+        required=False,
+    ),
+]
+
+limit_parameter = OpenApiParameter(
+    name="limit",
+    description="Number of rows to return (default 50, at most 500).",
+    location=OpenApiParameter.QUERY,
+    type=OpenApiTypes.INT,
+    required=False,
+)
+
+sales_report_schema = extend_schema(
+    summary="Sales per period",
+    description="Orders, revenue and units sold per day or hour, with the split "
+    "between online and offline orders. Cancelled and deleted orders are left out.",
+    parameters=report_parameters,
+    responses={200: SalesReportSerializer(many=True)},
+    tags=["Reports"],
+)
+
+product_report_schema = extend_schema(
+    summary="Sales per product",
+    description="Best selling products over the range, by revenue.",
+    parameters=report_parameters
+    + [
+        OpenApiParameter(
+            name="category",
+            description="Only products of this category ID.",
+            location=OpenApiParameter.QUERY,
+            type=OpenApiTypes.UUID,
+            required=False,
+        ),
+        limit_parameter,
+    ],
+    responses={200: ProductReportSerializer(many=True)},
+    tags=["Reports"],
+)
+
+category_report_schema = extend_schema(
+    summary="Sales per category",
+    description="Units and revenue per product category over the range, by revenue.",
+    parameters=report_parameters + [limit_parameter],
+    responses={200: CategoryReportSerializer(many=True)},
+    tags=["Reports"],
+)
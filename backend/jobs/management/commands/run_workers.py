@@ -0,0 +1,73 @@
+import os, signal, socket, threading, time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from jobs.services import claim_jobs, purge_finished_jobs, run_job
+
+
+PURGE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs. Workers poll the jobs table and claim due "
+        "jobs with SELECT ... FOR UPDATE SKIP LOCKED, so any number of these "
+        "processes can run side by side."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=1, help="Worker threads")
+        parser.add_argument("--batch-size", type=int, default=10)
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds an idle worker waits before looking for jobs again",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once no jobs are due"
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: self.stopping.set())
+
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        threads = [
+            threading.Thread(target=self.work, args=(f"{prefix}:{n}", options))
+            for n in range(options["concurrency"])
+        ]
+        for thread in threads:
+            thread.start()
+        # Joining with a timeout keeps the main thread able to handle signals.
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(0.5)
+
+        self.stdout.write(self.style.SUCCESS("Workers stopped."))
+
+    def work(self, worker, options):
+        purged_at = None
+        try:
+            while not self.stopping.is_set():
+                jobs = claim_jobs(worker, options["batch_size"])
+                for job in jobs:
+                    started = time.perf_counter()
+                    succeeded = run_job(job)
+                    self.stdout.write(
+                        f"[{worker}] {job.name} {job.id} "
+                        f"{'done' if succeeded else job.status.lower()} in "
+                        f"{(time.perf_counter() - started) * 1000:.0f}ms"
+                    )
+                if jobs:
+                    continue
+                if options["once"]:
+                    break
+                if purged_at is None or time.monotonic() - purged_at > PURGE_INTERVAL:
+                    purge_finished_jobs()
+                    purged_at = time.monotonic()
+                self.stopping.wait(options["poll_interval"])
+        finally:
+            connection.close()
@@ -0,0 +1,158 @@
+import logging, traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from jobs.models import Job
+
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+class JobReclaimed(Exception):
+    """The job was claimed again by another worker while it was running."""
+
+
+def job(name: str):
+    """
+    Register the decorated function as the handler of jobs called `name`.
+    The job's payload is passed to it as keyword arguments.
+    """
+
+    def decorator(handler):
+        _handlers[name] = handler
+        return handler
+
+    return decorator
+
+
+def enqueue(name: str, payload: dict = None, delay: int = 0):
+    """
+    Queue the `name` job once the current transaction commits, so workers
+    never pick up work for rows that were rolled back. The payload has to be
+    JSON serializable; pass ids rather than model instances. With
+    JOBS_EAGER set the handler runs on commit in this process instead.
+    """
+    if name not in _handlers:
+        raise ValueError(f"No job handler is registered as {name}.")
+    payload = payload or {}
+
+    def create():
+        if settings.JOBS_EAGER:
+            with transaction.atomic():
+                _handlers[name](**payload)
+            return
+        Job.objects.create(
+            name=name,
+            payload=payload,
+            run_at=timezone.now() + timedelta(seconds=delay),
+        )
+
+    transaction.on_commit(create)
+
+
+def claim_jobs(worker: str, limit: int = 1) -> list:
+    """
+    Lock up to `limit` due jobs for `worker`. Rows another worker is
+    claiming at the same moment are skipped rather than waited on, and jobs
+    whose worker has held them for longer than JOB_LOCK_TIMEOUT are presumed
+    abandoned and claimed again.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    abandoned = Q(status=Job.RUNNING, locked_at__lt=stale)
+
+    with transaction.atomic():
+        Job.objects.filter(abandoned, attempts__gte=settings.JOB_MAX_ATTEMPTS).update(
+            status=Job.FAILED, locked_at=None, last_error="The worker running it stopped."
+        )
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=Job.QUEUED, run_at__lte=now) | abandoned)
+            .order_by("run_at")[:limit]
+        )
+        if not jobs:
+            return []
+        Job.objects.filter(id__in=[job.id for job in jobs]).update(
+            status=Job.RUNNING,
+            locked_at=now,
+            locked_by=worker,
+            attempts=F("attempts") + 1,
+        )
+
+    for job in jobs:
+        job.status, job.locked_at, job.locked_by = Job.RUNNING, now, worker
+        job.attempts += 1
+    return jobs
+
+
+def run_job(job: Job) -> bool:
+    """
+    Run a claimed job. A job that raises is retried after a backoff that
+    doubles with every attempt (JOB_RETRY_BACKOFF seconds, then twice that,
+    ...) until it has been tried JOB_MAX_ATTEMPTS times. Returns whether it
+    succeeded.
+    """
+    handler = _handlers.get(job.name)
+    try:
+        if handler is None:
+            raise LookupError(f"No job handler is registered as {job.name}.")
+        # The handler's writes and the job being marked done commit together,
+        # and are rolled back if the job now belongs to another worker.
+        with transaction.atomic():
+            handler(**job.payload)
+            marked = Job.objects.filter(id=job.id, locked_by=job.locked_by).update(
+                status=Job.DONE, locked_at=None, last_error=""
+            )
+            if not marked:
+                raise JobReclaimed()
+        job.status = Job.DONE
+        return True
+    except JobReclaimed:
+        logger.warning(
+            "Job %s (%s) was claimed by another worker; discarding its writes",
+            job.name,
+            job.id,
+        )
+        return False
+    except Exception:
+        logger.exception("Job %s (%s) failed", job.name, job.id)
+        error = traceback.format_exc()
+
+    if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+        job.status, run_at = Job.FAILED, job.run_at
+    else:
+        job.status, run_at = Job.QUEUED, timezone.now() + retry_delay(job.attempts)
+    Job.objects.filter(id=job.id, locked_by=job.locked_by).update(
+        status=job.status, run_at=run_at, locked_at=None, last_error=error
+    )
+    job.run_at, job.last_error = run_at, error
+    return False
+
+
+def retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1))
+
+
+def run_due_jobs(worker: str = "inline", batch_size: int = 10) -> int:
+    """Run jobs until none are due. Returns how many were run."""
+    ran = 0
+    while jobs := claim_jobs(worker, batch_size):
+        for job in jobs:
+            run_job(job)
+        ran += len(jobs)
+    return ran
+
+
+def purge_finished_jobs() -> int:
+    """Delete jobs that finished more than JOB_RETENTION_HOURS ago."""
+    cutoff = timezone.now() - timedelta(hours=settings.JOB_RETENTION_HOURS)
+    deleted, _ = Job.objects.filter(
+        status__in=[Job.DONE, Job.FAILED], updated_at__lt=cutoff
+    ).delete()
+    return deleted
@@ -0,0 +1,127 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.services import claim_jobs, enqueue, job, run_due_jobs, run_job
+
+
+calls = []
+
+
+@job("tests.record")
+def record(value):
+    calls.append(value)
+
+
+@job("tests.enqueue_record")
+def enqueue_record(value):
+    calls.append(value)
+    Job.objects.create(name="tests.record", payload={"value": value})
+
+
+@job("tests.flaky")
+def flaky(failures):
+    calls.append("try")
+    if len(calls) <= failures:
+        raise RuntimeError("Paystack timed out")
+
+
+@override_settings(JOB_MAX_ATTEMPTS=3, JOB_RETRY_BACKOFF=30, JOB_LOCK_TIMEOUT=600)
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_jobs_are_queued_when_the_transaction_commits(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            enqueue("tests.record", {"value": 1})
+            self.assertFalse(Job.objects.exists())
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+
+        self.assertEqual(run_due_jobs(), 1)
+        self.assertEqual(calls, [1])
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+        self.assertEqual(run_due_jobs(), 0)
+
+    def test_unknown_jobs_are_refused(self):
+        with self.assertRaises(ValueError):
+            enqueue("tests.missing")
+
+    def test_eager_jobs_run_on_commit(self):
+        with self.settings(JOBS_EAGER=True):
+            with self.captureOnCommitCallbacks(execute=True):
+                enqueue("tests.record", {"value": 2})
+        self.assertEqual(calls, [2])
+        self.assertFalse(Job.objects.exists())
+
+    def test_claimed_jobs_are_not_claimed_again(self):
+        Job.objects.create(name="tests.record", payload={"value": 1})
+        self.assertEqual(len(claim_jobs("worker-1", 10)), 1)
+        self.assertEqual(claim_jobs("worker-2", 10), [])
+
+    def test_failed_jobs_are_retried_with_backoff(self):
+        Job.objects.create(name="tests.flaky", payload={"failures": 5})
+        delays = []
+        for attempt in range(1, 4):
+            Job.objects.update(run_at=timezone.now())
+            (claimed,) = claim_jobs("worker-1")
+            started = timezone.now()
+            with self.assertLogs("jobs.services", "ERROR"):
+                self.assertFalse(run_job(claimed))
+            claimed.refresh_from_db()
+            self.assertEqual(claimed.attempts, attempt)
+            self.assertIn("Paystack timed out", claimed.last_error)
+            if claimed.status == Job.QUEUED:
+                delays.append(round((claimed.run_at - started).total_seconds()))
+
+        self.assertEqual(delays, [30, 60])
+        self.assertEqual(claimed.status, Job.FAILED)
+        self.assertEqual(calls, ["try"] * 3)
+
+    def test_a_retry_can_succeed(self):
+        Job.objects.create(name="tests.flaky", payload={"failures": 1})
+        with self.assertLogs("jobs.services", "ERROR"):
+            run_due_jobs()
+        self.assertEqual(Job.objects.get().status, Job.QUEUED)
+        Job.objects.update(run_at=timezone.now())
+        run_due_jobs()
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+
+    def test_abandoned_jobs_are_claimed_again(self):
+        stale = timezone.now() - timedelta(seconds=601)
+        Job.objects.create(
+            name="tests.record",
+            payload={"value": 3},
+            status=Job.RUNNING,
+            attempts=1,
+            locked_at=stale,
+            locked_by="dead-worker",
+        )
+        Job.objects.create(
+            name="tests.record",
+            payload={"value": 4},
+            status=Job.RUNNING,
+            attempts=3,
+            locked_at=stale,
+            locked_by="dead-worker",
+        )
+        self.assertEqual(run_due_jobs(), 1)
+        self.assertEqual(calls, [3])
+        self.assertEqual(
+            sorted(Job.objects.values_list("status", flat=True)), [Job.DONE, Job.FAILED]
+        )
+
+    def test_writes_of_a_reclaimed_job_are_discarded(self):
+        Job.objects.create(name="tests.enqueue_record", payload={"value": 5})
+        (claimed,) = claim_jobs("worker-1")
+        # worker-1 stalled past the lock timeout and worker-2 took the job over.
+        Job.objects.update(locked_by="worker-2")
+
+        with self.assertLogs("jobs.services", "WARNING"):
+            self.assertFalse(run_job(claimed))
+        self.assertEqual(calls, [5])
+        self.assertFalse(Job.objects.filter(name="tests.record").exists())
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.locked_by), (Job.RUNNING, "worker-2"))
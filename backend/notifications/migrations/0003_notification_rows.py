@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 13:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_alter_notification_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerNotificationRow',
+            fields=[
+                ('notification', models.OneToOneField(db_column='notification_ptr_id', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='notifications.notification')),
+            ],
+            options={
+                'db_table': 'notifications_customernotification',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesPersonNotificationRow',
+            fields=[
+                ('notification', models.OneToOneField(db_column='notification_ptr_id', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='notifications.notification')),
+            ],
+            options={
+                'db_table': 'notifications_salespersonnotification',
+                'managed': False,
+            },
+        ),
+    ]
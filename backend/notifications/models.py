@@ -53,3 +53,43 @@ class SalesPersonNotification(Notification):
 
     def __str__(self):
         return f"SalesPerson Notification: {self.get_type_display()} - {'Read' if self.read else 'Unread'}"
+
+
+class CustomerNotificationRow(models.Model):
+    """
+    The customer notification table on its own. bulk_create refuses
+    multi-table inherited models, so the child rows of notifications whose
+    Notification rows were bulk created are created through this model.
+    Deletes go through CustomerNotification, hence DO_NOTHING.
+    """
+
+    notification = models.OneToOneField(
+        Notification,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column="notification_ptr_id",
+        related_name="+",
+    )
+    customer = models.ForeignKey(
+        UserAccount, on_delete=models.DO_NOTHING, null=True, related_name="+"
+    )
+
+    class Meta:
+        managed = False
+        db_table = CustomerNotification._meta.db_table
+
+
+class SalesPersonNotificationRow(models.Model):
+    """The sales person notification table on its own; see CustomerNotificationRow."""
+
+    notification = models.OneToOneField(
+        Notification,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column="notification_ptr_id",
+        related_name="+",
+    )
+
+    class Meta:
+        managed = False
+        db_table = SalesPersonNotification._meta.db_table
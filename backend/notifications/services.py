@@ -1,7 +1,9 @@
 from notifications.models import (
     Notification,
     SalesPersonNotification,
+    SalesPersonNotificationRow,
     CustomerNotification,
+    CustomerNotificationRow,
 )
 from notifications.serializers import (
     SalesPersonNotificationSerializer,
@@ -23,3 +25,62 @@ def create_customer_notification(data: dict):
         notification = serializer.save()
         return notification, None
     return None, serializer.errors
+
+
+def bulk_create_salesperson_notifications(notifications: list):
+    """
+    Create a SalesPersonNotification for every dict of type/content in
+    `notifications` with two INSERTs instead of two per notification.
+    """
+    return bulk_create_child_notifications(
+        SalesPersonNotification, SalesPersonNotificationRow, notifications
+    )
+
+
+def bulk_create_customer_notifications(notifications: list):
+    """
+    Create a CustomerNotification for every dict of customer/type/content
+    in `notifications` with two INSERTs instead of two per notification.
+    """
+    return bulk_create_child_notifications(
+        CustomerNotification, CustomerNotificationRow, notifications, fields=["customer"]
+    )
+
+
+def bulk_create_child_notifications(model, row_model, notifications: list, fields=()):
+    # bulk_create refuses multi-table inherited models, so the Notification
+    # rows are bulk created first and the child rows, which only hold the
+    # pointer to their parent and their own `fields`, are bulk created
+    # through `row_model`, which maps the child table alone.
+    if not notifications:
+        return []
+    parents = Notification.objects.bulk_create(
+        [
+            Notification(type=notification["type"], content=notification["content"])
+            for notification in notifications
+        ]
+    )
+    fields = [model._meta.get_field(name) for name in fields]
+    row_model.objects.bulk_create(
+        [
+            row_model(
+                notification=parent,
+                **{field.attname: notification[field.name] for field in fields},
+            )
+            for parent, notification in zip(parents, notifications)
+        ]
+    )
+    children = [
+        model(
+            notification_ptr=parent,
+            **{
+                field.attname: getattr(parent, field.attname)
+                for field in Notification._meta.concrete_fields
+            },
+            **{field.attname: notification[field.name] for field in fields},
+        )
+        for parent, notification in zip(parents, notifications)
+    ]
+    for child in children:
+        child._state.adding = False
+    return children
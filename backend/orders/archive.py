@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from orders.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from payments.models import ArchivedPayment, Payment
+
+
+# Orders that can't change any more and so can be archived.
+ARCHIVED_STATUSES = ("DELIVERED", "CANCELLED")
+
+
+def archive_cutoff():
+    return timezone.now() - timedelta(days=settings.ORDER_ARCHIVE_AFTER_DAYS)
+
+
+def archive_orders(before=None, batch_size: int = 500, max_batches: int = None) -> int:
+    """
+    Move delivered and cancelled orders created before `before` (by default
+    ORDER_ARCHIVE_AFTER_DAYS ago), with their items and payments, to the
+    archive tables. Each batch is its own short transaction, and orders
+    another transaction has locked are skipped rather than waited for, so
+    the hot tables stay usable while this runs. Returns the number of
+    orders archived.
+    """
+    before = before or archive_cutoff()
+    archived = batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            ids = list(
+                Order.all_objects.select_for_update(skip_locked=True)
+                .filter(status__in=ARCHIVED_STATUSES, created_at__lt=before)
+                .order_by("created_at")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+
+            ArchivedOrder.objects.bulk_create(
+                ArchivedOrder(**row) for row in Order.all_objects.filter(id__in=ids).values()
+            )
+            ArchivedOrderItem.objects.bulk_create(
+                ArchivedOrderItem(**row)
+                for row in OrderItem.objects.filter(order_id__in=ids).values()
+            )
+            ArchivedPayment.objects.bulk_create(
+                ArchivedPayment(**row)
+                for row in Payment.objects.filter(order_id__in=ids).values()
+            )
+
+            # Deleted directly so the payment signal doesn't recompute the
+            # payment status of orders that are about to go.
+            payments = Payment.objects.filter(order_id__in=ids)
+            payments._raw_delete(payments.db)
+            items = OrderItem.objects.filter(order_id__in=ids)
+            items._raw_delete(items.db)
+            orders = Order.all_objects.filter(id__in=ids)
+            orders._raw_delete(orders.db)
+
+        archived += len(ids)
+        batches += 1
+    return archived
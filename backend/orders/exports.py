@@ -0,0 +1,76 @@
+import csv, heapq, json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from orders.models import ArchivedOrder, Order
+
+
+# Column name -> lookup, one row per order item. Orders without items get a
+# single row with empty item columns.
+EXPORT_COLUMNS = {
+    "order_id": "id",
+    "created_at": "created_at",
+    "status": "status",
+    "order_type": "order_type",
+    "payment_status": "payment_status",
+    "customer_email": "customer__email",
+    "shipping_address": "shipping_address",
+    "total_amount": "total_amount",
+    "item_id": "items__id",
+    "product_id": "items__product_id",
+    "product_name": "items__product__name",
+    "quantity": "items__quantity",
+    "amount": "items__amount",
+}
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def export_rows(start=None, end=None, chunk_size: int = 2000):
+    """
+    Flat rows of the orders created from `start` up to `end`, oldest first,
+    archived orders included. Each table is read through a database cursor
+    `chunk_size` rows at a time and the two are merged as they are read, so
+    memory use doesn't depend on the size of the range.
+    """
+    sources = []
+    for orders in (Order.objects.all(), ArchivedOrder.objects.filter(deleted_at__isnull=True)):
+        if start:
+            orders = orders.filter(created_at__gte=start)
+        if end:
+            orders = orders.filter(created_at__lt=end)
+        rows = orders.order_by("created_at", "id", "items__created_at").values_list(
+            *EXPORT_COLUMNS.values()
+        )
+        sources.append(
+            dict(zip(EXPORT_COLUMNS, row)) for row in rows.iterator(chunk_size=chunk_size)
+        )
+    return heapq.merge(*sources, key=lambda row: (row["created_at"], row["order_id"]))
+
+
+class _Line:
+    """File-like object handing back what csv.writer writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Line())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow(
+            "" if value is None else value for value in row.values()
+        )
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+def export_lines(rows, export_format: str):
+    return csv_lines(rows) if export_format == "csv" else ndjson_lines(rows)
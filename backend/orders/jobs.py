@@ -0,0 +1,75 @@
+from jobs.services import job
+from notifications.services import (
+    bulk_create_customer_notifications,
+    bulk_create_salesperson_notifications,
+    create_customer_notification,
+    create_salesperson_notification,
+)
+from orders.models import Order
+
+
+STATUS_MESSAGES = {
+    "PROCESSING": (
+        "Order #{id} is now being processed.",
+        "Your order #{id} is now being processed.",
+    ),
+    "DELIVERED": (
+        "Order #{id} has been delivered.",
+        "Your order #{id} has been delivered. Thank you for shopping with us!",
+    ),
+    "CANCELLED": (
+        "Order #{id} has been cancelled.",
+        "Your order #{id} has been cancelled. We apologize for the inconvenience.",
+    ),
+}
+
+
+@job("orders.send_order_placed_notifications")
+def send_order_placed_notifications(order_id):
+    order = Order.all_objects.select_related("customer").filter(id=order_id).first()
+    if not order:
+        return
+    create_customer_notification(
+        {
+            "customer": order.customer.id,
+            "type": "NEW_ORDER",
+            "content": f"Your order #{order.id} has been placed successfully and waiting to be processed. Thank you for shopping with us!",
+        }
+    )
+    create_salesperson_notification(
+        {
+            "type": "NEW_ORDER",
+            "content": f"A new order #{order.id} has been placed by {order.customer.email}.",
+        }
+    )
+
+
+@job("orders.send_status_notifications")
+def send_status_notifications(orders):
+    """
+    Notify the sales persons and the customers about the new statuses of
+    `orders`, a list of [order_id, status] pairs, with one bulk INSERT for
+    each kind of notification.
+    """
+    statuses = {order_id: status for order_id, status in orders if status in STATUS_MESSAGES}
+    customers = Order.all_objects.filter(id__in=list(statuses)).values_list(
+        "id", "customer_id"
+    )
+    salesperson_notifications, customer_notifications = [], []
+    for order_id, customer_id in customers:
+        salesperson_message, customer_message = STATUS_MESSAGES[statuses[str(order_id)]]
+        salesperson_notifications.append(
+            {
+                "type": "ORDER_STATUS_UPDATE",
+                "content": salesperson_message.format(id=order_id),
+            }
+        )
+        customer_notifications.append(
+            {
+                "customer": customer_id,
+                "type": "ORDER_STATUS_UPDATE",
+                "content": customer_message.format(id=order_id),
+            }
+        )
+    bulk_create_salesperson_notifications(salesperson_notifications)
+    bulk_create_customer_notifications(customer_notifications)
@@ -0,0 +1,44 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from orders.archive import archive_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Move delivered and cancelled orders older than ORDER_ARCHIVE_AFTER_DAYS, "
+        "with their items and payments, to the archive tables, in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+            help="Archive orders created more than this many days ago",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0,
+            help="Seconds to wait between batches, to leave room for other writes",
+        )
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options["days"])
+        archived = 0
+        started = time.perf_counter()
+        while batch := archive_orders(before, options["batch_size"], max_batches=1):
+            archived += batch
+            self.stdout.write(f"{archived} orders archived")
+            time.sleep(options["pause"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Archived {archived} orders in {time.perf_counter() - started:.1f}s."
+            )
+        )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from orders.models import Order
+from orders.services import refresh_payment_status
+
+
+class Command(BaseCommand):
+    help = "Copy the status of every order's latest payment onto Order.payment_status"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        ids = Order.all_objects.order_by("id").values_list("id", flat=True)
+        batch_size = options["batch_size"]
+        updated, last_id = 0, None
+        # Batches keep each UPDATE's row locks short on a busy orders table.
+        while True:
+            batch = ids.filter(id__gt=last_id) if last_id else ids
+            batch = list(batch[:batch_size])
+            if not batch:
+                break
+            updated += refresh_payment_status(Order.all_objects.filter(id__in=batch))
+            last_id = batch[-1]
+            self.stdout.write(f"{updated} orders updated")
+
+        counts = {
+            status: Order.all_objects.filter(payment_status=status).count()
+            for status, _ in Order.PAYMENT_STATUS_CHOICES
+        }
+        summary = ", ".join(f"{count} {status}" for status, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {updated} orders: {summary}."))
@@ -0,0 +1,177 @@
+import statistics, threading, time, uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from carts.models import Cart, CartItem
+from core.models.accounts import UserAccount
+from jobs.models import Job
+from notifications.models import Notification
+from orders.models import Order, OrderItem
+from orders.services import checkout
+from products.models import Product, ProductCategory
+from reports.services import update_sales_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Have many buyers check out the same product at once and verify that "
+        "stock is never oversold. Creates its own product, buyers and carts "
+        "and deletes them, and everything their checkouts wrote, afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--buyers", type=int, default=50)
+        parser.add_argument("--stock", type=int, default=20)
+        parser.add_argument("--quantity", type=int, default=1)
+        parser.add_argument(
+            "--eager-jobs",
+            action="store_true",
+            help="Run the post-checkout jobs (notifications, stock alerts) inside "
+            "checkout instead of queueing them, to compare the latency",
+        )
+
+    def handle(self, *args, **options):
+        buyers, stock, quantity = options["buyers"], options["stock"], options["quantity"]
+        run = uuid.uuid4().hex[:8]
+
+        category = ProductCategory.objects.create(name=f"Checkout benchmark {run}")
+        product = Product.objects.create(
+            name=f"Checkout benchmark {run}",
+            description="",
+            price="10.00",
+            stock=stock,
+            low_stock_threshold=0,
+            category=category,
+        )
+        users = [
+            UserAccount(email=f"buyer-{run}-{n}@example.com", role="customer")
+            for n in range(buyers)
+        ]
+        for user in users:
+            user.set_unusable_password()
+        UserAccount.objects.bulk_create(users)
+        carts = Cart.objects.bulk_create([Cart(customer=user) for user in users])
+        CartItem.objects.bulk_create(
+            [CartItem(cart=cart, product=product, quantity=quantity) for cart in carts]
+        )
+
+        started = timezone.now()
+        try:
+            with override_settings(JOBS_EAGER=options["eager_jobs"]):
+                results = self.race(carts, users)
+            self.report(results, product, stock, quantity)
+        finally:
+            self.clean_up(run, started, users, product, options["eager_jobs"])
+            UserAccount.objects.filter(id__in=[user.id for user in users]).delete()
+            product.delete()
+            category.delete()
+
+    def clean_up(self, run, started, users, product, eager_jobs):
+        """
+        Undo what the checkouts and their jobs wrote. Queued jobs are dropped
+        before they run; the sales of jobs that did run (all of them with
+        --eager-jobs) are taken back out of the report rollups.
+        """
+        order_ids = [
+            str(order_id)
+            for order_id in Order.all_objects.filter(customer__in=users).values_list(
+                "id", flat=True
+            )
+        ]
+        ours = set(order_ids) | {str(product.id)}
+        jobs = [
+            job
+            for job in Job.objects.filter(created_at__gte=started)
+            if ours & job_references(job.payload)
+        ]
+        if eager_jobs:
+            rolled_up = order_ids
+        else:
+            rolled_up = [
+                order_id
+                for job in jobs
+                if job.name == "reports.update_sales_rollups" and job.status != Job.QUEUED
+                for order_id in job.payload["order_ids"]
+            ]
+        Job.objects.filter(id__in=[job.id for job in jobs]).delete()
+        if rolled_up:
+            update_sales_rollups(rolled_up, sign=-1)
+
+        # Order and stock alerts name the buyers or the product, and both
+        # carry the run id; the customers' own notifications go with them.
+        Notification.objects.filter(created_at__gte=started, content__contains=run).delete()
+        Order.all_objects.filter(id__in=order_ids).delete()
+
+    def race(self, carts, users):
+        results = [None] * len(carts)
+        start = threading.Barrier(len(carts))
+
+        def buy(n):
+            cart = carts[n]
+            items = list(CartItem.objects.filter(cart=cart).select_related("product"))
+            start.wait()
+            began = time.perf_counter()
+            try:
+                order, errors = checkout(
+                    cart,
+                    items,
+                    {"customer": users[n].id, "shipping_address": "Benchmark"},
+                )
+                outcome = "ordered" if order else "rejected"
+            except Exception as e:
+                outcome, errors = "error", [str(e)]
+            finally:
+                connection.close()
+            results[n] = (outcome, time.perf_counter() - began, errors)
+
+        threads = [threading.Thread(target=buy, args=(n,)) for n in range(len(carts))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def report(self, results, product, stock, quantity):
+        product.refresh_from_db()
+        ordered = [r for r in results if r[0] == "ordered"]
+        rejected = [r for r in results if r[0] == "rejected"]
+        failed = [r for r in results if r[0] == "error"]
+        sold = (
+            OrderItem.objects.filter(product=product).aggregate(units=Sum("quantity"))[
+                "units"
+            ]
+            or 0
+        )
+        latencies = sorted(r[1] * 1000 for r in results)
+
+        self.stdout.write(
+            f"{len(results)} buyers: {len(ordered)} ordered, {len(rejected)} "
+            f"rejected for stock, {len(failed)} failed"
+        )
+        self.stdout.write(
+            f"Stock {stock} -> {product.stock}, {sold} units sold; checkout "
+            f"p50={statistics.median(latencies):.1f}ms max={latencies[-1]:.1f}ms"
+        )
+        for _, _, errors in failed[:5]:
+            self.stderr.write(f"  {errors[0]}")
+
+        if product.stock < 0 or sold != stock - product.stock:
+            raise CommandError("Stock was oversold.")
+        if len(ordered) * quantity != sold:
+            raise CommandError("Orders and decremented stock disagree.")
+        if rejected and product.stock >= quantity:
+            raise CommandError("Buyers were rejected while stock was left.")
+        self.stdout.write(self.style.SUCCESS("No oversell."))
+
+
+def job_references(payload: dict) -> set:
+    """The order and product ids a checkout job's payload refers to."""
+    return {
+        payload.get("order_id"),
+        *payload.get("order_ids", []),
+        *payload.get("product_ids", []),
+    } - {None}
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 12:36
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_deleted_orders(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    DeletedOrder = apps.get_model("orders", "DeletedOrder")
+
+    deleted = DeletedOrder.objects.filter(order=OuterRef("pk")).values("deleted_at")
+    Order.objects.filter(id__in=DeletedOrder.objects.values("order")).update(
+        deleted_at=Subquery(deleted[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_payment_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(copy_deleted_orders, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='DeletedOrder',
+        ),
+    ]
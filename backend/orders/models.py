@@ -1,9 +1,17 @@
 import uuid
 from django.db import models
+from django.utils import timezone
 from core.models.accounts import UserAccount
 from products.models import Product
 
 
+class OrderManager(models.Manager):
+    """Orders that haven't been (soft) deleted."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Order(models.Model):
     ORDER_STATUS_CHOICES = (
         ("PENDING", "Pending"),
@@ -11,6 +19,23 @@ class Order(models.Model):
         ("DELIVERED", "Delivered"),
         ("CANCELLED", "Cancelled"),
     )
+    # The statuses an order may move to from each status. Delivered and
+    # cancelled orders are final; a cancelled order's items are back on sale.
+    ALLOWED_STATUS_TRANSITIONS = {
+        "PENDING": ("PROCESSING", "DELIVERED", "CANCELLED"),
+        "PROCESSING": ("PENDING", "DELIVERED", "CANCELLED"),
+        "DELIVERED": (),
+        "CANCELLED": (),
+    }
+
+    PAYMENT_STATUS_CHOICES = (
+        ("UNPAID", "Unpaid"),
+        ("pending", "Pending"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+        ("refunded", "Refunded"),
+    )
+    UNPAID_STATUSES = ("UNPAID", "pending", "failed")
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     customer = models.ForeignKey(
@@ -22,7 +47,9 @@ class Order(models.Model):
         related_name="processed_orders",
         on_delete=models.SET_NULL,
     )
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add so that sales made offline keep the time the till
+    # recorded them at; see sync_offline_sales.
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     status = models.CharField(
         max_length=20, choices=ORDER_STATUS_CHOICES, default="PENDING"
     )
@@ -33,6 +60,22 @@ class Order(models.Model):
     )
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     shipping_address = models.TextField()
+    # Status of the order's latest payment, copied from Payment whenever one
+    # is saved so that it can be filtered on and indexed.
+    payment_status = models.CharField(
+        max_length=20, choices=PAYMENT_STATUS_CHOICES, default="UNPAID"
+    )
+    # Set when the order is deleted; deleted orders are kept for the records
+    # but left out of `Order.objects`.
+    deleted_at = models.DateTimeField(blank=True, null=True, db_index=True)
+    # Id a till gave a sale it made offline, so that syncing the sale again
+    # doesn't record it twice.
+    client_reference = models.CharField(
+        max_length=64, blank=True, null=True, unique=True, editable=False
+    )
+
+    objects = OrderManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return f"Order by {self.customer} - {self.status}"
@@ -42,19 +85,27 @@ class Order(models.Model):
 
     @property
     def deleted(self):
-        return hasattr(self, "deletedorder")
-
-    @property
-    def payment_status(self):
-        if hasattr(self, "payments"):
-            payments = self.payments.all().order_by("-created_at")
-            if payments.exists():
-                return payments.first().status
-            # return "UNPAID"
-        return "UNPAID"
+        return self.deleted_at is not None
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Order listings filtered by status or customer and paginated on
+            # (created_at, id); see get_filtered_orders.
+            models.Index(
+                fields=["status", "created_at", "id"], name="order_status_created_idx"
+            ),
+            models.Index(
+                fields=["customer", "created_at", "id"],
+                name="order_customer_created_idx",
+            ),
+            # Unpaid order dashboards: WHERE payment_status IN (...) ORDER BY
+            # created_at DESC.
+            models.Index(
+                fields=["payment_status", "-created_at"],
+                name="order_payment_status_idx",
+            ),
+        ]
         verbose_name = "Order"
         verbose_name_plural = "Orders"
 
@@ -73,12 +124,61 @@ class OrderItem(models.Model):
         return f"{self.quantity} x {self.product.name} for {self.order.customer}"
 
 
-class DeletedOrder(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    order = models.OneToOneField(
-        Order, related_name="deleted_order", on_delete=models.CASCADE
+class ArchivedOrder(models.Model):
+    """
+    A delivered or cancelled order moved out of `Order` by
+    `manage.py archive_orders` once it is old enough that it is only read.
+    It has the same fields, so it serializes with `OrderSerializer`.
+    """
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    customer = models.ForeignKey(
+        UserAccount, related_name="archived_orders", on_delete=models.CASCADE
+    )
+    sales_person = models.ForeignKey(
+        UserAccount, null=True, related_name="+", on_delete=models.SET_NULL
+    )
+    created_at = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES)
+    order_type = models.CharField(max_length=20)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    shipping_address = models.TextField()
+    payment_status = models.CharField(
+        max_length=20, choices=Order.PAYMENT_STATUS_CHOICES
+    )
+    deleted_at = models.DateTimeField(blank=True, null=True)
+    client_reference = models.CharField(max_length=64, blank=True, null=True, unique=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived order by {self.customer} - {self.status}"
+
+    def order_items(self):
+        return self.items.all()
+
+    @property
+    def deleted(self):
+        return self.deleted_at is not None
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["customer", "created_at"], name="archived_order_customer_idx"
+            ),
+            models.Index(fields=["created_at"], name="archived_order_created_idx"),
+        ]
+
+
+class ArchivedOrderItem(models.Model):
+    id = models.UUIDField(primary_key=True, editable=False)
+    order = models.ForeignKey(
+        ArchivedOrder, related_name="items", on_delete=models.CASCADE
     )
-    deleted_at = models.DateTimeField(auto_now_add=True)
+    product = models.ForeignKey(Product, related_name="+", on_delete=models.CASCADE)
+    quantity = models.IntegerField()
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField()
 
     def __str__(self):
-        return f"Deleted Order {self.order.id} at {self.deleted_at}"
+        return f"{self.quantity} x {self.product.name} for {self.order.customer}"
@@ -1,35 +1,150 @@
+import functools
+from datetime import datetime, time
+from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django.http import HttpRequest
 from orders.serializers import OrderSerializer
-from orders.models import Order
+from orders.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from core.utils.general import valid_uuid
+
+
+# Account in-store sales are recorded against; see `manage.py customeraccount`.
+IN_STORE_CUSTOMER_EMAIL = "customer@venella.com"
+
+
+def get_orders_queryset():
+    """
+    Base order queryset with everything `OrderSerializer` renders loaded up
+    front: the customer and sales person with their profiles and the items
+    with their products' categories and images. Serializing any number of
+    orders then costs a constant number of queries.
+    """
+    items = OrderItem.objects.select_related("product__category").prefetch_related(
+        "product__images"
+    )
+    return Order.objects.select_related(
+        "customer__profile", "sales_person__profile"
+    ).prefetch_related(Prefetch("items", queryset=items))
+
+
+def get_archived_orders_queryset():
+    """`get_orders_queryset` for the orders moved to the archive."""
+    items = ArchivedOrderItem.objects.select_related(
+        "product__category"
+    ).prefetch_related("product__images")
+    return (
+        ArchivedOrder.objects.filter(deleted_at__isnull=True)
+        .select_related("customer__profile", "sales_person__profile")
+        .prefetch_related(Prefetch("items", queryset=items))
+    )
 
 
 def get_all_orders():
-    return Order.objects.all()
+    return get_orders_queryset()
 
 
-def get_order_by_id(order_id: str):
+def get_order_by_id(order_id: str, include_deleted: bool = False):
+    orders = Order.all_objects if include_deleted else Order.objects
     try:
-        return Order.objects.get(id=order_id)
+        return orders.get(id=order_id)
     except Order.DoesNotExist:
         return None
 
 
+def get_order_details(order_id: str):
+    """
+    `get_order_by_id` for orders that are about to be serialized. Orders
+    that have been archived are looked up in the archive.
+    """
+    return (
+        get_orders_queryset().filter(id=order_id).first()
+        or get_archived_orders_queryset().filter(id=order_id).first()
+    )
+
+
 def get_orders_by_status(status: str):
-    return Order.objects.filter(status=status).order_by("status")
+    return get_orders_queryset().filter(status=status).order_by("-created_at")
 
 
 def get_orders_by_statuses(statuses: list):
-    return Order.objects.filter(status__in=statuses).order_by("status")
+    return get_orders_queryset().filter(status__in=statuses).order_by("-created_at")
+
+
+def get_unpaid_orders():
+    return get_orders_queryset().filter(payment_status__in=Order.UNPAID_STATUSES)
+
+
+def get_filtered_orders(params):
+    """
+    Orders matching the filters in `params`: status and order_type (each may
+    be repeated to match any of several values), customer, and a
+    created_after/created_before range given as dates or datetimes. Returns
+    the queryset and a list of errors.
+    """
+    orders = get_orders_queryset()
+    if statuses := params.getlist("status"):
+        statuses = [status.strip().upper() for status in statuses]
+        if not set(statuses) <= set(dict(Order.ORDER_STATUS_CHOICES)):
+            return orders, ["Invalid status provided."]
+        orders = orders.filter(status__in=statuses)
+    if order_types := params.getlist("order_type"):
+        order_types = [order_type.strip().upper() for order_type in order_types]
+        if not set(order_types) <= {"ONLINE", "OFFLINE"}:
+            return orders, ["Invalid order type provided."]
+        orders = orders.filter(order_type__in=order_types)
+    if customer := params.get("customer"):
+        if not valid_uuid(customer):
+            return orders, ["customer must be a user ID."]
+        orders = orders.filter(customer=customer)
+    for param, lookup in (("created_after", "gte"), ("created_before", "lt")):
+        if value := params.get(param):
+            moment = parse_moment(value)
+            if moment is None:
+                return orders, [f"{param} must be an ISO 8601 date or datetime."]
+            orders = orders.filter(**{f"created_at__{lookup}": moment})
+    return orders, []
+
+
+def parse_moment(value: str):
+    """An ISO 8601 datetime, or midnight of an ISO 8601 date, in local time."""
+    try:
+        moment = parse_datetime(value)
+        if moment is None and (day := parse_date(value)):
+            moment = datetime.combine(day, time.min)
+    except ValueError:
+        return None
+    if moment and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
 
 
 def get_orders_by_customer(customer_id: str):
-    return Order.objects.filter(customer=customer_id).order_by("status")
+    return get_orders_queryset().filter(customer=customer_id).order_by("-created_at")
 
 
 def get_customer_orders_by_status(customer: str, status: str):
-    return Order.objects.filter(customer=customer, status=status).order_by("status")
+    return (
+        get_orders_queryset()
+        .filter(customer=customer, status=status)
+        .order_by("-created_at")
+    )
 
 
 def order_representation(request: HttpRequest, order: Order, many: bool = False):
     serializer = OrderSerializer(order, many=many, context={"request": request})
     return serializer.data
+
+
+@functools.lru_cache(maxsize=1)
+def get_in_store_customer_id():
+    """
+    Id of the in-store customer account, looked up once per process. Raises
+    DoesNotExist when the account hasn't been created.
+    """
+    return (
+        get_user_model()
+        .objects.values_list("id", flat=True)
+        .get(email=IN_STORE_CUSTOMER_EMAIL)
+    )
@@ -1,3 +1,4 @@
+from functools import cached_property
 from rest_framework import serializers
 from orders.models import Order, OrderItem
 from products.serializers import ProductSerializer
@@ -9,11 +10,14 @@ class OrderItemSerializer(serializers.ModelSerializer):
         model = OrderItem
         fields = "__all__"
 
+    # Built once and reused for every item, see ProductSerializer.
+    @cached_property
+    def product_serializer(self):
+        return ProductSerializer(context={"request": self.context.get("request")})
+
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        data["product"] = ProductSerializer(
-            instance.product, context={"request": self.context.get("request")}
-        ).data
+        data["product"] = self.product_serializer.to_representation(instance.product)
         return data
 
 
@@ -21,23 +25,28 @@ class OrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = "__all__"
+        read_only_fields = ["payment_status"]
+
+    @cached_property
+    def user_serializer(self):
+        return UserAccountSerializer(context={"request": self.context.get("request")})
+
+    @cached_property
+    def items_serializer(self):
+        return OrderItemSerializer(
+            many=True, context={"request": self.context.get("request")}
+        )
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        data["customer"] = UserAccountSerializer(
-            instance.customer, context={"request": self.context.get("request")}
-        ).data
-        data["order_items"] = OrderItemSerializer(
-            instance.order_items(),
-            many=True,
-            context={"request": self.context.get("request")},
-        ).data
+        data["customer"] = self.user_serializer.to_representation(instance.customer)
+        data["order_items"] = self.items_serializer.to_representation(
+            instance.order_items()
+        )
         if instance.sales_person:
-            data["sales_person"] = UserAccountSerializer(
-                instance.sales_person, context={"request": self.context.get("request")}
-            ).data
+            data["sales_person"] = self.user_serializer.to_representation(
+                instance.sales_person
+            )
         else:
             data["sales_person"] = None
-
-        data["payment_status"] = instance.payment_status
         return data
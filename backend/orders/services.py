@@ -1,106 +1,488 @@
-from orders.models import Order, OrderItem, DeletedOrder
-from orders.serializers import OrderSerializer, OrderItemSerializer
-from orders.selectors import get_order_by_id
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from orders.models import ArchivedOrder, Order, OrderItem
+from orders.serializers import OrderSerializer
+from orders.selectors import get_in_store_customer_id, get_order_by_id, parse_moment
 from products.models import Product
-from products.selectors import get_product_by_id
+from products.services import (
+    decrement_stock,
+    hold_stock,
+    increment_stock,
+    record_order_movements,
+    release_stock,
+    sell_held_stock,
+)
+from carts.models import CartItem
+from carts.services import clear_cart
+from core.utils.general import canonical_uuid
+from jobs.services import enqueue
+from reports.services import queue_sales_rollup_update
 from django.contrib.auth import get_user_model
-from products.services import check_and_send_low_stock_notification
 
 
-def create_order(data: dict):
+# How far ahead of the server's clock a till's may be before the times of
+# its offline sales are refused.
+OFFLINE_CLOCK_SKEW = timedelta(minutes=5)
+
+
+def checkout(cart, cart_items: list, data: dict):
+    """
+    Turn `cart_items` into an order in a single transaction: take the items
+    out of stock, create the order and its items and empty the cart. Either
+    all of it happens or, when validation fails or a product is short,
+    none of it does. Items holding their quantity (carts.services.
+    hold_cart_item) are sold from the hold without a stock check; only
+    units they don't hold, e.g. after the hold lapsed, are checked. The
+    notifications about the new order are sent by a background job.
+    Returns the order and a list of errors.
+    """
+    quantities = Counter()
+    for item in cart_items:
+        if item.quantity <= 0:
+            return None, ["Quantity must be greater than zero"]
+        quantities[str(item.product_id)] += item.quantity
+
+    data["total_amount"] = sum(item.quantity * item.product.price for item in cart_items)
     serializer = OrderSerializer(data=data)
-    if serializer.is_valid():
-        serializer.save()
-        return serializer.data, None
-    else:
+    if not serializer.is_valid():
         return None, serializer.errors
 
+    with transaction.atomic():
+        # Locking the items keeps the sweeper from releasing their holds.
+        held = dict(
+            CartItem.objects.select_for_update()
+            .filter(id__in=[item.id for item in cart_items])
+            .order_by("id")
+            .values_list("id", "reserved")
+        )
+        missing, surplus = Counter(), Counter()
+        for item in cart_items:
+            difference = item.quantity - held.get(item.id, 0)
+            if difference > 0:
+                missing[str(item.product_id)] += difference
+            elif difference < 0:
+                surplus[str(item.product_id)] -= difference
+        errors = hold_stock(missing) if missing else []
+        if errors:
+            return None, errors
+        release_stock(surplus)
+        CartItem.objects.filter(id__in=list(held)).update(reserved=0, reserved_until=None)
+        products = sell_held_stock(quantities)
 
-def create_order_items(data: dict):
+        # Charge the prices read along with the stock, not the cart's copies.
+        order = serializer.save(
+            total_amount=sum(
+                products[product_id].price * quantity
+                for product_id, quantity in quantities.items()
+            )
+        )
+        items = OrderItem.objects.bulk_create(
+            [
+                OrderItem(
+                    order=order,
+                    product=products[product_id],
+                    quantity=quantity,
+                    amount=products[product_id].price,
+                )
+                for product_id, quantity in quantities.items()
+            ]
+        )
+        record_order_movements("SALE", items)
+        clear_cart(cart.id)
+        enqueue("orders.send_order_placed_notifications", {"order_id": str(order.id)})
+        queue_sales_rollup_update([order.id])
+    return order, None
 
-    for order_item in data["order_items"]:
-        product = get_product_by_id(order_item.get("product"))
-        if not product:
-            return None, [f"Product {order_item.get('product')} not found"]
 
-        if product.stock < order_item.get("quantity", 0):
-            return None, [f"Insufficient stock for product {product.name}"]
+def order_status_changed(order: Order, previous_status: str):
+    """
+    Queue the notifications about `order` moving from `previous_status` to
+    its current status, and take it out of the sales rollups when it is
+    cancelled (or put it back when it is reinstated).
+    """
+    orders_status_changed([(order.id, previous_status, order.status)])
 
-        if order_item.get("quantity") <= 0:
-            return None, ["Quantity must be greater than zero"]
 
-        if order_item.get("amount") <= 0:
-            return None, ["Amount must be greater than zero"]
+def orders_status_changed(changes: list):
+    """
+    order_status_changed for many orders at once: `changes` holds an
+    (order_id, previous_status, status) triple per order, and one job of
+    each kind is queued for all of them.
+    """
+    if not changes:
+        return
+    enqueue(
+        "orders.send_status_notifications",
+        {"orders": [[str(order_id), status] for order_id, _, status in changes]},
+    )
+    cancelled = [
+        order_id
+        for order_id, previous_status, status in changes
+        if status == "CANCELLED" and previous_status != "CANCELLED"
+    ]
+    reinstated = [
+        order_id
+        for order_id, previous_status, status in changes
+        if previous_status == "CANCELLED" and status != "CANCELLED"
+    ]
+    queue_sales_rollup_update(cancelled, sign=-1)
+    queue_sales_rollup_update(reinstated, sign=1)
 
-        order_item["order"] = data.get("order")
 
-    serializer = OrderItemSerializer(data=data["order_items"], many=True)
-    if serializer.is_valid():
-        serializer.save()
-        return serializer.data, None
-    else:
-        return None, serializer.errors
+def check_status_transition(previous_status: str, status: str):
+    """Return an error if an order may not move from `previous_status` to `status`."""
+    if status not in dict(Order.ORDER_STATUS_CHOICES):
+        return "Invalid status provided."
+    if status not in Order.ALLOWED_STATUS_TRANSITIONS[previous_status]:
+        return f"A {previous_status.lower()} order can't be marked {status.lower()}."
+    return None
+
+
+def bulk_update_order_status(updates: list):
+    """
+    Move many orders to new statuses. Every update is an `order` ID and
+    the `status` to move it to; updates the status machine doesn't allow
+    (Order.ALLOWED_STATUS_TRANSITIONS), or for orders that don't exist,
+    are rejected and the rest are applied together, with one UPDATE per
+    target status. Cancelled orders' items go back in stock. The
+    notifications are created by one background job.
+    Returns a result per update, in the order given, and a list of errors.
+    """
+    if not isinstance(updates, list) or not updates:
+        return None, ["Updates must be a non-empty list."]
+    if len(updates) > settings.ORDER_STATUS_BULK_MAX:
+        return None, [
+            f"At most {settings.ORDER_STATUS_BULK_MAX} orders can be updated at once."
+        ]
+
+    results, pending = [], {}
+    for update in updates:
+        order_id = update.get("order") if isinstance(update, dict) else None
+        new_status = update.get("status") if isinstance(update, dict) else None
+        result = {"order": order_id, "status": None}
+        results.append(result)
+        order_id = canonical_uuid(order_id)
+        if not order_id or not isinstance(new_status, str):
+            result.update(status="rejected", errors=["Every update needs an order ID and a status."])
+        elif order_id in pending:
+            result.update(status="rejected", errors=["The order is listed more than once."])
+        else:
+            pending[order_id] = (result, new_status.strip().upper())
+
+    with transaction.atomic():
+        # Locking the orders keeps the statuses checked here from changing
+        # before they are updated.
+        current = dict(
+            Order.objects.select_for_update()
+            .filter(id__in=list(pending))
+            .order_by("id")
+            .values_list("id", "status")
+        )
+        current = {str(order_id): status for order_id, status in current.items()}
 
+        by_status, changes = {}, []
+        for order_id, (result, new_status) in pending.items():
+            if order_id not in current:
+                result.update(status="rejected", errors=["Order not found."])
+                continue
+            error = check_status_transition(current[order_id], new_status)
+            if error:
+                result.update(status="rejected", errors=[error])
+                continue
+            by_status.setdefault(new_status, []).append(order_id)
+            changes.append((order_id, current[order_id], new_status))
+            result.update(status="updated", previous_status=current[order_id], new_status=new_status)
 
-def sell_product(data: list):
-    products = data.get("products", [])
-    if not isinstance(products, list) or not products:
+        for new_status, order_ids in by_status.items():
+            Order.objects.filter(id__in=order_ids).update(status=new_status)
+        return_stock(by_status.get("CANCELLED", []))
+        orders_status_changed(changes)
+    return results, None
+
+
+def return_stock(order_ids: list):
+    """Put the items of the cancelled `order_ids` back in stock."""
+    items = list(
+        OrderItem.objects.filter(order_id__in=order_ids).only(
+            "order_id", "product_id", "quantity"
+        )
+    )
+    if not items:
+        return
+    quantities = Counter()
+    for item in items:
+        quantities[str(item.product_id)] += item.quantity
+    increment_stock(quantities)
+    record_order_movements("CANCELLATION", items)
+
+
+def sell_product(data: dict):
+    """
+    Record an in-store sale of `data["products"]` (product id and quantity
+    per line). All lines are checked against one query, then in a single
+    transaction the stock is taken with conditional UPDATEs and the order
+    and its items are inserted. Returns the order and a list of errors.
+    """
+    lines = data.get("products", [])
+    if not isinstance(lines, list) or not lines:
         return None, ["Products must be a non-empty list."]
 
-    total_amount = 0
-    for product_data in products:
-        if not isinstance(product_data, dict):
+    quantities = Counter()
+    for line in lines:
+        if not isinstance(line, dict):
             return None, ["Each product must be a dictionary."]
-        if "product" not in product_data or "quantity" not in product_data:
+        if "product" not in line or "quantity" not in line:
             return None, ["Each product must have 'product' and 'quantity'."]
+        quantity = line["quantity"]
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+            return None, ["Quantity must be greater than zero"]
+        product_id = canonical_uuid(line["product"])
+        if not product_id:
+            return None, [f"Product {line['product']} not found"]
+        quantities[product_id] += quantity
+
+    stock = {
+        str(id): (name, in_stock)
+        for id, name, in_stock in Product.objects.filter(
+            id__in=list(quantities)
+        ).values_list("id", "name", "stock")
+    }
+    errors = [
+        f"Product {product_id} not found"
+        if product_id not in stock
+        else f"Insufficient stock for product {stock[product_id][0]}"
+        for product_id, quantity in quantities.items()
+        if product_id not in stock or stock[product_id][1] < quantity
+    ]
+    if errors:
+        return None, errors
+
+    try:
+        customer_id = get_in_store_customer_id()
+    except get_user_model().DoesNotExist:
+        return None, ["The in-store customer account has not been created."]
+
+    with transaction.atomic():
+        # The stock read above may be stale by now; the conditional UPDATEs
+        # are what actually guard against overselling.
+        products, errors = decrement_stock(quantities)
+        if errors:
+            return None, errors
 
-        product = get_product_by_id(product_data["product"])
-        if not product:
-            return None, ["Product not found."]
-
-        if product.stock < product_data.get("quantity", 0):
-            return None, ["Insufficient stock for the product."]
-
-        product_data["amount"] = product.price
-        total_amount += product_data["quantity"] * product.price
-
-    User = get_user_model()
-    IN_STORE_USER = User.objects.get(email="customer@venella.com")
-    order_serializer = OrderSerializer(
-        data={
-            "customer": IN_STORE_USER.id,
-            "status": "DELIVERED",
-            "order_type": "OFFLINE",
-            "total_amount": total_amount,
-            "shipping_address": "In-Store Purchase",
+        order = Order.objects.create(
+            customer_id=customer_id,
+            status="DELIVERED",
+            order_type="OFFLINE",
+            total_amount=sum(
+                products[product_id].price * quantity
+                for product_id, quantity in quantities.items()
+            ),
+            shipping_address="In-Store Purchase",
+        )
+        items = OrderItem.objects.bulk_create(
+            [
+                OrderItem(
+                    order=order,
+                    product=products[product_id],
+                    quantity=quantity,
+                    amount=products[product_id].price,
+                )
+                for product_id, quantity in quantities.items()
+            ]
+        )
+        record_order_movements("SALE", items)
+        queue_sales_rollup_update([order.id])
+    return order, None
+
+
+def sync_offline_sales(sales: list):
+    """
+    Record in-store sales a till made while it was offline. Every sale has
+    a `client_reference` (the till's id for it), a `sold_at` time and its
+    `products` lines. Sales already synced are reported as duplicates, and
+    sales the stock can't cover, taking sales in the order they were made,
+    are rejected. Everything else is recorded in one transaction with the
+    stock of each product taken in one UPDATE. Returns a result per sale,
+    in the order given, and a list of errors.
+    """
+    if not isinstance(sales, list) or not sales:
+        return None, ["Sales must be a non-empty list."]
+    if len(sales) > settings.POS_SYNC_MAX_SALES:
+        return None, [f"At most {settings.POS_SYNC_MAX_SALES} sales can be synced at once."]
+
+    results, pending = [], []
+    for sale in sales:
+        result, sold_at, lines = offline_sale_lines(sale)
+        results.append(result)
+        if lines:
+            pending.append((result, sold_at, lines))
+    if not pending:
+        return results, None
+
+    try:
+        customer_id = get_in_store_customer_id()
+    except get_user_model().DoesNotExist:
+        return None, ["The in-store customer account has not been created."]
+
+    product_ids = sorted({product_id for *_, lines in pending for product_id in lines})
+    with transaction.atomic():
+        # Locking the products keeps the stock read here valid until the
+        # sales taking it are recorded.
+        products = {
+            str(product.id): product
+            for product in Product.objects.select_for_update()
+            .filter(id__in=product_ids)
+            .order_by("id")
         }
-    )
+        references = [result["client_reference"] for result, *_ in pending]
+        synced = {
+            reference: order_id
+            for orders in (Order.all_objects, ArchivedOrder.objects)
+            for reference, order_id in orders.filter(
+                client_reference__in=references
+            ).values_list("client_reference", "id")
+        }
+
+        # Units held for carts aren't for sale (see decrement_stock).
+        available = {
+            product_id: product.stock - product.reserved
+            for product_id, product in products.items()
+        }
+        sold, orders, items = Counter(), [], []
+        for result, sold_at, lines in sorted(pending, key=lambda sale: sale[1]):
+            reference = result["client_reference"]
+            if reference in synced:
+                result.update(status="duplicate", order=str(synced[reference]))
+                continue
+            errors = [
+                f"Product {product_id} not found"
+                if product_id not in products
+                else f"Insufficient stock for product {products[product_id].name}"
+                for product_id, quantity in lines.items()
+                if available.get(product_id, 0) < quantity
+            ]
+            if errors:
+                result.update(status="rejected", errors=errors)
+                continue
+
+            order = Order(
+                customer_id=customer_id,
+                status="DELIVERED",
+                order_type="OFFLINE",
+                total_amount=sum(
+                    products[product_id].price * quantity
+                    for product_id, quantity in lines.items()
+                ),
+                shipping_address="In-Store Purchase",
+                created_at=sold_at,
+                client_reference=reference,
+            )
+            for product_id, quantity in lines.items():
+                available[product_id] -= quantity
+                sold[product_id] += quantity
+                items.append(
+                    OrderItem(
+                        order=order,
+                        product=products[product_id],
+                        quantity=quantity,
+                        amount=products[product_id].price,
+                    )
+                )
+            orders.append(order)
+            synced[reference] = order.id
+            result.update(status="created", order=str(order.id))
 
-    if order_serializer.is_valid():
-        order = order_serializer.save()
+        if orders:
+            _, errors = decrement_stock(sold)
+            if errors:
+                transaction.set_rollback(True)
+                return None, errors
+            Order.objects.bulk_create(orders, batch_size=500)
+            OrderItem.objects.bulk_create(items, batch_size=500)
+            record_order_movements("SALE", items)
+            queue_sales_rollup_update([order.id for order in orders])
+    return results, None
 
-        for product_data in products:
-            order_item_data = {
-                "order": order.id,
-                "product": product_data["product"],
-                "quantity": product_data["quantity"],
-                "amount": product_data["amount"],
-            }
-            order_item_serializer = OrderItemSerializer(data=order_item_data)
-            if order_item_serializer.is_valid():
-                order_item_serializer.save()
-            else:
-                return None, order_item_serializer.errors
 
-        return order_serializer.data, None
-    else:
-        return None, order_serializer.errors
+def offline_sale_lines(sale):
+    """
+    Check the shape of one offline sale. Returns its result, to be filled in
+    by `sync_offline_sales`, when it was made and its quantities by product
+    id, which are None when the sale is rejected.
+    """
+    if not isinstance(sale, dict):
+        sale = {}
+    reference = sale.get("client_reference")
+    result = {
+        "client_reference": reference,
+        "status": "rejected",
+        "order": None,
+        "errors": [],
+    }
+
+    if not isinstance(reference, str) or not reference.strip():
+        result["errors"].append("client_reference is required.")
+    elif len(reference) > Order._meta.get_field("client_reference").max_length:
+        result["errors"].append("client_reference is too long.")
+
+    sold_at = sale.get("sold_at")
+    sold_at = parse_moment(sold_at) if isinstance(sold_at, str) else None
+    if not sold_at:
+        result["errors"].append("sold_at must be an ISO 8601 datetime.")
+    elif sold_at > timezone.now() + OFFLINE_CLOCK_SKEW:
+        result["errors"].append("sold_at is in the future.")
+
+    quantities = Counter()
+    lines = sale.get("products")
+    if not isinstance(lines, list) or not lines:
+        result["errors"].append("Products must be a non-empty list.")
+        lines = []
+    for line in lines:
+        if not isinstance(line, dict) or "product" not in line or "quantity" not in line:
+            result["errors"].append("Each product must have 'product' and 'quantity'.")
+            break
+        quantity = line["quantity"]
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+            result["errors"].append("Quantity must be greater than zero")
+            break
+        product_id = canonical_uuid(line["product"])
+        if not product_id:
+            result["errors"].append(f"Product {line['product']} not found")
+            break
+        quantities[product_id] += quantity
+
+    if result["errors"]:
+        return result, sold_at, None
+    return result, sold_at, quantities
+
+
+def refresh_payment_status(orders):
+    """
+    Copy the status of each order's latest payment onto `orders` (a queryset)
+    with a single UPDATE. Returns the number of orders updated.
+    """
+    from payments.models import Payment
+
+    latest = Payment.objects.filter(order=OuterRef("pk")).order_by("-created_at")
+    return orders.update(
+        payment_status=Coalesce(Subquery(latest.values("status")[:1]), Value("UNPAID"))
+    )
 
 
 def delete_order(order: Order):
-    try:
-        deleted_order = DeletedOrder.objects.create(order=order)
-        order.delete()
-        return deleted_order, None
-    except Exception as e:
-        return None, str(e)
+    """Soft delete `order` with a single UPDATE."""
+    deleted_at = timezone.now()
+    updated = Order.all_objects.filter(id=order.id, deleted_at__isnull=True).update(
+        deleted_at=deleted_at
+    )
+    if not updated:
+        return None, "Order has already been deleted."
+    order.deleted_at = deleted_at
+    if order.status != "CANCELLED":
+        queue_sales_rollup_update([order.id], sign=-1)
+    return order, None
@@ -1,3 +1,772 @@
+import csv, json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.http import QueryDict
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from carts.models import Cart, CartItem
+from core.models.accounts import UserAccount
+from core.models.profiles import Profile
+from core.utils.testing import authenticated_client
+from jobs.services import run_due_jobs
+from notifications.models import CustomerNotification, SalesPersonNotification
+from orders.archive import archive_orders
+from orders.exports import export_rows
+from orders.models import ArchivedOrder, Order, OrderItem
+from orders.selectors import (
+    get_filtered_orders,
+    get_in_store_customer_id,
+    get_order_by_id,
+    get_orders_by_customer,
+)
+from orders.services import checkout, delete_order, sell_product, sync_offline_sales
+from payments.models import Payment
+from products.models import Product, ProductCategory, ProductImage, StockMovement
+
+
+class CheckoutTest(TestCase):
+    def setUp(self):
+        self.customer = UserAccount.objects.create_user(
+            email="ama@example.com", role="customer"
+        )
+        category = ProductCategory.objects.create(name="Analgesics")
+        self.products = [
+            Product.objects.create(
+                name=name,
+                description="",
+                price=price,
+                stock=stock,
+                category=category,
+            )
+            for name, price, stock in [
+                ("Paracetamol", "5.00", 30),
+                ("Ibuprofen", "8.50", 2),
+            ]
+        ]
+        self.cart = Cart.objects.create(customer=self.customer)
+
+    def fill_cart(self, *quantities):
+        for product, quantity in zip(self.products, quantities):
+            CartItem.objects.create(cart=self.cart, product=product, quantity=quantity)
+        return list(CartItem.objects.filter(cart=self.cart).select_related("product"))
+
+    def checkout(self, cart_items):
+        return checkout(
+            self.cart,
+            cart_items,
+            {"customer": self.customer.id, "shipping_address": "Accra"},
+        )
+
+    def test_checkout_takes_stock_and_empties_cart(self):
+        order, errors = self.checkout(self.fill_cart(3, 2))
+        self.assertIsNone(errors)
+        self.assertEqual(order.total_amount, 3 * 5 + 2 * 8.5)
+        self.assertEqual(
+            sorted(OrderItem.objects.filter(order=order).values_list("quantity", flat=True)),
+            [2, 3],
+        )
+        self.assertEqual(
+            [product.stock for product in Product.objects.order_by("name")], [0, 27]
+        )
+        self.assertFalse(CartItem.objects.filter(cart=self.cart).exists())
+
+    def test_notifications_are_sent_by_a_job(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order, _ = self.checkout(self.fill_cart(1, 1))
+        self.assertFalse(CustomerNotification.objects.exists())
+
+        run_due_jobs()
+        self.assertEqual(
+            CustomerNotification.objects.get(customer=self.customer).type, "NEW_ORDER"
+        )
+        self.assertIn(
+            self.customer.email, SalesPersonNotification.objects.get(type="NEW_ORDER").content
+        )
+
+    def test_short_product_rolls_back_whole_checkout(self):
+        order, errors = self.checkout(self.fill_cart(3, 5))
+        self.assertIsNone(order)
+        self.assertEqual(errors, ["Insufficient stock for product Ibuprofen"])
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(
+            [product.stock for product in Product.objects.order_by("name")], [2, 30]
+        )
+        self.assertEqual(CartItem.objects.filter(cart=self.cart).count(), 2)
+
+
+class InStoreSaleTest(TestCase):
+    def setUp(self):
+        get_in_store_customer_id.cache_clear()
+        self.in_store = UserAccount.objects.create_user(
+            email="customer@venella.com", role="customer"
+        )
+        category = ProductCategory.objects.create(name="Analgesics")
+        self.products = Product.objects.bulk_create(
+            [
+                Product(
+                    name=f"Product {n:02}",
+                    description="",
+                    price="2.50",
+                    stock=40,
+                    category=category,
+                )
+                for n in range(15)
+            ]
+        )
+
+    def tearDown(self):
+        get_in_store_customer_id.cache_clear()
+
+    def lines(self, quantity=2):
+        return [
+            {"product": str(product.id), "quantity": quantity}
+            for product in self.products
+        ]
+
+    def test_sale_takes_stock_in_constant_queries(self):
+        sell_product({"products": self.lines()})
+        # Only the first sale looks up the in-store customer; after that a
+        # 15 line sale is a validation SELECT, an UPDATE per line, a SELECT
+        # of the updated products and three INSERTs: the order, its items and
+        # their stock movements (plus savepoints).
+        with self.assertNumQueries(24):
+            order, errors = sell_product({"products": self.lines()})
+        self.assertIsNone(errors)
+        self.assertEqual(order.customer_id, self.in_store.id)
+        self.assertEqual(order.order_type, "OFFLINE")
+        self.assertEqual(order.total_amount, 15 * 2 * 2.5)
+        self.assertEqual(order.items.count(), 15)
+        self.assertEqual(set(Product.objects.values_list("stock", flat=True)), {36})
+
+    def test_short_lines_are_all_reported_and_nothing_is_sold(self):
+        Product.objects.filter(id__in=[p.id for p in self.products[:2]]).update(stock=1)
+        order, errors = sell_product({"products": self.lines()})
+        self.assertIsNone(order)
+        self.assertEqual(
+            errors,
+            [
+                "Insufficient stock for product Product 00",
+                "Insufficient stock for product Product 01",
+            ],
+        )
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Product.objects.filter(stock=40).count(), 13)
+
+    def test_product_ids_need_not_be_canonical(self):
+        product = self.products[0]
+        order, errors = sell_product(
+            {"products": [{"product": str(product.id).upper(), "quantity": 1}]}
+        )
+        self.assertIsNone(errors)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 39)
+
+
+class OfflineSaleSyncTest(TestCase):
+    def setUp(self):
+        get_in_store_customer_id.cache_clear()
+        UserAccount.objects.create_user(email="customer@venella.com", role="customer")
+        self.till = UserAccount.objects.create_user(
+            email="kofi@example.com", role="salesperson"
+        )
+        category = ProductCategory.objects.create(name="Analgesics")
+        self.paracetamol, self.ibuprofen = Product.objects.bulk_create(
+            [
+                Product(name="Paracetamol", description="", price="5.00", stock=10, category=category),
+                Product(name="Ibuprofen", description="", price="8.00", stock=3, category=category),
+            ]
+        )
+
+    def tearDown(self):
+        get_in_store_customer_id.cache_clear()
+
+    def sale(self, reference, sold_at, *lines):
+        return {
+            "client_reference": reference,
+            "sold_at": sold_at,
+            "products": [
+                {"product": str(product.id), "quantity": quantity}
+                for product, quantity in lines
+            ],
+        }
+
+    def sync(self, sales):
+        client = authenticated_client(self.till)
+        return client.post("/api/orders/sell/sync/", {"sales": sales}, format="json")
+
+    def test_sales_are_recorded_once_at_their_till_time(self):
+        sales = [
+            self.sale("till-1/1", "2026-03-02T09:15:00Z", (self.paracetamol, 2)),
+            self.sale("till-1/2", "2026-03-02T09:20:00Z", (self.paracetamol, 1), (self.ibuprofen, 3)),
+            self.sale("till-1/1", "2026-03-02T09:15:00Z", (self.paracetamol, 2)),
+        ]
+        response = self.sync(sales)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["created", "created", "duplicate"],
+        )
+        self.assertEqual(response.data["results"][2]["order"], response.data["results"][0]["order"])
+
+        order = Order.objects.get(client_reference="till-1/2")
+        self.assertEqual(order.created_at, datetime(2026, 3, 2, 9, 20, tzinfo=dt_timezone.utc))
+        self.assertEqual(order.total_amount, 5 + 3 * 8)
+        self.assertEqual(order.order_type, "OFFLINE")
+
+        response = self.sync(sales)
+        self.assertEqual(response.data["duplicate"], 3)
+        self.assertEqual(Order.objects.count(), 2)
+        self.paracetamol.refresh_from_db()
+        self.assertEqual(self.paracetamol.stock, 7)
+
+    def test_earlier_sales_get_the_stock_first(self):
+        response = self.sync(
+            [
+                self.sale("till-1/2", "2026-03-02T10:00:00Z", (self.ibuprofen, 2)),
+                self.sale("till-1/1", "2026-03-02T09:00:00Z", (self.ibuprofen, 2)),
+                self.sale("till-1/3", "not a time", (self.paracetamol, 1)),
+                self.sale("till-1/4", "2026-03-02T11:00:00Z", (self.paracetamol, 0)),
+            ]
+        )
+        results = response.data["results"]
+        self.assertEqual(
+            [result["status"] for result in results],
+            ["rejected", "created", "rejected", "rejected"],
+        )
+        self.assertEqual(results[0]["errors"], ["Insufficient stock for product Ibuprofen"])
+        self.assertEqual(results[2]["errors"], ["sold_at must be an ISO 8601 datetime."])
+        self.assertEqual(results[3]["errors"], ["Quantity must be greater than zero"])
+        self.ibuprofen.refresh_from_db()
+        self.assertEqual(self.ibuprofen.stock, 1)
+
+    def test_units_held_for_carts_are_not_sold(self):
+        Product.objects.filter(id=self.ibuprofen.id).update(stock=5, reserved=4)
+        response = self.sync(
+            [
+                self.sale("till-1/1", "2026-03-02T09:00:00Z", (self.ibuprofen, 3)),
+                self.sale("till-1/2", "2026-03-02T09:05:00Z", (self.paracetamol, 2)),
+            ]
+        )
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual([result["status"] for result in results], ["rejected", "created"])
+        self.assertEqual(results[0]["errors"], ["Insufficient stock for product Ibuprofen"])
+        self.ibuprofen.refresh_from_db()
+        self.paracetamol.refresh_from_db()
+        self.assertEqual((self.ibuprofen.stock, self.paracetamol.stock), (5, 8))
+
+    def test_product_ids_need_not_be_canonical(self):
+        sale = self.sale("till-1/1", "2026-03-02T09:00:00Z", (self.paracetamol, 2))
+        sale["products"][0]["product"] = str(self.paracetamol.id).upper()
+        response = self.sync([sale])
+        self.assertEqual(response.data["results"][0]["status"], "created")
+        self.paracetamol.refresh_from_db()
+        self.assertEqual(self.paracetamol.stock, 8)
+
+    def test_query_count_does_not_grow_with_sales(self):
+        def batch(first, size):
+            return [
+                self.sale(f"till-1/{n}", "2026-03-02T09:00:00Z", (self.paracetamol, 1))
+                for n in range(first, first + size)
+            ]
+
+        Product.objects.filter(id=self.paracetamol.id).update(stock=100)
+        sync_offline_sales(batch(0, 1))
+        with CaptureQueriesContext(connection) as few:
+            sync_offline_sales(batch(1, 2))
+        with CaptureQueriesContext(connection) as many:
+            sync_offline_sales(batch(3, 7))
+        self.assertEqual(len(few), len(many))
+
+
+class OrderListQueryCountTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.category = ProductCategory.objects.create(name="Analgesics")
+        self.sales_person = UserAccount.objects.create_user(
+            email="kofi@example.com",
+            role="salesperson",
+            profile=Profile.objects.create(first_name="Kofi", last_name="Mensah"),
+        )
+
+    def create_orders(self, count):
+        for n in range(count):
+            customer = UserAccount.objects.create_user(
+                email=f"customer-{n}-{UserAccount.objects.count()}@example.com",
+                role="customer",
+                profile=Profile.objects.create(first_name="Ama", last_name="Owusu"),
+            )
+            order = Order.objects.create(
+                customer=customer,
+                sales_person=self.sales_person,
+                total_amount="20.00",
+                shipping_address="Accra",
+            )
+            for i in range(2):
+                product = Product.objects.create(
+                    name=f"Product {n}-{i}",
+                    description="",
+                    price="5.00",
+                    stock=50,
+                    category=self.category,
+                )
+                ProductImage.objects.bulk_create(
+                    [ProductImage(product=product, image=f"{n}-{i}.png")]
+                )
+                OrderItem.objects.create(
+                    order=order, product=product, quantity=2, amount="5.00"
+                )
+            Payment.objects.create(order=order, amount="20.00", status="completed")
+
+    def test_query_count_does_not_grow_with_orders(self):
+        # Orders with customer and sales person profiles, items with their
+        # products and categories, and product images.
+        self.create_orders(2)
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/orders/")
+        self.assertEqual(len(response.data), 2)
+
+        self.create_orders(8)
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/orders/")
+        self.assertEqual(len(response.data), 10)
+        self.assertEqual(response.data[0]["payment_status"], "completed")
+        self.assertEqual(
+            response.data[0]["sales_person"]["profile"]["first_name"], "Kofi"
+        )
+
+
+class PaymentStatusTest(TestCase):
+    def setUp(self):
+        self.customer = UserAccount.objects.create_user(
+            email="ama@example.com", role="customer"
+        )
+        self.orders = [
+            Order.objects.create(
+                customer=self.customer, total_amount="20.00", shipping_address="Accra"
+            )
+            for _ in range(3)
+        ]
+
+    def test_payment_writes_update_order(self):
+        order = self.orders[0]
+        payment = Payment.objects.create(order=order, amount="20.00")
+        order.refresh_from_db()
+        self.assertEqual(order.payment_status, "pending")
+
+        payment.status = "completed"
+        payment.save()
+        order.refresh_from_db()
+        self.assertEqual(order.payment_status, "completed")
+
+        payment.delete()
+        order.refresh_from_db()
+        self.assertEqual(order.payment_status, "UNPAID")
+
+    def test_unpaid_orders(self):
+        Payment.objects.create(order=self.orders[0], amount="20.00", status="completed")
+        Payment.objects.create(order=self.orders[1], amount="20.00", status="failed")
+        self.assertEqual(APIClient().get("/api/orders/unpaid/").status_code, 401)
+        response = authenticated_client(self.customer).get("/api/orders/unpaid/")
+        self.assertEqual(response.status_code, 403)
+
+        sales_person = UserAccount.objects.create_user(
+            email="kofi@example.com", role="salesperson"
+        )
+        response = authenticated_client(sales_person).get("/api/orders/unpaid/")
+        self.assertEqual(
+            {order["id"] for order in response.data},
+            {str(self.orders[1].id), str(self.orders[2].id)},
+        )
+
+    def test_backfill(self):
+        Payment.objects.create(order=self.orders[0], amount="20.00", status="completed")
+        Order.objects.update(payment_status="UNPAID")
+        call_command("backfill_payment_status", batch_size=2, stdout=StringIO())
+        self.assertEqual(
+            sorted(Order.objects.values_list("payment_status", flat=True)),
+            ["UNPAID", "UNPAID", "completed"],
+        )
+
+
+class SoftDeleteTest(TestCase):
+    def setUp(self):
+        self.customer = UserAccount.objects.create_user(
+            email="ama@example.com", role="customer"
+        )
+        self.orders = [
+            Order.objects.create(
+                customer=self.customer, total_amount="20.00", shipping_address="Accra"
+            )
+            for _ in range(3)
+        ]
+
+    def test_deleted_orders_are_filtered_in_sql(self):
+        order = self.orders[0]
+        with self.assertNumQueries(1):
+            deleted, error = delete_order(order)
+        self.assertIsNone(error)
+        self.assertTrue(deleted.deleted)
+
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(Order.all_objects.count(), 3)
+        self.assertIsNone(get_order_by_id(order.id))
+        self.assertEqual(
+            set(get_orders_by_customer(self.customer.id)), set(self.orders[1:])
+        )
+
+        _, error = delete_order(order)
+        self.assertEqual(error, "Order has already been deleted.")
+
+
+class OrderFilterTest(TestCase):
+    def setUp(self):
+        self.sales_person = UserAccount.objects.create_user(
+            email="kofi@example.com", role="salesperson"
+        )
+        self.customers = [
+            UserAccount.objects.create_user(email=f"c{n}@example.com", role="customer")
+            for n in range(2)
+        ]
+        self.orders = []
+        for n in range(12):
+            order = Order.objects.create(
+                customer=self.customers[n % 2],
+                status="PENDING" if n % 3 else "DELIVERED",
+                order_type="OFFLINE" if n == 5 else "ONLINE",
+                total_amount="20.00",
+                shipping_address="Accra",
+            )
+            Order.objects.filter(id=order.id).update(
+                created_at=timezone.make_aware(datetime(2025, 3, 1 + n, 9))
+            )
+            self.orders.append(order)
+        self.client = authenticated_client(self.sales_person)
+
+    def ids(self, url):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [order["id"] for order in response.data["results"]]
+            url = response.data["next"]
+        return seen
+
+    def test_filters_and_pages_newest_first(self):
+        expected = [
+            str(order.id)
+            for n, order in reversed(list(enumerate(self.orders)))
+            if n % 3 and order.customer == self.customers[0]
+        ]
+        customer = self.customers[0].id
+        self.assertEqual(
+            self.ids(f"/api/orders/filter/?status=pending&customer={customer}&page_size=2"),
+            expected,
+        )
+        self.assertEqual(
+            self.ids(
+                "/api/orders/filter/?created_after=2025-03-03&created_before=2025-03-07"
+                "&order_type=ONLINE"
+            ),
+            [str(self.orders[n].id) for n in (4, 3, 2)],
+        )
+
+    def test_customers_only_see_their_own_orders(self):
+        self.client = authenticated_client(self.customers[1])
+        seen = self.ids(f"/api/orders/filter/?customer={self.customers[0].id}")
+        self.assertEqual(len(seen), 6)
+        self.assertEqual(
+            set(seen), {str(o.id) for o in self.orders if o.customer == self.customers[1]}
+        )
+
+    def test_invalid_filter_is_rejected(self):
+        response = self.client.get("/api/orders/filter/?created_after=yesterday")
+        self.assertEqual(response.status_code, 400)
+
+    def plan(self, queryset):
+        if connection.vendor == "postgresql":
+            # The test tables are tiny, which would make a sequential scan
+            # the cheapest plan; make the planner show its index choice.
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def test_listings_use_composite_indexes(self):
+        orders, _ = get_filtered_orders(QueryDict("status=PENDING"))
+        plan = self.plan(orders.order_by("-created_at", "-id")[:50])
+        self.assertIn("order_status_created_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+        orders, _ = get_filtered_orders(QueryDict(f"customer={self.customers[0].id}"))
+        plan = self.plan(orders.order_by("-created_at", "-id")[:50])
+        self.assertIn("order_customer_created_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+
+class BulkOrderStatusTest(TestCase):
+    def setUp(self):
+        self.customer = UserAccount.objects.create_user(
+            email="ama@example.com", role="customer"
+        )
+        self.sales_person = UserAccount.objects.create_user(
+            email="kofi@example.com", role="salesperson"
+        )
+        self.orders = Order.objects.bulk_create(
+            [
+                Order(
+                    customer=self.customer,
+                    status=order_status,
+                    total_amount="10.00",
+                    shipping_address="Accra",
+                )
+                for order_status in ("PROCESSING",) * 5 + ("DELIVERED", "PENDING")
+            ]
+        )
+
+    def update(self, user, updates):
+        return authenticated_client(user).post(
+            "/api/orders/update-status/", {"updates": updates}, format="json"
+        )
+
+    def test_transitions_are_applied_in_bulk(self):
+        *processing, delivered, pending = self.orders
+        updates = [{"order": str(order.id), "status": "delivered"} for order in processing]
+        updates += [
+            {"order": str(delivered.id), "status": "PENDING"},
+            {"order": str(pending.id), "status": "CANCELLED"},
+            {"order": str(pending.id), "status": "PROCESSING"},
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.update(self.sales_person, updates)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["updated"], response.data["rejected"]), (6, 2))
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]][-3:],
+            ["rejected", "updated", "rejected"],
+        )
+        updates_run = [
+            query for query in queries.captured_queries if query["sql"].startswith("UPDATE")
+        ]
+        self.assertEqual(len(updates_run), 2)
+
+        self.assertEqual(
+            set(Order.objects.values_list("status", flat=True)), {"DELIVERED", "CANCELLED"}
+        )
+        with CaptureQueriesContext(connection) as queries:
+            run_due_jobs()
+        inserts = [
+            query
+            for query in queries.captured_queries
+            if query["sql"].startswith('INSERT INTO "notifications_')
+        ]
+        self.assertEqual(len(inserts), 4)
+        self.assertEqual(SalesPersonNotification.objects.count(), 6)
+        self.assertEqual(CustomerNotification.objects.filter(customer=self.customer).count(), 6)
+        self.assertTrue(
+            SalesPersonNotification.objects.filter(content__contains="cancelled").exists()
+        )
+
+    def test_cancelled_items_go_back_in_stock(self):
+        category = ProductCategory.objects.create(name="Analgesics")
+        product = Product.objects.create(
+            name="Paracetamol", description="", price="5.00", stock=4, category=category
+        )
+        order = self.orders[0]
+        OrderItem.objects.create(order=order, product=product, quantity=3, amount="5.00")
+
+        response = self.update(
+            self.sales_person, [{"order": str(order.id), "status": "CANCELLED"}]
+        )
+        self.assertEqual(response.data["updated"], 1)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 7)
+        self.assertEqual(StockMovement.objects.get(kind="CANCELLATION").quantity, 3)
+
+        # Cancelled orders are final, so the stock can't be returned twice.
+        response = self.update(
+            self.sales_person, [{"order": str(order.id), "status": "PENDING"}]
+        )
+        self.assertEqual(response.data["rejected"], 1)
+
+    def test_malformed_and_non_canonical_order_ids(self):
+        order = self.orders[0]
+        response = self.update(
+            self.sales_person,
+            [
+                {"order": 7, "status": "DELIVERED"},
+                {"order": [str(order.id)], "status": "DELIVERED"},
+                {"order": str(order.id).upper(), "status": "DELIVERED"},
+            ],
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["rejected", "rejected", "updated"],
+        )
+        order.refresh_from_db()
+        self.assertEqual(order.status, "DELIVERED")
+
+    def test_single_update_follows_the_same_transitions(self):
+        client = authenticated_client(self.sales_person)
+        delivered = self.orders[5]
+        response = client.put(
+            f"/api/orders/{delivered.id}/update-status/", {"status": "CANCELLED"}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_customers_cannot_update(self):
+        response = self.update(
+            self.customer, [{"order": str(self.orders[0].id), "status": "DELIVERED"}]
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class OrderExportTest(TestCase):
+    def setUp(self):
+        self.customer = UserAccount.objects.create_user(
+            email="ama@example.com", role="customer"
+        )
+        self.sales_person = UserAccount.objects.create_user(
+            email="kofi@example.com", role="salesperson"
+        )
+        category = ProductCategory.objects.create(name="Analgesics")
+        product = Product.objects.create(
+            name="Paracetamol, 500mg", description="", price="5.00", stock=10, category=category
+        )
+        self.orders = []
+        for day, quantities in ((1, [1, 2]), (2, []), (3, [4])):
+            order = Order.objects.create(
+                customer=self.customer,
+                total_amount=5 * sum(quantities),
+                shipping_address="Accra",
+                created_at=datetime(2026, 3, day, 12, tzinfo=dt_timezone.utc),
+            )
+            OrderItem.objects.bulk_create(
+                [
+                    OrderItem(order=order, product=product, quantity=quantity, amount="5.00")
+                    for quantity in quantities
+                ]
+            )
+            self.orders.append(order)
+
+    def export(self, **params):
+        client = authenticated_client(self.sales_person)
+        response = client.get("/api/orders/export/", params)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_has_a_row_per_item(self):
+        rows = list(csv.DictReader(StringIO(self.export(end="2026-03-03"))))
+        self.assertEqual(
+            [(row["order_id"], row["quantity"]) for row in rows],
+            [
+                (str(self.orders[0].id), "1"),
+                (str(self.orders[0].id), "2"),
+                (str(self.orders[1].id), ""),
+            ],
+        )
+        self.assertEqual(rows[0]["product_name"], "Paracetamol, 500mg")
+        self.assertEqual(rows[0]["customer_email"], "ama@example.com")
+
+    def test_ndjson_and_command(self):
+        lines = self.export(start="2026-03-02", file_format="ndjson").splitlines()
+        self.assertEqual(
+            [json.loads(line)["order_id"] for line in lines],
+            [str(self.orders[1].id), str(self.orders[2].id)],
+        )
+        self.assertEqual(json.loads(lines[1])["amount"], "5.00")
+
+        output = StringIO()
+        call_command(
+            "export_orders", "--format=ndjson", "--start=2026-03-03", stdout=output, stderr=StringIO()
+        )
+        self.assertEqual(json.loads(output.getvalue())["quantity"], 4)
+
+    def test_customers_cannot_export(self):
+        response = authenticated_client(self.customer).get("/api/orders/export/")
+        self.assertEqual(response.status_code, 403)
+
+
+class OrderArchiveTest(TestCase):
+    def setUp(self):
+        get_in_store_customer_id.cache_clear()
+        self.customer = UserAccount.objects.create_user(
+            email="customer@venella.com", role="customer"
+        )
+        category = ProductCategory.objects.create(name="Analgesics")
+        self.product = Product.objects.create(
+            name="Paracetamol", description="", price="5.00", stock=10, category=category
+        )
+        old = timezone.now() - timedelta(days=400)
+        self.old_delivered, self.old_pending, self.new_delivered = [
+            self.create_order(status, created_at)
+            for status, created_at in (
+                ("DELIVERED", old),
+                ("PENDING", old + timedelta(hours=1)),
+                ("DELIVERED", timezone.now()),
+            )
+        ]
+        Payment.objects.create(
+            order=self.old_delivered, amount="10.00", status="completed", transaction_id="T1"
+        )
+
+    def tearDown(self):
+        get_in_store_customer_id.cache_clear()
+
+    def create_order(self, status, created_at):
+        order = Order.objects.create(
+            customer=self.customer,
+            status=status,
+            total_amount="10.00",
+            shipping_address="Accra",
+            created_at=created_at,
+            client_reference=f"till/{status}/{created_at:%Y}",
+        )
+        OrderItem.objects.create(order=order, product=self.product, quantity=2, amount="5.00")
+        return order
+
+    def test_old_finished_orders_move_to_the_archive(self):
+        output = StringIO()
+        call_command("archive_orders", "--batch-size=1", stdout=output)
+        self.assertIn("Archived 1 orders", output.getvalue())
+
+        self.assertEqual(
+            set(Order.all_objects.values_list("id", flat=True)),
+            {self.old_pending.id, self.new_delivered.id},
+        )
+        archived = ArchivedOrder.objects.get()
+        self.assertEqual(archived.id, self.old_delivered.id)
+        self.assertEqual(archived.created_at, self.old_delivered.created_at)
+        self.assertEqual(archived.payment_status, "completed")
+        self.assertEqual(archived.items.get().quantity, 2)
+        self.assertEqual(archived.payments.get().transaction_id, "T1")
+        self.assertFalse(Payment.objects.exists())
+
+    def test_archived_orders_are_still_read(self):
+        archive_orders()
+        response = APIClient().get(f"/api/orders/{self.old_delivered.id}/retrieve/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["order_items"][0]["product"]["name"], "Paracetamol")
+        self.assertEqual(
+            [row["order_id"] for row in export_rows()],
+            [self.old_delivered.id, self.old_pending.id, self.new_delivered.id],
+        )
 
-# Create your tests here.
+        reference = self.old_delivered.client_reference
+        results, _ = sync_offline_sales(
+            [
+                {
+                    "client_reference": reference,
+                    "sold_at": "2025-01-01T10:00:00Z",
+                    "products": [{"product": str(self.product.id), "quantity": 1}],
+                }
+            ]
+        )
+        self.assertEqual(results[0]["status"], "duplicate")
@@ -8,6 +8,10 @@ urlpatterns = [
         "<str:order_id>/update-status/",
         OrderViewSet.as_view({"put": "update_order_status"}),
     ),
+    path(
+        "update-status/",
+        OrderViewSet.as_view({"post": "bulk_update_order_status"}),
+    ),
     path(
         "<str:order_id>/delete/",
         OrderViewSet.as_view({"delete": "delete_order"}),
@@ -15,6 +19,10 @@ urlpatterns = [
     path("customer/orders/", OrderViewSet.as_view({"get": "list_customer_orders"})),
     path("create/", OrderViewSet.as_view({"post": "create_order"})),
     path("sell/", OrderViewSet.as_view({"post": "sell_in_store"})),
+    path("sell/sync/", OrderViewSet.as_view({"post": "sync_offline_sales"})),
     path("pending/", OrderViewSet.as_view({"get": "list_pending_orders"})),
     path("processing/", OrderViewSet.as_view({"get": "list_processing_orders"})),
+    path("filter/", OrderViewSet.as_view({"get": "filter_orders"})),
+    path("export/", OrderViewSet.as_view({"get": "export_orders"})),
+    path("unpaid/", OrderViewSet.as_view({"get": "list_unpaid_orders"})),
 ]
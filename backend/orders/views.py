@@ -1,16 +1,17 @@
 import requests
+from collections import Counter
+from django.http import StreamingHttpResponse
 from django.shortcuts import redirect
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from core.utils.general import get_user_from_jwttoken, validate_posted_data
+from core.utils.idempotency import idempotent
+from core.utils.pagination import KeysetPagination
+from orders.exports import EXPORT_FORMATS, export_lines, export_rows
 from orders.selectors import *
 from orders.services import *
 from carts.selectors import *
 from carts.services import clear_cart
-from notifications.services import (
-    create_customer_notification,
-    create_salesperson_notification,
-)
 from payments.services import initiate_payment
 from documentations.orders import *
 
@@ -24,7 +25,7 @@ class OrderViewSet(viewsets.ViewSet):
 
     @retrieve_order_schema
     def retrieve_order(self, request, order_id):
-        order = get_order_by_id(order_id)
+        order = get_order_details(order_id)
         if not order:
             context = {"detail": "Order not found."}
             return Response(context, status=status.HTTP_404_NOT_FOUND)
@@ -39,13 +40,12 @@ class OrderViewSet(viewsets.ViewSet):
             context = {"detail": "Authentication credentials were not provided."}
             return Response(context, status=status.HTTP_401_UNAUTHORIZED)
 
-        orders = [
-            order for order in get_orders_by_customer(user.id) if not order.deleted
-        ]
+        orders = get_orders_by_customer(user.id)
         context = order_representation(request, orders, many=True)
         return Response(context, status=status.HTTP_200_OK)
 
     @create_order_schema
+    @idempotent("orders.create")
     def create_order(self, request):
         user = get_user_from_jwttoken(request)
         if not user:
@@ -76,77 +76,20 @@ class OrderViewSet(viewsets.ViewSet):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        cart_items = get_cart_items(cart.id)
+        cart_items = list(get_cart_items(cart.id).select_related("product"))
         if not cart_items:
             return Response(
                 {"detail": "Cart is empty."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        order_items = [
-            {
-                "product": item.product.id,
-                "quantity": item.quantity,
-                "amount": item.product.price,
-            }
-            for item in cart_items
-        ]
-        data["order_items"] = order_items
-        data["total_amount"] = sum(
-            item["quantity"] * item["amount"] for item in order_items
-        )
-
-        order_data, errors = create_order(data)
-        if not order_data:
-            return Response(
-                {"detail": errors},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        order = get_order_by_id(order_data["id"])
+        order, errors = checkout(cart, cart_items, data)
         if not order:
-            return Response(
-                {"detail": "Order creation failed."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        order_items_payload = {"order": order.id, "order_items": order_items}
-        order_items_data, errors = create_order_items(order_items_payload)
-        if not order_items_data:
             return Response(
                 {"detail": errors},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Update product stock
-        for item in order_items:
-            product = get_product_by_id(item["product"])
-            if product:
-                product.stock -= item["quantity"]
-                product.save()
-
-                # Check for low stock after reducing inventory
-                from products.services import check_and_send_low_stock_notification
-
-                check_and_send_low_stock_notification(product)
-
-        # Clear the cart after order creation
-        clear_cart(cart.id)
-
-        create_customer_notification(
-            {
-                "customer": user.id,
-                "type": "NEW_ORDER",
-                "content": f"Your order #{order.id} has been placed successfully and waiting to be processed. Thank you for shopping with us!",
-            }
-        )
-        create_salesperson_notification(
-            {
-                "type": "NEW_ORDER",
-                "content": f"A new order #{order.id} has been placed by {user.email}.",
-            }
-        )
-
         # Redirect to payment page if payment details are provided
         payment_details = data.get("payment_details")
 
@@ -160,6 +103,7 @@ class OrderViewSet(viewsets.ViewSet):
         return Response(payment, status=status.HTTP_201_CREATED)
 
     @sell_product_schema
+    @idempotent("orders.sell")
     def sell_in_store(self, request):
         user = get_user_from_jwttoken(request)
         if not user:
@@ -177,23 +121,36 @@ class OrderViewSet(viewsets.ViewSet):
         if not sale:
             return Response({"detail": errors}, status=status.HTTP_400_BAD_REQUEST)
 
-        order = get_order_by_id(sale["id"])
+        context = {
+            "detail": "Sale processed successfully.",
+            "sale": order_representation(request, get_order_details(sale.id)),
+        }
+        return Response(context, status=status.HTTP_200_OK)
 
-        # Update product stock
-        for item in data.get("products"):
-            product = get_product_by_id(item["product"])
-            if product:
-                product.stock -= item["quantity"]
-                product.save()
+    @sync_offline_sales_schema
+    def sync_offline_sales(self, request):
+        user = get_user_from_jwttoken(request)
+        if not user:
+            return Response(
+                {"detail": "Authentication credentials were not provided."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
 
-                # Check for low stock after reducing inventory
-                from products.services import check_and_send_low_stock_notification
+        data = request.data
+        err, errors = validate_posted_data(data, ["sales"])
+        if err:
+            return Response({"detail": errors}, status=status.HTTP_400_BAD_REQUEST)
 
-                check_and_send_low_stock_notification(product)
+        results, errors = sync_offline_sales(data.get("sales"))
+        if errors:
+            return Response({"detail": errors}, status=status.HTTP_400_BAD_REQUEST)
 
+        counts = Counter(result["status"] for result in results)
         context = {
-            "detail": "Sale processed successfully.",
-            "sale": order_representation(request, order),
+            "created": counts["created"],
+            "duplicate": counts["duplicate"],
+            "rejected": counts["rejected"],
+            "results": results,
         }
         return Response(context, status=status.HTTP_200_OK)
 
@@ -210,6 +167,86 @@ class OrderViewSet(viewsets.ViewSet):
         context = order_representation(request, orders, many=True)
         return Response(context, status=status.HTTP_200_OK)
 
+    @filter_orders_schema
+    def filter_orders(self, request):
+        user = get_user_from_jwttoken(request)
+        if not user:
+            return Response(
+                {"detail": "Authentication credentials were not provided."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        params = request.query_params
+        if user.role == "customer":
+            # Customers only ever see their own orders.
+            params = params.copy()
+            params["customer"] = str(user.id)
+
+        orders, errors = get_filtered_orders(params)
+        if errors:
+            return Response({"detail": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        paginator = KeysetPagination(ordering=("-created_at", "-id"))
+        page = paginator.paginate_queryset(orders, request, view=self)
+        context = order_representation(request, page, many=True)
+        return paginator.get_paginated_response(context)
+
+    @export_orders_schema
+    def export_orders(self, request):
+        user = get_user_from_jwttoken(request)
+        if not user:
+            return Response(
+                {"detail": "Authentication credentials were not provided."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+        if user.role == "customer":
+            return Response(
+                {"detail": "You do not have permission to export orders."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        params = request.query_params
+        # Not `format`, which DRF reserves for choosing a renderer.
+        export_format = params.get("file_format", "csv")
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {"detail": f"file_format must be one of {', '.join(EXPORT_FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        moments = {}
+        for name in ("start", "end"):
+            moments[name] = params.get(name) and parse_moment(params[name])
+            if params.get(name) and not moments[name]:
+                return Response(
+                    {"detail": f"{name} must be an ISO 8601 date or datetime."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        response = StreamingHttpResponse(
+            export_lines(export_rows(moments["start"], moments["end"]), export_format),
+            content_type=EXPORT_FORMATS[export_format],
+        )
+        response["Content-Disposition"] = f'attachment; filename="orders.{export_format}"'
+        return response
+
+    @list_unpaid_orders_schema
+    def list_unpaid_orders(self, request):
+        user = get_user_from_jwttoken(request)
+        if not user:
+            return Response(
+                {"detail": "Authentication credentials were not provided."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+        if user.role == "customer":
+            return Response(
+                {"detail": "You do not have permission to list unpaid orders."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        orders = get_unpaid_orders()
+        context = order_representation(request, orders, many=True)
+        return Response(context, status=status.HTTP_200_OK)
+
     @update_order_status_schema
     def update_order_status(self, request, order_id):
         """Update the status of an order."""
@@ -227,61 +264,48 @@ class OrderViewSet(viewsets.ViewSet):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        data = request.data
-        new_status = data.get("status").strip().upper()
-        if new_status not in dict(order.ORDER_STATUS_CHOICES).keys():
+        results, _ = bulk_update_order_status(
+            [{"order": str(order.id), "status": request.data.get("status")}]
+        )
+        if results[0]["status"] == "rejected":
             return Response(
-                {"detail": "Invalid status provided."},
-                status=status.HTTP_400_BAD_REQUEST,
+                {"detail": results[0]["errors"][0]}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        order.status = new_status
-        order.save()
+        order.refresh_from_db()
+        context = order_representation(request, order)
+        return Response(context, status=status.HTTP_200_OK)
 
-        if new_status == "PROCESSING":
-            create_salesperson_notification(
-                {
-                    "type": "ORDER_STATUS_UPDATE",
-                    "content": f"Order #{order.id} is now being processed.",
-                }
-            )
-            create_customer_notification(
-                {
-                    "customer": order.customer.id,
-                    "type": "ORDER_STATUS_UPDATE",
-                    "content": f"Your order #{order.id} is now being processed.",
-                }
-            )
-        elif new_status == "DELIVERED":
-            create_salesperson_notification(
-                {
-                    "type": "ORDER_STATUS_UPDATE",
-                    "content": f"Order #{order.id} has been delivered.",
-                }
-            )
-            create_customer_notification(
-                {
-                    "customer": order.customer.id,
-                    "type": "ORDER_STATUS_UPDATE",
-                    "content": f"Your order #{order.id} has been delivered. Thank you for shopping with us!",
-                }
-            )
-        elif new_status == "CANCELLED":
-            create_salesperson_notification(
-                {
-                    "type": "ORDER_STATUS_UPDATE",
-                    "content": f"Order #{order.id} has been cancelled.",
-                }
+    @bulk_update_order_status_schema
+    def bulk_update_order_status(self, request):
+        """Move many orders to new statuses at once."""
+        user = get_user_from_jwttoken(request)
+        if not user:
+            return Response(
+                {"detail": "Authentication credentials were not provided."},
+                status=status.HTTP_401_UNAUTHORIZED,
             )
-            create_customer_notification(
-                {
-                    "customer": order.customer.id,
-                    "type": "ORDER_STATUS_UPDATE",
-                    "content": f"Your order #{order.id} has been cancelled. We apologize for the inconvenience.",
-                }
+        if user.role == "customer":
+            return Response(
+                {"detail": "You do not have permission to update orders."},
+                status=status.HTTP_403_FORBIDDEN,
             )
 
-        context = order_representation(request, order)
+        data = request.data
+        err, errors = validate_posted_data(data, ["updates"])
+        if err:
+            return Response({"detail": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        results, errors = bulk_update_order_status(data.get("updates"))
+        if errors:
+            return Response({"detail": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        counts = Counter(result["status"] for result in results)
+        context = {
+            "updated": counts["updated"],
+            "rejected": counts["rejected"],
+            "results": results,
+        }
         return Response(context, status=status.HTTP_200_OK)
 
     @delete_order_schema
@@ -294,7 +318,7 @@ class OrderViewSet(viewsets.ViewSet):
                 status=status.HTTP_401_UNAUTHORIZED,
             )
 
-        order = get_order_by_id(order_id)
+        order = get_order_by_id(order_id, include_deleted=True)
         if not order:
             return Response(
                 {"detail": "Order not found."},
@@ -1,6 +1,8 @@
 from uuid import uuid4
 from django.db import models
-from orders.models import Order
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from orders.models import ArchivedOrder, Order
 
 
 class PaymentMethod(models.Model):
@@ -49,3 +51,32 @@ class Payment(models.Model):
 
     def __str__(self):
         return f"Payment {self.id} for Order {self.order.id}"
+
+
+class ArchivedPayment(models.Model):
+    """A payment of an ArchivedOrder, moved along with it."""
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    order = models.ForeignKey(
+        ArchivedOrder, on_delete=models.CASCADE, related_name="payments"
+    )
+    payment_method = models.ForeignKey(
+        PaymentMethod, on_delete=models.SET_NULL, related_name="+", null=True, blank=True
+    )
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3)
+    status = models.CharField(max_length=20)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    transaction_id = models.CharField(max_length=100, null=True, blank=True, db_index=True)
+
+    def __str__(self):
+        return f"Archived payment {self.id} for Order {self.order_id}"
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def update_order_payment_status(sender, instance, **kwargs):
+    from orders.services import refresh_payment_status
+
+    refresh_payment_status(Order.all_objects.filter(id=instance.order_id))
@@ -1,6 +1,7 @@
 from rest_framework.response import Response
 from rest_framework import status, viewsets
 from .selectors import *
+from core.utils.idempotency import idempotent
 from .services import initiate_payment, verify_payment
 from documentations.payments import initiate_payment_schema, verify_payment_schema
 
@@ -8,6 +9,7 @@ from documentations.payments import initiate_payment_schema, verify_payment_sche
 class PaymentViewSet(viewsets.ViewSet):
 
     @initiate_payment_schema
+    @idempotent("payments.initialize")
     def initialize_payment(self, request, order_id):
         """
         Initialize a payment for an order.
@@ -1,7 +1,39 @@
 from django.contrib import admin
-from products.models import Product, ProductCategory, ProductImage
+from products.models import Product, ProductCategory, ProductImage, StockMovement
+
+
+@admin.register(Product)
+class ProductAdmin(admin.ModelAdmin):
+    def get_readonly_fields(self, request, obj=None):
+        # Stock changes have to land in the movement ledger with a reason,
+        # so existing products are restocked through the stock endpoint.
+        if obj is None:
+            return ["reserved"]
+        return ["stock", "reserved", "stock_adjustments"]
+
+    @admin.display(description="Stock adjustments")
+    def stock_adjustments(self, obj):
+        return (
+            f"POST /api/products/{obj.pk}/stock/ with a quantity, kind and note; "
+            "the change is recorded in the stock ledger."
+        )
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    """The ledger is append-only; movements are recorded by the services."""
+
+    list_display = ["product", "kind", "quantity", "created_at"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
-admin.site.register(Product)
 admin.site.register(ProductCategory)
 admin.site.register(ProductImage)
@@ -0,0 +1,136 @@
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from jobs.services import enqueue
+from products.models import Product, ProductStockAlert
+
+
+def is_low(stock, threshold) -> bool:
+    return stock is not None and stock <= threshold
+
+
+def queue_low_stock_alert(product: Product, previous_stock=None, previous_threshold=None):
+    """
+    Queue a low-stock alert for `product` if this write took its stock from
+    above its threshold to at or below it. New products (no previous stock)
+    are alerted when they start out low.
+    """
+    if not is_low(product.stock, product.low_stock_threshold):
+        return
+    if previous_threshold is None:
+        previous_threshold = product.low_stock_threshold
+    if previous_stock is not None and is_low(previous_stock, previous_threshold):
+        return
+    queue_low_stock_alerts([product])
+
+
+class AlertBatch(dict):
+    """Products waiting for the current transaction to commit, by id."""
+
+    sent = False
+
+    def __call__(self):
+        # Registered once per queue_low_stock_alerts call; the first
+        # callback to run sends the whole batch.
+        if self.sent:
+            return
+        self.sent = True
+        enqueue(
+            "products.send_low_stock_alerts",
+            {"product_ids": [str(pk) for pk in self]},
+        )
+
+
+# The unsent batch of each thread's connections, by database alias.
+_pending = threading.local()
+
+
+def queue_low_stock_alerts(products):
+    """
+    Alert the sales persons about `products` from a background job queued
+    when the current transaction commits. Everything queued in one
+    transaction is sent as one batch, so a checkout that saves a product
+    several times alerts about it once.
+    """
+    products = {product.pk: product for product in products}
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        transaction.on_commit(AlertBatch(products))
+        return
+
+    batch = getattr(_pending, connection.alias, None)
+    if batch is None or batch.sent:
+        batch = AlertBatch()
+        setattr(_pending, connection.alias, batch)
+    batch.update(products)
+    # A batch left behind by a rolled back transaction is sent with this
+    # one, and send_low_stock_alerts skips the products that aren't low.
+    transaction.on_commit(batch)
+
+
+def send_low_stock_alerts(products: list):
+    """
+    Alert the sales persons about `products`, skipping those no longer low
+    on stock and those alerted within the last
+    LOW_STOCK_ALERT_SUPPRESSION_HOURS. Returns the products alerted.
+    """
+    from notifications.services import bulk_create_salesperson_notifications
+
+    now = timezone.now()
+    cutoff = now - timedelta(hours=settings.LOW_STOCK_ALERT_SUPPRESSION_HOURS)
+    by_id = {
+        product.pk: product
+        for product in products
+        if is_low(product.stock, product.low_stock_threshold)
+    }
+    if not by_id:
+        return []
+
+    with transaction.atomic():
+        ProductStockAlert.objects.bulk_create(
+            [ProductStockAlert(product_id=pk) for pk in by_id], ignore_conflicts=True
+        )
+        # Locking the alert rows makes concurrent flushes for the same
+        # product agree on which of them sends the alert.
+        due = list(
+            ProductStockAlert.objects.select_for_update()
+            .filter(product_id__in=list(by_id))
+            .filter(Q(alerted_at__isnull=True) | Q(alerted_at__lt=cutoff))
+            .values_list("product_id", flat=True)
+        )
+        if not due:
+            return []
+        ProductStockAlert.objects.filter(product_id__in=due).update(alerted_at=now)
+
+        alerted = sorted((by_id[pk] for pk in due), key=lambda product: product.name)
+        bulk_create_salesperson_notifications(alert_notifications(alerted))
+    return alerted
+
+
+def alert_notifications(products: list) -> list:
+    digest_size = settings.LOW_STOCK_ALERT_DIGEST_SIZE
+    if len(products) <= digest_size:
+        return [
+            {
+                "type": "PRODUCT_STOCK_ALERT",
+                "content": f"Low Stock Alert: {product.name} has only {product.stock} "
+                "units remaining. Please restock soon.",
+            }
+            for product in products
+        ]
+
+    # A large batch (e.g. an import) becomes one notification listing them.
+    listed = ", ".join(f"{p.name} ({p.stock})" for p in products[:digest_size])
+    more = len(products) - digest_size
+    return [
+        {
+            "type": "PRODUCT_STOCK_ALERT",
+            "content": f"Low Stock Alert: {len(products)} products are running low: "
+            f"{listed} and {more} more. Please restock soon.",
+        }
+    ]
@@ -0,0 +1,119 @@
+import hashlib, threading, time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpRequest
+
+
+VERSION_KEY = "catalog:version"
+STATS_KEY = "catalog:stats:{}"
+STATS = ("hits", "misses", "coalesced")
+
+# Requests in the same process that miss on the same key queue up on one of
+# these locks instead of all rebuilding the payload.
+_locks = [threading.Lock() for _ in range(64)]
+
+
+def get_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def catalog_version() -> int:
+    """
+    Current catalog version. Every cached catalog payload is keyed by it, so
+    bumping the version invalidates all of them at once.
+    """
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seed from the clock rather than 1 so that a version key evicted from
+        # the cache can never come back as a version older payloads still use.
+        cache.add(VERSION_KEY, time.time_ns() // 1000, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    cache = get_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        catalog_version()
+
+
+def catalog_cache_stats() -> dict:
+    cache = get_cache()
+    counts = cache.get_many([STATS_KEY.format(name) for name in STATS])
+    stats = {name: counts.get(STATS_KEY.format(name), 0) for name in STATS}
+    stats["version"] = catalog_version()
+    return stats
+
+
+def _count(name: str):
+    cache = get_cache()
+    key = STATS_KEY.format(name)
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, timeout=None)
+
+
+def request_key(request: HttpRequest) -> str:
+    """
+    Cache key fragment for a request: the host (pagination links are
+    absolute) and its query parameters in a stable order.
+    """
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+    )
+    return f"{request.get_host()}?{params}"
+
+
+def cached_catalog_payload(name: str, key: str, build):
+    """
+    Return the payload cached under `name`/`key` for the current catalog
+    version, calling `build()` to produce and store it on a miss.
+
+    Concurrent misses on the same key are coalesced: threads of this process
+    wait on a lock, other processes wait on a short-lived lock key in the
+    cache, and only the holder runs `build()`. Payloads that are None (e.g.
+    a missing product) are returned but not cached.
+    """
+    cache = get_cache()
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    cache_key = f"catalog:{catalog_version()}:{name}:{digest}"
+
+    payload = cache.get(cache_key)
+    if payload is not None:
+        _count("hits")
+        return payload
+
+    _count("misses")
+    with _locks[hash(cache_key) % len(_locks)]:
+        payload = cache.get(cache_key)
+        if payload is not None:
+            _count("coalesced")
+            return payload
+
+        lock_key = f"{cache_key}:lock"
+        timeout = settings.CATALOG_CACHE_LOCK_TIMEOUT
+        if not cache.add(lock_key, 1, timeout=timeout):
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                payload = cache.get(cache_key)
+                if payload is not None:
+                    _count("coalesced")
+                    return payload
+            # The other builder died or is too slow; build it ourselves.
+
+        try:
+            payload = build()
+            if payload is not None:
+                cache.set(cache_key, payload, timeout=settings.CATALOG_CACHE_TIMEOUT)
+        finally:
+            cache.delete(lock_key)
+    return payload
@@ -0,0 +1,172 @@
+from collections import Counter
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from core.utils.general import valid_uuid
+from products.models import Product, ProductCategory, ProductFacetCount
+
+
+# Upper bounds of the price bands, in cedis. Changing them needs a
+# `rebuild_facet_counts` so the stored counts use the new bands.
+PRICE_BANDS = (10, 25, 50, 100)
+
+FACETS = ("category", "brand", "price", "availability")
+AVAILABILITY = ("in_stock", "out_of_stock")
+
+
+def price_band(price) -> str:
+    lower = 0
+    for upper in PRICE_BANDS:
+        if Decimal(price) < upper:
+            return f"{lower}-{upper}"
+        lower = upper
+    return f"{lower}+"
+
+
+def price_bands() -> list:
+    bounds = (0,) + PRICE_BANDS
+    return [f"{lower}-{upper}" for lower, upper in zip(bounds, PRICE_BANDS)] + [
+        f"{PRICE_BANDS[-1]}+"
+    ]
+
+
+def facet_values(category_id, brand, price, stock) -> list:
+    """The (facet, value) pairs a product with these fields is counted under."""
+    return [
+        ("category", str(category_id)),
+        ("brand", brand or ""),
+        ("price", price_band(price)),
+        ("availability", "in_stock" if stock > 0 else "out_of_stock"),
+    ]
+
+
+def product_facet_values(product: Product) -> list:
+    return facet_values(product.category_id, product.brand, product.price, product.stock)
+
+
+def adjust_facet_counts(removed=(), added=()):
+    """
+    Move products between facet values: every pair in `removed` loses one
+    product and every pair in `added` gains one. Pairs on both sides cancel
+    out, so saving a product without touching its facets writes nothing.
+    """
+    delta = Counter(added)
+    delta.subtract(Counter(removed))
+    delta = {pair: count for pair, count in delta.items() if count}
+    if not delta:
+        return
+
+    ProductFacetCount.objects.bulk_create(
+        [ProductFacetCount(facet=facet, value=value) for facet, value in delta],
+        ignore_conflicts=True,
+    )
+    # One UPDATE per distinct change, which is usually +1 and -1.
+    by_count = {}
+    for pair, count in delta.items():
+        by_count.setdefault(count, []).append(pair)
+    for count, pairs in by_count.items():
+        condition = Q()
+        for facet, value in pairs:
+            condition |= Q(facet=facet, value=value)
+        ProductFacetCount.objects.filter(condition).update(count=F("count") + count)
+
+
+def rebuild_facet_counts():
+    """Recount every facet from the products table."""
+    counts = Counter()
+    for row in Product.objects.values("category_id", "brand", "price", "stock").annotate(
+        products=Count("id")
+    ).order_by():
+        for pair in facet_values(row["category_id"], row["brand"], row["price"], row["stock"]):
+            counts[pair] += row["products"]
+
+    with transaction.atomic():
+        ProductFacetCount.objects.all().delete()
+        ProductFacetCount.objects.bulk_create(
+            [
+                ProductFacetCount(facet=facet, value=value, count=count)
+                for (facet, value), count in counts.items()
+            ],
+            batch_size=1000,
+        )
+
+
+def apply_product_filters(queryset, params):
+    """
+    Narrow `queryset` to the facet values selected in `params`. Several
+    values of one facet (?brand=a&brand=b) match either; different facets
+    must all match. Returns the queryset and a list of errors.
+    """
+    if categories := params.getlist("category"):
+        if not all(valid_uuid(category) for category in categories):
+            return queryset, ["category must be a category ID."]
+        queryset = queryset.filter(category_id__in=categories)
+    if brands := params.getlist("brand"):
+        condition = Q(brand__in=[brand for brand in brands if brand])
+        if "" in brands:
+            condition |= Q(brand__isnull=True) | Q(brand="")
+        queryset = queryset.filter(condition)
+    if bands := params.getlist("price"):
+        if not set(bands) <= set(price_bands()):
+            return queryset, [f"price must be one of {', '.join(price_bands())}."]
+        condition = Q()
+        for band in bands:
+            condition |= price_condition(band)
+        queryset = queryset.filter(condition)
+    if availability := params.getlist("availability"):
+        if not set(availability) <= set(AVAILABILITY):
+            return queryset, [f"availability must be one of {', '.join(AVAILABILITY)}."]
+        condition = Q()
+        if "in_stock" in availability:
+            condition |= Q(stock__gt=0)
+        if "out_of_stock" in availability:
+            condition |= Q(stock__lte=0)
+        queryset = queryset.filter(condition)
+    return queryset, []
+
+
+def price_condition(band: str) -> Q:
+    lower, _, upper = band.rstrip("+").partition("-")
+    condition = Q(price__gte=lower)
+    if upper:
+        condition &= Q(price__lt=upper)
+    return condition
+
+
+def get_facet_counts() -> dict:
+    """
+    Number of products under every value of every facet, read from the
+    precomputed ProductFacetCount table.
+    """
+    rows = ProductFacetCount.objects.filter(count__gt=0).values_list(
+        "facet", "value", "count"
+    )
+    counts = {facet: {} for facet in FACETS}
+    for facet, value, count in rows:
+        counts.setdefault(facet, {})[value] = count
+
+    labels = {
+        str(id): name
+        for id, name in ProductCategory.objects.filter(
+            id__in=list(counts["category"])
+        ).values_list("id", "name")
+    }
+    order = {
+        "category": sorted(counts["category"], key=lambda value: labels.get(value, "")),
+        "brand": sorted(counts["brand"]),
+        "price": [band for band in price_bands() if band in counts["price"]],
+        "availability": [value for value in AVAILABILITY if value in counts["availability"]],
+    }
+    return {
+        facet: [
+            {
+                "value": value,
+                "label": labels.get(value, value) if facet == "category" else value,
+                "count": counts[facet][value],
+            }
+            for value in order[facet]
+        ]
+        for facet in FACETS
+    }
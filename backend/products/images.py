@@ -0,0 +1,125 @@
+import logging, os, threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+from products.models import ProductImage
+from products.storage import release_blobs, retain_blobs
+
+
+logger = logging.getLogger(__name__)
+
+# field name -> (bounding box, Pillow format, file extension)
+VARIANTS = {
+    "thumbnail": ((200, 200), "JPEG", "jpg"),
+    "medium": ((800, 800), "JPEG", "jpg"),
+    "webp": ((800, 800), "WEBP", "webp"),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(settings.IMAGE_VARIANT_QUEUE_SIZE)
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_VARIANT_WORKERS,
+                thread_name_prefix="image-variants",
+            )
+    return _executor
+
+
+def schedule_image_variants(image_ids, wait: bool = False):
+    """
+    Generate the variants of `image_ids` on the worker pool once the current
+    transaction commits.
+
+    At most IMAGE_VARIANT_QUEUE_SIZE images are queued at a time. When the
+    queue is full, requests skip the image rather than block (the
+    generate_image_variants command picks it up later); batch jobs pass
+    `wait=True` to block until a slot frees up instead.
+    """
+    image_ids = list(image_ids)
+
+    def submit():
+        executor = get_executor()
+        for image_id in image_ids:
+            if not _slots.acquire(blocking=wait):
+                logger.warning("Image variant queue is full, skipping %s", image_id)
+                continue
+            executor.submit(_run, image_id)
+
+    transaction.on_commit(submit)
+
+
+def _run(image_id):
+    try:
+        generate_image_variants(image_id)
+    except Exception:
+        logger.exception("Could not generate variants for image %s", image_id)
+    finally:
+        _slots.release()
+        connection.close()
+
+
+def generate_image_variants(image_id, reuse: bool = True):
+    """
+    Render and store every variant of one product image. Images are stored
+    by content, so when another product already uses the same file its
+    variants are reused instead of rendered again (unless `reuse` is False).
+    """
+    image = ProductImage.objects.filter(pk=image_id).first()
+    if not image or not image.image:
+        return
+
+    sibling = None
+    if reuse:
+        sibling = (
+            ProductImage.objects.filter(image=image.image.name)
+            .exclude(pk=image.pk)
+            .exclude(Q(thumbnail__isnull=True) | Q(thumbnail=""))
+            .first()
+        )
+    if sibling:
+        updates = {name: getattr(sibling, name).name for name in VARIANTS}
+    else:
+        updates = render_variants(image)
+
+    # update() rather than save() so the post_save handler doesn't schedule
+    # this image again; the blob references and catalog cache are maintained
+    # explicitly instead.
+    with transaction.atomic():
+        ProductImage.objects.filter(pk=image_id).update(**updates)
+        release_blobs(getattr(image, name).name for name in VARIANTS)
+        retain_blobs(updates.values())
+
+    from products.cache import bump_catalog_version
+
+    transaction.on_commit(bump_catalog_version)
+
+
+def render_variants(image: ProductImage) -> dict:
+    stem = os.path.splitext(os.path.basename(image.image.name))[0]
+    updates = {}
+    with image.image.open("rb") as source, Image.open(source) as original:
+        original = ImageOps.exif_transpose(original).convert("RGB")
+        for name, (size, image_format, extension) in VARIANTS.items():
+            variant = original.copy()
+            variant.thumbnail(size, Image.Resampling.LANCZOS)
+            buffer = BytesIO()
+            variant.save(buffer, format=image_format, quality=82, optimize=True)
+
+            field = ProductImage._meta.get_field(name)
+            filename = field.generate_filename(image, f"{stem}_{name}.{extension}")
+            updates[name] = field.storage.save(
+                filename, ContentFile(buffer.getvalue()), max_length=field.max_length
+            )
+    return updates
@@ -0,0 +1,8 @@
+from jobs.services import job
+from products.alerts import send_low_stock_alerts
+from products.models import Product
+
+
+@job("products.send_low_stock_alerts")
+def send_low_stock_alerts_job(product_ids):
+    send_low_stock_alerts(list(Product.objects.filter(id__in=product_ids)))
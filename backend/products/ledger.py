@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from products.models import StockMovement
+
+
+def compaction_cutoff():
+    return timezone.now() - timedelta(days=settings.STOCK_MOVEMENT_RETENTION_DAYS)
+
+
+def compact_stock_movements(before=None, batch_size: int = 500, max_batches: int = None) -> int:
+    """
+    Fold each product's stock movements made before `before` (by default
+    STOCK_MOVEMENT_RETENTION_DAYS ago) into one BALANCE movement, so the
+    ledger keeps recent history in full and still adds up to the stock.
+    Each batch of products is its own transaction; movements recorded
+    meanwhile are newer than `before` and aren't touched. Returns the
+    number of movements removed.
+    """
+    before = before or compaction_cutoff()
+    removed = batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            groups = list(
+                StockMovement.objects.filter(created_at__lt=before)
+                .values("product_id")
+                .annotate(
+                    quantity=Sum("quantity"),
+                    movements=Count("id"),
+                    last_id=Max("id"),
+                    last_at=Max("created_at"),
+                )
+                .filter(movements__gt=1)
+                .order_by("product_id")[:batch_size]
+            )
+            if not groups:
+                break
+
+            for group in groups:
+                StockMovement.objects.filter(
+                    product_id=group["product_id"],
+                    created_at__lt=before,
+                    id__lte=group["last_id"],
+                ).delete()
+            StockMovement.objects.bulk_create(
+                [
+                    StockMovement(
+                        product_id=group["product_id"],
+                        kind="BALANCE",
+                        quantity=group["quantity"],
+                        note=f"{group['movements']} movements compacted",
+                        created_at=group["last_at"],
+                    )
+                    for group in groups
+                    if group["quantity"]
+                ]
+            )
+
+        removed += sum(group["movements"] for group in groups)
+        batches += 1
+    return removed
@@ -0,0 +1,94 @@
+import random, statistics, time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from products import search
+from products.models import Product, ProductCategory
+
+
+STEMS = [
+    "paracetamol", "ibuprofen", "amoxicillin", "metformin", "omeprazole",
+    "cetirizine", "loratadine", "azithromycin", "ciprofloxacin", "diclofenac",
+    "amlodipine", "lisinopril", "atorvastatin", "salbutamol", "prednisolone",
+    "artemether", "lumefantrine", "ferrous", "folic", "vitamin",
+]
+FORMS = ["tablets", "capsules", "syrup", "suspension", "cream", "injection"]
+BRANDS = ["Panadol", "Nurofen", "Ernest Chemists", "Kinapharma", "Tobinco", "M&G"]
+CATEGORIES = ["Analgesics", "Antibiotics", "Antimalarials", "Supplements", "Allergy"]
+QUERIES = ["paracetamol", "paracetmol", "amoxicilin", "kinapharma", "vitamin syrup"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the trigram search index against the old name__icontains "
+        "query on a synthetic catalog. Nothing is left in the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.create_catalog(options["products"])
+
+            started = time.perf_counter()
+            search.index.build(search.index_rows())
+            self.stdout.write(
+                f"Indexed {len(search.index)} products in "
+                f"{time.perf_counter() - started:.1f}s"
+            )
+
+            for query in QUERIES:
+                like = self.measure(
+                    lambda: list(
+                        Product.objects.filter(name__icontains=query).values_list(
+                            "id", flat=True
+                        )
+                    ),
+                    options["repeat"],
+                )
+                trigram = self.measure(
+                    lambda: search.index.search(query, limit=50), options["repeat"]
+                )
+                self.stdout.write(
+                    f"{query!r:18} LIKE p50={like[0]:7.2f}ms p99={like[1]:7.2f}ms "
+                    f"({like[2]} hits) | index p50={trigram[0]:6.2f}ms "
+                    f"p99={trigram[1]:6.2f}ms ({trigram[2]} hits)"
+                )
+
+            transaction.set_rollback(True)
+        search.index.built_at = None
+
+    def create_catalog(self, size):
+        categories = ProductCategory.objects.bulk_create(
+            [ProductCategory(name=name) for name in CATEGORIES]
+        )
+        rng = random.Random(0)
+        for start in range(0, size, 5000):
+            Product.objects.bulk_create(
+                [
+                    Product(
+                        name=f"{rng.choice(STEMS).title()} {rng.choice([100, 250, 500])}mg "
+                        f"{rng.choice(FORMS)} {index}",
+                        brand=rng.choice(BRANDS),
+                        description=f"{rng.choice(STEMS)} {rng.choice(FORMS)} for "
+                        f"{rng.choice(CATEGORIES).lower()} use",
+                        price=rng.randint(1, 500),
+                        stock=rng.randint(0, 200),
+                        category=rng.choice(categories),
+                    )
+                    for index in range(start, min(start + 5000, size))
+                ]
+            )
+
+    def measure(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            hits = run()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        return statistics.median(timings), p99, len(hits)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from products.cache import catalog_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters and the current version of the catalog cache"
+
+    def handle(self, *args, **options):
+        stats = catalog_cache_stats()
+        lookups = stats["hits"] + stats["misses"]
+        ratio = stats["hits"] / lookups * 100 if lookups else 0
+        self.stdout.write(f"Catalog version: {stats['version']}")
+        self.stdout.write(f"Hits:      {stats['hits']}")
+        self.stdout.write(f"Misses:    {stats['misses']}")
+        self.stdout.write(f"Coalesced: {stats['coalesced']}")
+        self.stdout.write(f"Hit ratio: {ratio:.1f}%")
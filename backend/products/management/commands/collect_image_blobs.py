@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from products.models import ImageBlob
+from products.storage import image_storage
+
+
+class Command(BaseCommand):
+    help = "Delete stored product image files that no ProductImage references any more"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-hours",
+            type=int,
+            default=24,
+            help="Only collect files unreferenced for at least this long, so "
+            "uploads racing with the collector keep their file",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options["grace_hours"])
+        collected = freed = 0
+        while True:
+            with transaction.atomic():
+                blobs = list(
+                    ImageBlob.objects.select_for_update(skip_locked=True)
+                    .filter(ref_count__lte=0, updated_at__lt=cutoff)
+                    .order_by("id")[: options["batch_size"]]
+                )
+                if not blobs:
+                    break
+                for blob in blobs:
+                    if image_storage.exists(blob.name):
+                        freed += image_storage.size(blob.name)
+                        if not options["dry_run"]:
+                            image_storage.delete(blob.name)
+                collected += len(blobs)
+                if options["dry_run"]:
+                    break
+                ImageBlob.objects.filter(id__in=[blob.id for blob in blobs]).delete()
+
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {collected} unreferenced files ({freed / 1024 / 1024:.1f} MB)."
+            )
+        )
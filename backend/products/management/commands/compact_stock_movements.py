@@ -0,0 +1,36 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from products.ledger import compact_stock_movements
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold each product's stock movements older than "
+        "STOCK_MOVEMENT_RETENTION_DAYS into a single balance movement."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.STOCK_MOVEMENT_RETENTION_DAYS,
+            help="Compact movements made more than this many days ago",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=500, help="Products compacted per transaction"
+        )
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options["days"])
+        started = time.perf_counter()
+        removed = compact_stock_movements(before, options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Compacted {removed} stock movements in {time.perf_counter() - started:.1f}s."
+            )
+        )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from products.images import generate_image_variants
+from products.models import ProductImage
+
+
+class Command(BaseCommand):
+    help = "Render thumbnail, medium and WebP variants for product images missing them"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all", action="store_true", help="Re-render images that have variants"
+        )
+
+    def handle(self, *args, **options):
+        images = ProductImage.objects.exclude(image="")
+        if not options["all"]:
+            images = images.filter(Q(thumbnail__isnull=True) | Q(thumbnail=""))
+
+        done = failed = 0
+        for image_id in images.values_list("id", flat=True).iterator():
+            try:
+                generate_image_variants(image_id, reuse=not options["all"])
+                done += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Image {image_id}: {e}")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rendered variants for {done} images ({failed} failed).")
+        )
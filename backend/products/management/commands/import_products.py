@@ -0,0 +1,243 @@
+import csv, json, os, time
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from products.alerts import is_low, queue_low_stock_alerts
+from products.cache import bump_catalog_version
+from products.facets import adjust_facet_counts, product_facet_values
+from products.images import schedule_image_variants
+from products.models import Product, ProductCategory, ProductImage, StockMovement
+from products.search import index_products
+from products.storage import retain_blobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import products from a CSV or NDJSON file. Rows need name, "
+        "description, price, stock and category (by name), and may have a "
+        "brand, a low_stock_threshold and images (file paths, '|'-separated in CSV or a list in NDJSON)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or NDJSON file to import")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "ndjson"],
+            help="File format; guessed from the extension when omitted",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--images-dir",
+            default="",
+            help="Directory relative image paths are resolved against",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"{path} does not exist")
+
+        file_format = options["format"] or (
+            "ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv"
+        )
+        self.images_dir = options["images_dir"]
+        self.categories = {
+            category.name.strip().lower(): category
+            for category in ProductCategory.objects.all()
+        }
+
+        imported = skipped = 0
+        started = time.perf_counter()
+        with open(path, newline="", encoding="utf-8") as source:
+            rows = self.read_csv(source) if file_format == "csv" else self.read_ndjson(source)
+            batch = []
+            for line, row in rows:
+                batch.append((line, row))
+                if len(batch) >= options["batch_size"]:
+                    created, failed = self.import_batch(batch)
+                    imported, skipped = imported + created, skipped + failed
+                    batch = []
+                    self.report(imported, skipped, started)
+            if batch:
+                created, failed = self.import_batch(batch)
+                imported, skipped = imported + created, skipped + failed
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {imported} products ({skipped} skipped) in {elapsed:.1f}s, "
+                f"{imported / elapsed if elapsed else 0:.0f} rows/s."
+            )
+        )
+
+    def read_csv(self, source):
+        for line, row in enumerate(csv.DictReader(source), start=2):
+            images = row.get("images") or ""
+            row["images"] = [image for image in images.split("|") if image.strip()]
+            yield line, row
+
+    def read_ndjson(self, source):
+        for line, text in enumerate(source, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except json.JSONDecodeError as e:
+                yield line, {"error": str(e)}
+                continue
+            images = row.get("images") or []
+            row["images"] = images.split("|") if isinstance(images, str) else images
+            yield line, row
+
+    def import_batch(self, batch):
+        products, images, skipped = [], [], 0
+        for line, row in batch:
+            product, error = self.build_product(row)
+            if error:
+                skipped += 1
+                self.stderr.write(f"Line {line}: {error}")
+                continue
+            products.append(product)
+            images += [(product, path.strip()) for path in row["images"]]
+
+        # Files are written before the transaction so it isn't held open
+        # across disk I/O.
+        images = [
+            ProductImage(product=product, image=self.store_image(path))
+            for product, path in images
+        ]
+
+        with transaction.atomic():
+            self.create_missing_categories(products)
+            for product in products:
+                product.category = self.categories[product.category_name.lower()]
+            Product.objects.bulk_create(products)
+            ProductImage.objects.bulk_create(images)
+            retain_blobs(image.image.name for image in images)
+            adjust_facet_counts(
+                added=[pair for product in products for pair in product_facet_values(product)]
+            )
+            StockMovement.objects.bulk_create(
+                [
+                    StockMovement(
+                        product=product, kind="RESTOCK", quantity=product.stock, note="Imported"
+                    )
+                    for product in products
+                    if product.stock
+                ]
+            )
+            queue_low_stock_alerts(
+                product
+                for product in products
+                if is_low(product.stock, product.low_stock_threshold)
+            )
+
+            # bulk_create skips the post_save handlers, so the facet counts and
+            # opening stock movements are added above and the search index and
+            # the catalog cache are refreshed once for the whole batch.
+            product_ids = [product.id for product in products]
+            transaction.on_commit(
+                lambda: index_products(Product.objects.filter(id__in=product_ids))
+            )
+            transaction.on_commit(bump_catalog_version)
+            schedule_image_variants([image.id for image in images], wait=True)
+
+        return len(products), skipped
+
+    def build_product(self, row):
+        if "error" in row:
+            return None, row["error"]
+
+        missing = [
+            field
+            for field in ("name", "description", "price", "stock", "category")
+            if row.get(field) in (None, "")
+        ]
+        if missing:
+            return None, f"missing {', '.join(missing)}"
+
+        text = [
+            field
+            for field in ("name", "brand", "description", "category")
+            if row.get(field) is not None and not isinstance(row[field], str)
+        ]
+        if text:
+            return None, f"{', '.join(text)} must be text"
+        images = row["images"]
+        if not isinstance(images, list) or not all(isinstance(path, str) for path in images):
+            return None, "images must be file paths"
+
+        try:
+            price = Decimal(str(row["price"]))
+            stock = int(row["stock"])
+            threshold = row.get("low_stock_threshold")
+            if threshold in (None, ""):
+                threshold = Product._meta.get_field("low_stock_threshold").default
+            threshold = int(threshold)
+        except (InvalidOperation, TypeError, ValueError):
+            return None, "price, stock and low_stock_threshold must be numbers"
+        if stock < 0:
+            return None, "Stock cannot be negative."
+        if threshold < 0:
+            return None, "Low stock threshold cannot be negative."
+
+        for path in row["images"]:
+            if not os.path.isfile(self.image_path(path)):
+                return None, f"image {path} not found"
+
+        product = Product(
+            name=row["name"].strip(),
+            brand=(row.get("brand") or "").strip() or None,
+            description=row["description"],
+            price=price,
+            stock=stock,
+            low_stock_threshold=threshold,
+        )
+        product.category_name = row["category"].strip()
+
+        try:
+            product.full_clean(
+                exclude=["category"], validate_unique=False, validate_constraints=False
+            )
+        except ValidationError as e:
+            return None, describe(e.message_dict)
+        # The category is resolved, and created if need be, for the whole
+        # batch, so it's checked on its own.
+        try:
+            ProductCategory(name=product.category_name).clean_fields()
+        except ValidationError as e:
+            return None, describe({"category": e.message_dict["name"]})
+        return product, None
+
+    def create_missing_categories(self, products):
+        missing = {}
+        for product in products:
+            key = product.category_name.lower()
+            if key not in self.categories and key not in missing:
+                missing[key] = ProductCategory(name=product.category_name)
+        ProductCategory.objects.bulk_create(missing.values())
+        self.categories.update(missing)
+
+    def image_path(self, path):
+        return os.path.join(self.images_dir, path.strip())
+
+    def store_image(self, path):
+        field = ProductImage._meta.get_field("image")
+        name = field.generate_filename(None, os.path.basename(path))
+        with open(self.image_path(path), "rb") as image:
+            return field.storage.save(name, File(image), max_length=field.max_length)
+
+    def report(self, imported, skipped, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{imported} imported, {skipped} skipped, "
+            f"{imported / elapsed if elapsed else 0:.0f} rows/s"
+        )
+
+
+def describe(errors: dict) -> str:
+    return "; ".join(f"{field}: {' '.join(messages)}" for field, messages in errors.items())
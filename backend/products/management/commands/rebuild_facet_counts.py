@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from products.cache import bump_catalog_version
+from products.facets import rebuild_facet_counts
+from products.models import ProductFacetCount
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the product filter facets from the products table, e.g. after "
+        "changing the price bands or writing products without their signals"
+    )
+
+    def handle(self, *args, **options):
+        rebuild_facet_counts()
+        bump_catalog_version()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {ProductFacetCount.objects.count()} facet counts."
+            )
+        )
@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 12:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_product_name_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimage',
+            name='medium',
+            field=models.ImageField(blank=True, null=True, upload_to='venella/products/images/variants/'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to='venella/products/images/variants/'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='webp',
+            field=models.ImageField(blank=True, null=True, upload_to='venella/products/images/variants/'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2 on 2026-10-18 12:27
+
+import products.storage
+from collections import Counter
+from django.db import migrations, models
+
+
+def count_existing_files(apps, schema_editor):
+    ProductImage = apps.get_model("products", "ProductImage")
+    ImageBlob = apps.get_model("products", "ImageBlob")
+
+    counts = Counter()
+    for names in ProductImage.objects.values_list(
+        "image", "thumbnail", "medium", "webp"
+    ).iterator():
+        counts.update(name for name in names if name)
+    ImageBlob.objects.bulk_create(
+        [ImageBlob(name=name, ref_count=count) for name, count in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_productimage_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('ref_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='productimage',
+            name='image',
+            field=models.ImageField(storage=products.storage.get_image_storage, upload_to='venella/products/images/'),
+        ),
+        migrations.AlterField(
+            model_name='productimage',
+            name='medium',
+            field=models.ImageField(blank=True, null=True, storage=products.storage.get_image_storage, upload_to='venella/products/images/variants/'),
+        ),
+        migrations.AlterField(
+            model_name='productimage',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, storage=products.storage.get_image_storage, upload_to='venella/products/images/variants/'),
+        ),
+        migrations.AlterField(
+            model_name='productimage',
+            name='webp',
+            field=models.ImageField(blank=True, null=True, storage=products.storage.get_image_storage, upload_to='venella/products/images/variants/'),
+        ),
+        migrations.RunPython(count_existing_files, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2 on 2026-10-18 12:30
+
+from collections import Counter
+from django.db import migrations, models
+
+
+def count_facets(apps, schema_editor):
+    from products.facets import facet_values
+
+    Product = apps.get_model("products", "Product")
+    ProductFacetCount = apps.get_model("products", "ProductFacetCount")
+
+    counts = Counter()
+    for row in Product.objects.values_list(
+        "category_id", "brand", "price", "stock"
+    ).iterator():
+        counts.update(facet_values(*row))
+    ProductFacetCount.objects.bulk_create(
+        [
+            ProductFacetCount(facet=facet, value=value, count=count)
+            for (facet, value), count in counts.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_imageblob_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductFacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=20)),
+                ('value', models.CharField(max_length=255)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('facet', 'value'), name='unique_product_facet_value')],
+            },
+        ),
+        migrations.RunPython(count_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2 on 2026-10-18 13:01
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def open_existing_stock(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    StockMovement = apps.get_model("products", "StockMovement")
+    StockMovement.objects.bulk_create(
+        (
+            StockMovement(
+                product_id=product_id,
+                kind="BALANCE",
+                quantity=stock,
+                note="Stock before the ledger",
+            )
+            for product_id, stock in Product.objects.exclude(stock=0)
+            .values_list("id", "stock")
+            .iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_low_stock_alerts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('SALE', 'Sale'), ('RESTOCK', 'Restock'), ('ADJUSTMENT', 'Adjustment'), ('CANCELLATION', 'Cancellation'), ('BALANCE', 'Balance')], max_length=20)),
+                ('quantity', models.IntegerField()),
+                ('order_id', models.UUIDField(blank=True, null=True)),
+                ('note', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'created_at', 'id'], name='stock_movement_product_idx')],
+            },
+        ),
+        migrations.RunPython(open_existing_stock, migrations.RunPython.noop),
+    ]
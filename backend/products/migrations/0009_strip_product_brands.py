@@ -0,0 +1,40 @@
+from collections import Counter
+from django.db import migrations
+from django.db.models.functions import Trim
+
+
+def strip_brands(apps, schema_editor):
+    from products.facets import facet_values
+
+    Product = apps.get_model("products", "Product")
+    ProductFacetCount = apps.get_model("products", "ProductFacetCount")
+
+    Product.objects.exclude(brand=None).update(brand=Trim("brand"))
+    Product.objects.filter(brand="").update(brand=None)
+
+    # Brands were counted stripped but stored as given, so recount them.
+    counts = Counter()
+    for row in Product.objects.values_list(
+        "category_id", "brand", "price", "stock"
+    ).iterator():
+        counts.update(facet_values(*row))
+    ProductFacetCount.objects.filter(facet="brand").delete()
+    ProductFacetCount.objects.bulk_create(
+        [
+            ProductFacetCount(facet=facet, value=value, count=count)
+            for (facet, value), count in counts.items()
+            if facet == "brand"
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_stock_reservations'),
+    ]
+
+    operations = [
+        migrations.RunPython(strip_brands, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,10 @@
 import uuid
-from django.db import models
-from django.db.models.signals import post_save
+from collections import Counter
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
+from django.utils import timezone
+from products.storage import get_image_storage, release_blobs, retain_blobs
 
 
 class ProductCategory(models.Model):
@@ -20,6 +23,11 @@ class Product(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.IntegerField()
+    # Units of `stock` held for carts (carts.services.hold_cart_item); only
+    # the rest can be sold to anyone else.
+    reserved = models.PositiveIntegerField(default=0)
+    # Sales persons are alerted when stock drops to this level or below.
+    low_stock_threshold = models.PositiveIntegerField(default=10)
     category = models.ForeignKey(
         ProductCategory, related_name="products", on_delete=models.CASCADE
     )
@@ -27,31 +35,268 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # The brand facet counts and filters brands as stored, so " Acme "
+        # is stored as "Acme" and a blank brand as no brand.
+        self.brand = (self.brand or "").strip() or None
+        super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            # Backs the (name, id) keyset pagination of the catalog listings.
+            models.Index(fields=["name", "id"], name="product_name_id_idx"),
+        ]
+
 
 class ProductImage(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     product = models.ForeignKey(
         Product, related_name="images", on_delete=models.CASCADE
     )
-    image = models.ImageField(upload_to="venella/products/images/")
+    image = models.ImageField(
+        upload_to="venella/products/images/", storage=get_image_storage
+    )
+    # Resized copies rendered in the background by products.images
+    thumbnail = models.ImageField(
+        upload_to="venella/products/images/variants/",
+        storage=get_image_storage,
+        blank=True,
+        null=True,
+    )
+    medium = models.ImageField(
+        upload_to="venella/products/images/variants/",
+        storage=get_image_storage,
+        blank=True,
+        null=True,
+    )
+    webp = models.ImageField(
+        upload_to="venella/products/images/variants/",
+        storage=get_image_storage,
+        blank=True,
+        null=True,
+    )
 
     def __str__(self):
         return f"Image for {self.product.name}"
 
+    @property
+    def stored_files(self):
+        return [self.image.name, self.thumbnail.name, self.medium.name, self.webp.name]
 
-@receiver(post_save, sender=Product)
-def check_low_stock(sender, instance, created, **kwargs):
+
+class ImageBlob(models.Model):
+    """
+    A file in the content-addressed image storage and the number of
+    ProductImage fields that point at it.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    ref_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} references)"
+
+
+class ProductStockAlert(models.Model):
+    """When sales persons were last alerted that a product is low on stock."""
+
+    product = models.OneToOneField(
+        Product, related_name="stock_alert", on_delete=models.CASCADE
+    )
+    alerted_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Stock alert for {self.product.name}"
+
+
+class StockMovement(models.Model):
     """
-    Signal handler to check for low stock and send notifications
-    when product stock is 10 or less
+    One change to a product's stock. Movements are only ever inserted, so
+    concurrent tills never wait on each other to record them, and
+    Product.stock is the running total of a product's movements. Old
+    movements are folded into a single BALANCE movement per product by
+    `manage.py compact_stock_movements`.
     """
-    if instance.stock <= 10:
-        from notifications.services import create_salesperson_notification
-
-        # Send notification to all salespersons about low stock
-        create_salesperson_notification(
-            {
-                "type": "PRODUCT_STOCK_ALERT",
-                "content": f"Low Stock Alert: {instance.name} has only {instance.stock} units remaining. Please restock soon.",
-            }
+
+    KIND_CHOICES = (
+        ("SALE", "Sale"),
+        ("RESTOCK", "Restock"),
+        ("ADJUSTMENT", "Adjustment"),
+        ("CANCELLATION", "Cancellation"),
+        ("BALANCE", "Balance"),
+    )
+
+    product = models.ForeignKey(
+        Product, related_name="stock_movements", on_delete=models.CASCADE
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # Units added to (positive) or taken out of (negative) stock.
+    quantity = models.IntegerField()
+    # The order a sale or cancellation belongs to. Not a foreign key, since
+    # orders are moved to the archive tables.
+    order_id = models.UUIDField(blank=True, null=True)
+    note = models.CharField(max_length=255, blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    def __str__(self):
+        return f"{self.kind} of {self.quantity:+d} for {self.product_id}"
+
+    class Meta:
+        indexes = [
+            # A product's history, newest first, and compaction by age.
+            models.Index(
+                fields=["product", "created_at", "id"], name="stock_movement_product_idx"
+            ),
+        ]
+
+
+class ProductFacetCount(models.Model):
+    """
+    Number of products under one value of a filter facet (a category, brand,
+    price band or availability), kept up to date as products are saved so
+    the filter sidebar never has to count the catalog.
+    """
+
+    facet = models.CharField(max_length=20)
+    value = models.CharField(max_length=255)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.facet}={self.value}: {self.count}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["facet", "value"], name="unique_product_facet_value"
+            ),
+        ]
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    """Keep this process' search index in step with product writes."""
+    from products.search import index_products
+
+    transaction.on_commit(
+        lambda: index_products(Product.objects.filter(pk=instance.pk))
+    )
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    from products.search import unindex_product
+
+    transaction.on_commit(lambda: unindex_product(instance.pk))
+
+
+@receiver(pre_save, sender=Product)
+def remember_saved_product(sender, instance, **kwargs):
+    """Note the stock and facet values of the row this save replaces."""
+    from products.facets import facet_values
+
+    instance._saved_facets = []
+    instance._saved_stock = instance._saved_threshold = None
+    if not instance._state.adding:
+        row = (
+            Product.objects.filter(pk=instance.pk)
+            .values_list("category_id", "brand", "price", "stock", "low_stock_threshold")
+            .first()
         )
+        if row:
+            instance._saved_facets = facet_values(*row[:4])
+            instance._saved_stock, instance._saved_threshold = row[3:]
+
+
+@receiver(post_save, sender=Product)
+def record_opening_stock(sender, instance, created, **kwargs):
+    if created and instance.stock:
+        StockMovement.objects.create(
+            product=instance, kind="RESTOCK", quantity=instance.stock, note="Opening stock"
+        )
+
+
+@receiver(post_save, sender=Product)
+def check_low_stock(sender, instance, **kwargs):
+    from products.alerts import queue_low_stock_alert
+
+    queue_low_stock_alert(
+        instance,
+        previous_stock=getattr(instance, "_saved_stock", None),
+        previous_threshold=getattr(instance, "_saved_threshold", None),
+    )
+
+
+@receiver(post_save, sender=Product)
+def count_product_facets(sender, instance, **kwargs):
+    from products.facets import adjust_facet_counts, product_facet_values
+
+    adjust_facet_counts(
+        removed=getattr(instance, "_saved_facets", []),
+        added=product_facet_values(instance),
+    )
+
+
+@receiver(post_delete, sender=Product)
+def uncount_product_facets(sender, instance, **kwargs):
+    from products.facets import adjust_facet_counts, product_facet_values
+
+    adjust_facet_counts(removed=product_facet_values(instance))
+
+
+@receiver(post_save, sender=ProductCategory)
+def reindex_category_products(sender, instance, created, **kwargs):
+    if created:
+        return
+    from products.search import index_products
+
+    transaction.on_commit(
+        lambda: index_products(Product.objects.filter(category=instance))
+    )
+
+
+@receiver(pre_save, sender=ProductImage)
+def remember_saved_image_files(sender, instance, **kwargs):
+    """Note the stored files of the row this save replaces."""
+    instance._saved_files = []
+    if not instance._state.adding:
+        row = (
+            ProductImage.objects.filter(pk=instance.pk)
+            .values_list("image", "thumbnail", "medium", "webp")
+            .first()
+        )
+        instance._saved_files = list(row or [])
+
+
+@receiver(post_save, sender=ProductImage)
+def retain_image_blob(sender, instance, created, **kwargs):
+    saved = Counter(getattr(instance, "_saved_files", []))
+    stored = Counter(instance.stored_files)
+    retain_blobs((stored - saved).elements())
+    release_blobs((saved - stored).elements())
+
+
+@receiver(post_delete, sender=ProductImage)
+def release_image_blobs(sender, instance, **kwargs):
+    release_blobs(instance.stored_files)
+
+
+@receiver(post_save, sender=ProductImage)
+def render_image_variants(sender, instance, **kwargs):
+    if instance.image and not instance.thumbnail:
+        from products.images import schedule_image_variants
+
+        schedule_image_variants([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+def invalidate_catalog_cache(sender, **kwargs):
+    """Any catalog write makes every cached catalog response stale."""
+    from products.cache import bump_catalog_version
+
+    transaction.on_commit(bump_catalog_version)
@@ -0,0 +1,250 @@
+import heapq, re, threading, time, unicodedata
+from collections import Counter, defaultdict
+from operator import itemgetter
+
+from django.conf import settings
+
+from products.models import Product
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and collapse everything but letters and digits."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return re.sub(r"[^a-z0-9]+", " ", text.lower()).strip()
+
+
+def trigrams(word: str) -> set:
+    """
+    Trigrams of a normalized word, padded the same way as PostgreSQL's pg_trgm
+    ("  w", " wo", "wor", ... "rd ") so that short words and word boundaries
+    still produce distinctive grams.
+    """
+    padded = f"  {word} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class ProductSearchIndex:
+    """
+    In-process inverted index over the product catalog with trigram-based
+    fuzzy matching.
+
+    Every word of a product's name, brand, category and description maps to
+    the products containing it, weighted by the most important field it
+    appears in. The vocabulary itself is indexed by trigram, so a query word
+    is first expanded to the catalog words that are similar to it (which is
+    how "paracetmol" finds "paracetamol" and "amox" finds "amoxicillin"), and
+    products are then ranked by the weighted similarity of their best
+    matching word for every word of the query; a product has to match all
+    of the query's words.
+    """
+
+    FIELD_WEIGHTS = {"name": 3.0, "brand": 2.0, "category": 1.5, "description": 1.0}
+    # Only the opening of long descriptions is indexed; it names the product's
+    # use and keeps the index of a large catalog small enough for memory.
+    DESCRIPTION_CHARS = 300
+    # A query word that is a prefix of a catalog word scores at least this,
+    # so results show up while the customer is still typing.
+    PREFIX_SIMILARITY = 0.8
+    MAX_EXPANSIONS = 8
+
+    def __init__(self, min_similarity: float = 0.4):
+        self.min_similarity = min_similarity
+        self._lock = threading.RLock()
+        self._postings = {}  # word -> {doc: weight}
+        self._grams = defaultdict(set)  # trigram -> words
+        self._gram_counts = {}  # word -> number of trigrams in the word
+        self._documents = {}  # doc -> words of that document
+        self._doc_ids = {}  # product id -> doc
+        self._product_ids = {}  # doc -> product id
+        self._next_doc = 0
+        self.built_at = None
+        self._rebuilding = False
+
+    def __len__(self):
+        return len(self._documents)
+
+    @property
+    def is_built(self) -> bool:
+        return self.built_at is not None
+
+    def build(self, rows):
+        """Replace the index with `rows` of (id, name, brand, description, category)."""
+        fresh = ProductSearchIndex(self.min_similarity)
+        for row in rows:
+            fresh._add(*row)
+
+        with self._lock:
+            self._postings = fresh._postings
+            self._grams = fresh._grams
+            self._gram_counts = fresh._gram_counts
+            self._documents = fresh._documents
+            self._doc_ids = fresh._doc_ids
+            self._product_ids = fresh._product_ids
+            self._next_doc = fresh._next_doc
+            self.built_at = time.monotonic()
+
+    def update(self, product_id, name, brand, description, category):
+        with self._lock:
+            self._remove(product_id)
+            self._add(product_id, name, brand, description, category)
+
+    def remove(self, product_id):
+        with self._lock:
+            self._remove(product_id)
+
+    def search(self, query: str, limit: int = None) -> list:
+        """
+        Return product ids matching every word of `query`, best match first.
+        """
+        with self._lock:
+            expansions = [self._expand(word) for word in set(normalize(query).split())]
+            if not expansions or not all(expansions):
+                return []
+
+            # Start from the query word with the fewest candidate products and
+            # only look the remaining words up for products still in the race.
+            expansions.sort(
+                key=lambda terms: sum(len(self._postings[term]) for term, _ in terms)
+            )
+            scores = {}
+            for term, similarity in expansions[0]:
+                for doc, weight in self._postings[term].items():
+                    score = similarity * weight
+                    if score > scores.get(doc, 0.0):
+                        scores[doc] = score
+
+            for terms in expansions[1:]:
+                postings = [(self._postings[term], similarity) for term, similarity in terms]
+                for doc in list(scores):
+                    score = max(
+                        similarity * posting.get(doc, 0.0)
+                        for posting, similarity in postings
+                    )
+                    if score:
+                        scores[doc] += score
+                    else:
+                        del scores[doc]
+
+            ranked = heapq.nlargest(
+                limit or len(scores), scores.items(), key=itemgetter(1)
+            )
+            return [self._product_ids[doc] for doc, _ in ranked]
+
+    def _expand(self, word: str) -> list:
+        """Catalog words similar to `word` as (word, similarity), best first."""
+        grams = trigrams(word)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._grams.get(gram, ()))
+
+        matches = []
+        for term, count in shared.items():
+            # Jaccard similarity of the two trigram sets.
+            similarity = count / (len(grams) + self._gram_counts[term] - count)
+            if term.startswith(word):
+                similarity = max(similarity, self.PREFIX_SIMILARITY)
+            if similarity >= self.min_similarity:
+                matches.append((similarity, term))
+
+        best = heapq.nlargest(self.MAX_EXPANSIONS, matches)
+        return [(term, similarity) for similarity, term in best]
+
+    def _add(self, product_id, name, brand, description, category):
+        doc = self._next_doc
+        self._next_doc += 1
+
+        weights = {}
+        for field, text in (
+            ("description", (description or "")[: self.DESCRIPTION_CHARS]),
+            ("category", category),
+            ("brand", brand),
+            ("name", name),
+        ):
+            for word in normalize(text).split():
+                weights[word] = max(weights.get(word, 0.0), self.FIELD_WEIGHTS[field])
+
+        for word, weight in weights.items():
+            if word not in self._postings:
+                self._postings[word] = {}
+                grams = trigrams(word)
+                self._gram_counts[word] = len(grams)
+                for gram in grams:
+                    self._grams[gram].add(word)
+            self._postings[word][doc] = weight
+
+        self._documents[doc] = tuple(weights)
+        self._doc_ids[product_id] = doc
+        self._product_ids[doc] = product_id
+
+    def _remove(self, product_id):
+        doc = self._doc_ids.pop(product_id, None)
+        if doc is None:
+            return
+        for word in self._documents.pop(doc):
+            posting = self._postings[word]
+            posting.pop(doc, None)
+            if posting:
+                continue
+            del self._postings[word]
+            del self._gram_counts[word]
+            for gram in trigrams(word):
+                words = self._grams[gram]
+                words.discard(word)
+                if not words:
+                    del self._grams[gram]
+        del self._product_ids[doc]
+
+
+def index_rows(queryset=None):
+    queryset = Product.objects.all() if queryset is None else queryset
+    return queryset.values_list(
+        "id", "name", "brand", "description", "category__name"
+    ).iterator(chunk_size=2000)
+
+
+index = ProductSearchIndex()
+
+
+def get_index() -> ProductSearchIndex:
+    """
+    Return the process-wide index, building it on first use.
+
+    Saves made by other worker processes don't reach this process' signal
+    handlers, so once the index is older than PRODUCT_SEARCH_INDEX_TTL it is
+    rebuilt in a background thread while the current copy keeps serving.
+    """
+    if not index.is_built:
+        with index._lock:
+            if not index.is_built:
+                index.build(index_rows())
+    elif time.monotonic() - index.built_at > settings.PRODUCT_SEARCH_INDEX_TTL:
+        with index._lock:
+            if index._rebuilding:
+                return index
+            index._rebuilding = True
+        threading.Thread(target=_rebuild, daemon=True).start()
+    return index
+
+
+def _rebuild():
+    from django.db import connection
+
+    try:
+        index.build(index_rows())
+    finally:
+        index._rebuilding = False
+        connection.close()
+
+
+def index_products(queryset):
+    """Re-index the products in `queryset` if the index has been built."""
+    if not index.is_built:
+        return
+    for row in index_rows(queryset):
+        index.update(*row)
+
+
+def unindex_product(product_id):
+    if index.is_built:
+        index.remove(product_id)
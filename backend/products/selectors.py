@@ -1,9 +1,19 @@
-from products.models import Product, ProductCategory
+from django.conf import settings
+from products.models import Product, ProductCategory, StockMovement
 from products.serializers import ProductSerializer, ProductCategorySerializer
 
 
+def get_products_queryset():
+    """
+    Base product queryset with everything `ProductSerializer` renders
+    (category and images) loaded up front, so serializing a list of products
+    costs a constant number of queries.
+    """
+    return Product.objects.select_related("category").prefetch_related("images")
+
+
 def get_all_products():
-    products = Product.objects.all()
+    products = get_products_queryset()
     return products
 
 
@@ -16,9 +26,24 @@ def get_product_by_id(product_id: str):
         return product
 
 
+def get_stock_movements(product_id):
+    return StockMovement.objects.filter(product_id=product_id)
+
+
 def get_search_products(query: str):
-    products = Product.objects.filter(name__icontains=query)
-    return products
+    """
+    Ids of the products matching `query` on name, brand, description or
+    category, best match first. Served from the in-process trigram index, so
+    misspellings still match and the database is not scanned.
+    """
+    from products.search import get_index
+
+    return get_index().search(query, limit=settings.PRODUCT_SEARCH_MAX_RESULTS)
+
+
+def get_products_in_order(product_ids: list):
+    products = get_products_queryset().in_bulk(product_ids)
+    return [products[pk] for pk in product_ids if pk in products]
 
 
 def product_info(product: Product, many: bool = False):
@@ -1,5 +1,6 @@
+from functools import cached_property
 from rest_framework import serializers
-from .models import Product, ProductCategory, ProductImage
+from .models import Product, ProductCategory, ProductImage, StockMovement
 
 
 class ProductCategorySerializer(serializers.ModelSerializer):
@@ -12,20 +13,38 @@ class ProductImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductImage
         fields = "__all__"
+        read_only_fields = ["thumbnail", "medium", "webp"]
 
 
 class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = "__all__"
+        read_only_fields = ["reserved"]
 
     def validate(self, data):
-        if data["stock"] < 0:
+        if data.get("stock", 0) < 0:
             raise serializers.ValidationError("Stock cannot be negative.")
         return data
 
+    # Nested serializers are built once per serializer rather than once per
+    # product, since building their fields costs more than rendering them.
+    @cached_property
+    def category_serializer(self):
+        return ProductCategorySerializer()
+
+    @cached_property
+    def images_serializer(self):
+        return ProductImageSerializer(many=True)
+
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        data["category"] = ProductCategorySerializer(instance.category).data
-        data["images"] = ProductImageSerializer(instance.images.all(), many=True).data
+        data["category"] = self.category_serializer.to_representation(instance.category)
+        data["images"] = self.images_serializer.to_representation(instance.images.all())
         return data
+
+
+class StockMovementSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockMovement
+        fields = ["id", "kind", "quantity", "order_id", "note", "created_at"]
@@ -1,30 +1,201 @@
-from products.models import Product, ProductCategory, ProductImage
+from django.db import transaction
+from django.db.models import F
+from products.models import Product, ProductCategory, ProductImage, StockMovement
 from products.serializers import (
     ProductSerializer,
     ProductCategorySerializer,
     ProductImageSerializer,
 )
 from products.selectors import get_product_by_id
-from core.utils.general import InMemoryUploadedFileHandler
+from core.utils.general import StreamingUploadedFileHandler
 
 
-def check_and_send_low_stock_notification(product: Product):
+def decrement_stock(quantities: dict):
     """
-    Check if product stock is 10 or less and send notification to salespersons
+    Take `quantities` (product id -> units) out of stock, all or nothing.
+
+    Each product is decremented with a conditional
+    `UPDATE ... SET stock = stock - n WHERE id = ... AND stock >= n`, so two
+    buyers of the last units can't both succeed, and products are updated in
+    id order so concurrent checkouts lock rows in the same order and can't
+    deadlock. Units held for carts aren't sold. When a product is short
+    nothing is decremented. Returns the updated products by id and a list
+    of errors.
+    """
+    quantities = {str(product_id): qty for product_id, qty in quantities.items()}
+    with transaction.atomic():
+        for product_id in sorted(quantities):
+            updated = Product.objects.filter(
+                id=product_id, stock__gte=F("reserved") + quantities[product_id]
+            ).update(stock=F("stock") - quantities[product_id])
+            if not updated:
+                product = get_product_by_id(product_id)
+                transaction.set_rollback(True)
+                if not product:
+                    return None, [f"Product {product_id} not found"]
+                return None, [f"Insufficient stock for product {product.name}"]
+
+        products = {
+            str(product.id): product
+            for product in Product.objects.filter(id__in=list(quantities))
+        }
+        stock_changed(
+            [(product, product.stock + quantities[pk]) for pk, product in products.items()]
+        )
+    return products, None
+
+
+def hold_stock(quantities: dict):
+    """
+    Set `quantities` (product id -> units) aside for carts, all or nothing,
+    with a conditional `UPDATE ... SET reserved = reserved + n WHERE
+    stock - reserved >= n` per product in id order. Returns a list of
+    errors, empty when everything was held.
+    """
+    quantities = {str(product_id): qty for product_id, qty in quantities.items()}
+    with transaction.atomic():
+        for product_id in sorted(quantities):
+            updated = Product.objects.filter(
+                id=product_id, stock__gte=F("reserved") + quantities[product_id]
+            ).update(reserved=F("reserved") + quantities[product_id])
+            if not updated:
+                product = get_product_by_id(product_id)
+                transaction.set_rollback(True)
+                if not product:
+                    return [f"Product {product_id} not found"]
+                return [f"Insufficient stock for product {product.name}"]
+    return []
+
+
+def release_stock(quantities: dict):
+    """Give units held with `hold_stock` back to everyone else."""
+    quantities = {str(product_id): qty for product_id, qty in quantities.items()}
+    for product_id in sorted(quantities):
+        Product.objects.filter(id=product_id).update(
+            reserved=F("reserved") - quantities[product_id]
+        )
+
+
+def sell_held_stock(quantities: dict):
+    """
+    Take units held with `hold_stock` out of stock. They are already set
+    aside, so no stock check is needed. Returns the updated products by id.
+    """
+    quantities = {str(product_id): qty for product_id, qty in quantities.items()}
+    with transaction.atomic():
+        for product_id in sorted(quantities):
+            Product.objects.filter(id=product_id).update(
+                stock=F("stock") - quantities[product_id],
+                reserved=F("reserved") - quantities[product_id],
+            )
+        products = {
+            str(product.id): product
+            for product in Product.objects.filter(id__in=list(quantities))
+        }
+        stock_changed(
+            [(product, product.stock + quantities[pk]) for pk, product in products.items()]
+        )
+    return products
+
+
+def increment_stock(quantities: dict):
+    """
+    Put `quantities` (product id -> units) back in stock, e.g. the items of
+    a cancelled order, with one `UPDATE ... SET stock = stock + n` per
+    product in id order. Returns the updated products by id.
+    """
+    quantities = {str(product_id): qty for product_id, qty in quantities.items()}
+    with transaction.atomic():
+        for product_id in sorted(quantities):
+            Product.objects.filter(id=product_id).update(
+                stock=F("stock") + quantities[product_id]
+            )
+        products = {
+            str(product.id): product
+            for product in Product.objects.filter(id__in=list(quantities))
+        }
+        stock_changed(
+            [(product, product.stock - quantities[pk]) for pk, product in products.items()]
+        )
+    return products
+
+
+def record_order_movements(kind: str, items):
     """
-    if product.stock <= 10:
-        from notifications.services import create_salesperson_notification
-
-        try:
-            create_salesperson_notification(
-                {
-                    "type": "PRODUCT_STOCK_ALERT",
-                    "content": f"Low Stock Alert: {product.name} has only {product.stock} units remaining. Please restock soon.",
-                }
+    Record the stock movements of order `items` with one INSERT: units taken
+    out for a SALE, put back for a CANCELLATION.
+    """
+    sign = -1 if kind == "SALE" else 1
+    return StockMovement.objects.bulk_create(
+        [
+            StockMovement(
+                product_id=item.product_id,
+                kind=kind,
+                quantity=sign * item.quantity,
+                order_id=item.order_id,
             )
-        except Exception as e:
-            # Log the error but don't fail the main operation
-            print(f"Failed to send low stock notification: {e}")
+            for item in items
+        ]
+    )
+
+
+def adjust_stock(product_id, quantity: int, kind: str = "ADJUSTMENT", note: str = ""):
+    """
+    Add `quantity` units to a product's stock, or take them out when it is
+    negative, and record the movement. Stock is never taken below zero.
+    Returns the movement and a list of errors.
+    """
+    if kind not in ("RESTOCK", "ADJUSTMENT"):
+        return None, ["Kind must be RESTOCK or ADJUSTMENT."]
+    if isinstance(quantity, bool) or not isinstance(quantity, int) or not quantity:
+        return None, ["Quantity must be a non-zero whole number."]
+    if kind == "RESTOCK" and quantity < 0:
+        return None, ["A restock must add units."]
+
+    with transaction.atomic():
+        # Units held for carts can't be adjusted away.
+        updated = Product.objects.filter(
+            id=product_id, stock__gte=F("reserved") + max(-quantity, 0)
+        ).update(stock=F("stock") + quantity)
+        product = get_product_by_id(product_id)
+        if not product:
+            return None, [f"Product {product_id} not found"]
+        if not updated:
+            return None, [
+                f"Only {product.stock - product.reserved} units of {product.name} "
+                "are in stock and not held for carts."
+            ]
+        movement = StockMovement.objects.create(
+            product=product, kind=kind, quantity=quantity, note=note[:255]
+        )
+        stock_changed([(product, product.stock - quantity)])
+    return movement, None
+
+
+def stock_changed(changes: list):
+    """
+    Do what a product save would have done for stock written with update():
+    move the products between availability facets and queue low-stock
+    alerts. The catalog cache is only invalidated when a product comes into
+    or goes out of stock; the stock counts cached responses show may lag by
+    up to CATALOG_CACHE_TIMEOUT. `changes` is a list of (product with its
+    new stock, previous stock).
+    """
+    from products.alerts import queue_low_stock_alert
+    from products.cache import bump_catalog_version
+    from products.facets import adjust_facet_counts, facet_values, product_facet_values
+
+    removed, added, availability_changed = [], [], False
+    for product, previous_stock in changes:
+        removed += facet_values(
+            product.category_id, product.brand, product.price, previous_stock
+        )
+        added += product_facet_values(product)
+        queue_low_stock_alert(product, previous_stock=previous_stock)
+        availability_changed |= (previous_stock > 0) != (product.stock > 0)
+    adjust_facet_counts(removed=removed, added=added)
+    if availability_changed:
+        transaction.on_commit(bump_catalog_version)
 
 
 def create_product(data: dict):
@@ -34,14 +205,19 @@ def create_product(data: dict):
 
     if not isinstance(product_images, list):
         return None, ["Product images should be a list"]
-    else:
-        fhandler = InMemoryUploadedFileHandler()
-        print("Product images:", product_images)
+
+    # Images given as paths are streamed from disk and request uploads larger
+    # than FILE_UPLOAD_MAX_MEMORY_SIZE already live in temporary files, so
+    # neither is held in memory while it is copied to storage.
+    with StreamingUploadedFileHandler() as fhandler:
         product_images = [
-            image if not isinstance(image, str) else fhandler.from_img_path(image)
+            image if not isinstance(image, str) else fhandler.from_path(image)
             for image in product_images
         ]
+        return _create_product_with_images(data, product_images)
 
+
+def _create_product_with_images(data: dict, product_images: list):
     product_data = {
         "name": data.get("name"),
         "description": data.get("description"),
@@ -50,6 +226,8 @@ def create_product(data: dict):
         "category": data.get("category"),
         "brand": data.get("brand"),
     }
+    if data.get("low_stock_threshold") is not None:
+        product_data["low_stock_threshold"] = data.get("low_stock_threshold")
     serializer = ProductSerializer(data=product_data)
     if serializer.is_valid():
         serializer.save()
@@ -75,11 +253,30 @@ def create_product(data: dict):
 
 
 def update_product(product: Product, data: dict):
-    product_serializer = ProductSerializer(product, data=data, partial=True)
-    if product_serializer.is_valid():
+    with transaction.atomic():
+        # Locking the row keeps sales from moving the stock between reading
+        # it here and saving; a changed stock is recorded as an adjustment.
+        product = Product.objects.select_for_update().get(pk=product.pk)
+        previous_stock = product.stock
+        product_serializer = ProductSerializer(product, data=data, partial=True)
+        if not product_serializer.is_valid():
+            return None, product_serializer.errors
+        # Units held for carts are sold without a stock check, so the stock
+        # can't be edited below them.
+        stock = product_serializer.validated_data.get("stock", previous_stock)
+        if stock < product.reserved:
+            return None, [
+                f"{product.reserved} units of {product.name} are held for carts; "
+                "stock can't be set below that."
+            ]
         product_serializer.save()
-    else:
-        return None, product_serializer.errors
+        if product.stock != previous_stock:
+            StockMovement.objects.create(
+                product=product,
+                kind="ADJUSTMENT",
+                quantity=product.stock - previous_stock,
+                note="Stock edited",
+            )
 
     product = get_product_by_id(product_serializer.data.get("id"))
 
@@ -87,23 +284,19 @@ def update_product(product: Product, data: dict):
     if product_images:
         if not isinstance(product_images, list):
             return None, ["Product images should be a list"]
-        fhandler = InMemoryUploadedFileHandler()
-        product_images = [
-            {"image": fhandler.from_img_path(image_data.get("image"))}
-            for image_data in product_images
-            if isinstance(image_data.get("image"), str)
-        ]
-        product_images = [
-            image_data.update({"product": product.id}) for image_data in product_images
-        ]
-        image_serializer = ProductImageSerializer(data=product_images, many=True)
-        if image_serializer.is_valid():
-            image_serializer.save()
-        else:
-            return None, image_serializer.errors
-
-    # Check for low stock after product update
-    check_and_send_low_stock_notification(product)
+        with StreamingUploadedFileHandler() as fhandler:
+            product_images = [
+                {"image": fhandler.from_path(image_data.get("image"))}
+                for image_data in product_images
+                if isinstance(image_data.get("image"), str)
+            ]
+            for image_data in product_images:
+                image_data["product"] = product.id
+            image_serializer = ProductImageSerializer(data=product_images, many=True)
+            if image_serializer.is_valid():
+                image_serializer.save()
+            else:
+                return None, image_serializer.errors
 
     return product, None
 
@@ -0,0 +1,107 @@
+import hashlib, os
+from collections import Counter
+
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.utils.general import PathUploadedFile
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that names every file after the SHA-256 of its
+    content, e.g. venella/products/images/3f/3fa9...c1.png.
+
+    Saving bytes that are already stored returns the existing name without
+    writing anything, so a packshot shared by many products is kept once.
+    Which stored files are still in use is tracked by the ImageBlob
+    reference counts (see `retain_blobs`/`release_blobs`) and files nobody
+    references are removed by the collect_image_blobs command.
+    """
+
+    def _save(self, name, content):
+        sha256 = hashlib.sha256()
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        digest = sha256.hexdigest()
+        content.seek(0)
+
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        name = os.path.join(directory, digest[:2], f"{digest}{extension}")
+        if self.claim_existing(name):
+            return name
+        if isinstance(content, PathUploadedFile):
+            # FileSystemStorage moves anything with a temporary_file_path()
+            # into place; this path is the caller's file, so copy it instead.
+            content = File(content.file, content.name)
+        return super()._save(name, content)
+
+    def claim_existing(self, name) -> bool:
+        """
+        Keep an already stored file from being collected until the upload
+        reusing it has retained it. Returns False when the file has to be
+        written, e.g. because collect_image_blobs deleted it meanwhile.
+        """
+        from products.models import ImageBlob
+
+        with transaction.atomic():
+            # Waits for a collector holding the row; once it commits, the row
+            # and its file are gone and the file is written again.
+            blob = ImageBlob.objects.select_for_update().filter(name=name).first()
+            if blob:
+                ImageBlob.objects.filter(pk=blob.pk).update(updated_at=timezone.now())
+            if not self.exists(name):
+                return False
+            if not blob:
+                # A stored file nobody recorded; record it so the collector
+                # leaves it alone for the grace period.
+                ImageBlob.objects.bulk_create(
+                    [ImageBlob(name=name, ref_count=0)], ignore_conflicts=True
+                )
+            return True
+
+
+image_storage = ContentAddressedStorage()
+
+
+def get_image_storage():
+    return image_storage
+
+
+def retain_blobs(names):
+    """Add one reference to every stored file in `names`."""
+    from products.models import ImageBlob
+
+    counts = Counter(name for name in names if name)
+    if not counts:
+        return
+    ImageBlob.objects.bulk_create(
+        [ImageBlob(name=name, ref_count=0) for name in counts], ignore_conflicts=True
+    )
+    _adjust(counts, 1)
+
+
+def release_blobs(names):
+    """Drop one reference from every stored file in `names`."""
+    counts = Counter(name for name in names if name)
+    _adjust(counts, -1)
+
+
+def _adjust(counts: Counter, sign: int):
+    from products.models import ImageBlob
+
+    # One UPDATE per distinct reference count, which is usually just one.
+    # update() skips auto_now, and collect_image_blobs measures its grace
+    # period from updated_at, so set it here.
+    now = timezone.now()
+    by_count = {}
+    for name, count in counts.items():
+        by_count.setdefault(count, []).append(name)
+    for count, names in by_count.items():
+        ImageBlob.objects.filter(name__in=names).update(
+            ref_count=F("ref_count") + sign * count, updated_at=now
+        )
@@ -1,3 +1,840 @@
-from django.test import TestCase
+import base64, json, os, shutil, tempfile, threading, time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from core.models.accounts import UserAccount
+from core.utils.general import PathUploadedFile, StreamingUploadedFileHandler
+from core.utils.testing import authenticated_client
+from jobs.services import run_due_jobs
+from notifications.models import SalesPersonNotification
+from products import search
+from products.alerts import AlertBatch
+from products.cache import cached_catalog_payload, catalog_cache_stats, catalog_version
+from products.images import generate_image_variants
+from products.facets import rebuild_facet_counts
+from products.models import (
+    ImageBlob,
+    Product,
+    ProductCategory,
+    ProductFacetCount,
+    ProductImage,
+    ProductStockAlert,
+    StockMovement,
+)
+from products.ledger import compact_stock_movements
+from products.serializers import ProductImageSerializer
+from products.services import decrement_stock, update_product
+from products.storage import image_storage
+
+
+def create_catalog(size: int, images_per_product: int = 2):
+    category = ProductCategory.objects.create(name="Pain Relief")
+    for index in range(size):
+        product = Product.objects.create(
+            name=f"Paracetamol {index}",
+            brand="Venella",
+            description="500mg tablets",
+            price="12.50",
+            stock=100,
+            category=category,
+        )
+        ProductImage.objects.bulk_create(
+            [
+                ProductImage(product=product, image=f"venella/products/images/{index}-{n}.png")
+                for n in range(images_per_product)
+            ]
+        )
+
+
+class ProductListingQueryCountTest(TestCase):
+    """Listing and searching products must not issue queries per product."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def assertConstantQueries(self, url, expected):
+        for size in (1, 25):
+            ProductImage.objects.all().delete()
+            Product.objects.all().delete()
+            ProductCategory.objects.all().delete()
+            create_catalog(size)
+            search.index.build(search.index_rows())
+            cache.clear()
+            with self.assertNumQueries(expected):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_list_products_query_count_is_constant(self):
+        self.assertConstantQueries("/api/products/", 2)
+
+    def test_search_products_query_count_is_constant(self):
+        self.assertConstantQueries("/api/products/search/?query=paracetamol", 2)
+
+
+class ProductPaginationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        create_catalog(10, images_per_product=1)
+        # Duplicate names make sure ties are broken by id.
+        Product.objects.filter(name__in=["Paracetamol 3", "Paracetamol 4"]).update(
+            name="Paracetamol"
+        )
+        self.expected = list(
+            Product.objects.order_by("name", "id").values_list("id", flat=True)
+        )
+
+    def test_cursor_walks_every_product_once_in_order(self):
+        seen, url = [], "/api/products/?page_size=3"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data["results"]), 3)
+            seen += [product["id"] for product in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(seen, [str(pk) for pk in self.expected])
+
+    def test_previous_cursor_returns_preceding_page(self):
+        first = self.client.get("/api/products/?page_size=4").data
+        second = self.client.get(first["next"]).data
+        back = self.client.get(second["previous"]).data
+        self.assertEqual(back["results"], first["results"])
+
+    def test_page_size_is_capped(self):
+        with self.settings(MAX_PAGE_SIZE=5):
+            response = self.client.get("/api/products/?page_size=1000")
+        self.assertEqual(len(response.data["results"]), 5)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get("/api/products/?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 404)
+
+        for cursor in [
+            {"p": ["Paracetamol", str(self.expected[0])]},
+            {"p": ["Paracetamol", 7], "r": 0},
+            {"p": [["Paracetamol"], {}], "r": 0},
+            {"p": ["Paracetamol", "not-a-uuid"], "r": 0},
+            ["Paracetamol"],
+        ]:
+            encoded = base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+            response = self.client.get("/api/products/", {"cursor": encoded})
+            self.assertEqual(response.status_code, 404, cursor)
+
+
+class ProductFacetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.analgesics = ProductCategory.objects.create(name="Analgesics")
+        self.vitamins = ProductCategory.objects.create(name="Vitamins")
+        for name, brand, price, stock, category in [
+            ("Paracetamol", "Panadol", "5.00", 20, self.analgesics),
+            ("Ibuprofen", "Nurofen", "18.00", 0, self.analgesics),
+            ("Aspirin", None, "8.00", 4, self.analgesics),
+            ("Vitamin C", "Panadol", "30.00", 50, self.vitamins),
+        ]:
+            Product.objects.create(
+                name=name,
+                brand=brand,
+                description="",
+                price=price,
+                stock=stock,
+                category=category,
+            )
+
+    def counts(self, facet):
+        return {
+            value: count
+            for value, count in ProductFacetCount.objects.filter(
+                facet=facet, count__gt=0
+            ).values_list("value", "count")
+        }
+
+    def test_counts_follow_product_writes(self):
+        self.assertEqual(self.counts("price"), {"0-10": 2, "10-25": 1, "25-50": 1})
+        self.assertEqual(self.counts("availability"), {"in_stock": 3, "out_of_stock": 1})
+
+        product = Product.objects.get(name="Ibuprofen")
+        product.stock = 12
+        product.category = self.vitamins
+        product.save()
+        self.assertEqual(self.counts("availability"), {"in_stock": 4})
+        self.assertEqual(
+            self.counts("category"),
+            {str(self.analgesics.id): 2, str(self.vitamins.id): 2},
+        )
+
+        Product.objects.get(name="Vitamin C").delete()
+        self.assertEqual(self.counts("brand"), {"Panadol": 1, "Nurofen": 1, "": 1})
+
+        expected = sorted(
+            ProductFacetCount.objects.filter(count__gt=0).values_list(
+                "facet", "value", "count"
+            )
+        )
+        rebuild_facet_counts()
+        self.assertEqual(
+            sorted(
+                ProductFacetCount.objects.filter(count__gt=0).values_list(
+                    "facet", "value", "count"
+                )
+            ),
+            expected,
+        )
+
+    def test_filter_combines_facets(self):
+        # Page, images, facet counts and category names; nothing is grouped.
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                f"/api/products/filter/?category={self.analgesics.id}"
+                "&price=0-10&price=10-25&availability=in_stock"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [product["name"] for product in response.data["results"]],
+            ["Aspirin", "Paracetamol"],
+        )
+        brands = {item["value"]: item["count"] for item in response.data["facets"]["brand"]}
+        self.assertEqual(brands, {"": 1, "Nurofen": 1, "Panadol": 2})
+
+    def test_brands_are_counted_and_filtered_alike(self):
+        Product.objects.create(
+            name="Panadol Extra",
+            brand=" Panadol ",
+            description="",
+            price="9.00",
+            stock=5,
+            category=self.analgesics,
+        )
+        self.assertEqual(self.counts("brand")["Panadol"], 3)
+        response = self.client.get("/api/products/filter/?brand=Panadol")
+        self.assertEqual(len(response.data["results"]), 3)
+
+    def test_unknown_facet_value_is_rejected(self):
+        response = self.client.get("/api/products/filter/?price=1-2")
+        self.assertEqual(response.status_code, 400)
+
+
+class LowStockAlertTest(TestCase):
+    def setUp(self):
+        self.category = ProductCategory.objects.create(name="Analgesics")
+
+    def create_product(self, name, stock):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Product.objects.create(
+                name=name,
+                description="",
+                price="5.00",
+                stock=stock,
+                category=self.category,
+            )
+
+    def set_stock(self, product, stock):
+        with self.captureOnCommitCallbacks(execute=True):
+            product.stock = stock
+            product.save()
+
+    def alerts(self):
+        run_due_jobs()
+        return SalesPersonNotification.objects.filter(type="PRODUCT_STOCK_ALERT").count()
+
+    def test_alerts_only_when_stock_crosses_threshold(self):
+        product = self.create_product("Paracetamol", 20)
+        self.set_stock(product, 11)
+        self.assertEqual(self.alerts(), 0)
+        self.set_stock(product, 10)
+        self.assertEqual(self.alerts(), 1)
+        self.set_stock(product, 3)
+        self.assertEqual(self.alerts(), 1)
+
+    def test_repeat_alerts_are_suppressed_within_window(self):
+        product = self.create_product("Paracetamol", 20)
+        self.set_stock(product, 5)
+        self.set_stock(product, 50)
+        self.set_stock(product, 5)
+        self.assertEqual(self.alerts(), 1)
+
+        ProductStockAlert.objects.update(
+            alerted_at=timezone.now() - timedelta(hours=25)
+        )
+        self.set_stock(product, 50)
+        self.set_stock(product, 5)
+        self.assertEqual(self.alerts(), 2)
+
+    def test_alerts_of_one_transaction_are_sent_together(self):
+        products = [self.create_product(f"Product {n}", 20) for n in range(3)]
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                for product in products:
+                    for stock in (8, 6):
+                        product.stock = stock
+                        product.save()
+        self.assertEqual(self.alerts(), 3)
+        self.assertEqual(len({id(c) for c in callbacks if isinstance(c, AlertBatch)}), 1)
+
+        products = [self.create_product(f"Product {n}", 20) for n in range(3, 6)]
+        with self.settings(LOW_STOCK_ALERT_DIGEST_SIZE=2):
+            with self.captureOnCommitCallbacks(execute=True):
+                for product in products:
+                    product.stock = 1
+                    product.save()
+            self.assertEqual(self.alerts(), 4)
+        self.assertIn(
+            "3 products are running low",
+            SalesPersonNotification.objects.latest("created_at").content,
+        )
+
+    def test_rolled_back_stock_changes_do_not_alert(self):
+        kept, reverted = [self.create_product(name, 20) for name in ("Aspirin", "Zinc")]
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    reverted.stock = 2
+                    reverted.save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            kept.stock = 2
+            kept.save()
+        self.assertEqual(self.alerts(), 1)
+        self.assertIn(
+            "Aspirin", SalesPersonNotification.objects.get(type="PRODUCT_STOCK_ALERT").content
+        )
+
+
+class ImportProductsTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.enterContext(override_settings(MEDIA_ROOT=self.directory))
+        self.analgesics = ProductCategory.objects.create(name="Analgesics")
+        Image.new("RGB", (100, 100), "white").save(
+            os.path.join(self.directory, "front.png"), format="PNG"
+        )
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def run_import(self, path):
+        stdout, stderr = StringIO(), StringIO()
+        with self.captureOnCommitCallbacks() as callbacks:
+            with CaptureQueriesContext(connection) as queries:
+                call_command(
+                    "import_products",
+                    path,
+                    images_dir=self.directory,
+                    stdout=stdout,
+                    stderr=stderr,
+                )
+        return callbacks, queries, stdout.getvalue(), stderr.getvalue()
+
+    def test_csv_rows_are_imported_in_one_batch(self):
+        path = self.write(
+            "products.csv",
+            "name,brand,description,price,stock,category,images\n"
+            "Paracetamol,Venella,500mg,5.00,20,Analgesics,front.png\n"
+            "Ibuprofen,Venella,200mg,5.00,20,analgesics,\n"
+            "Aspirin,Venella,75mg,5.00,2, Analgesics ,\n"
+            "Diclofenac,Venella,50mg,abc,20,Analgesics,\n"
+            "Naproxen,Venella,,5.00,20,Analgesics,\n"
+            "Codeine,Venella,30mg,5.00,20,Analgesics,missing.png\n",
+        )
+        callbacks, queries, stdout, stderr = self.run_import(path)
+
+        self.assertIn("Imported 3 products (3 skipped)", stdout)
+        self.assertIn(
+            "Line 5: price, stock and low_stock_threshold must be numbers", stderr
+        )
+        self.assertIn("Line 6: missing description", stderr)
+        self.assertIn("Line 7: image missing.png not found", stderr)
+
+        products = Product.objects.order_by("name")
+        self.assertEqual(
+            [product.name for product in products], ["Aspirin", "Ibuprofen", "Paracetamol"]
+        )
+        self.assertEqual({product.category_id for product in products}, {self.analgesics.id})
+        self.assertEqual(ProductCategory.objects.count(), 1)
+        self.assertEqual(ProductImage.objects.get().product.name, "Paracetamol")
+        self.assertEqual(
+            sorted(StockMovement.objects.values_list("quantity", flat=True)), [2, 20, 20]
+        )
+
+        # Every facet gained three products, so the counts take one UPDATE.
+        facet_updates = [
+            query
+            for query in queries.captured_queries
+            if query["sql"].startswith('UPDATE "products_productfacetcount"')
+        ]
+        self.assertEqual(len(facet_updates), 1)
+        batches = [callback for callback in callbacks if isinstance(callback, AlertBatch)]
+        self.assertTrue(all(batch is batches[0] for batch in batches))
+        self.assertEqual(
+            {pk for pk in batches[0] if Product.objects.filter(pk=pk).exists()},
+            {Product.objects.get(name="Aspirin").id},
+        )
+
+    def test_rows_the_model_would_refuse_are_skipped(self):
+        rows = [
+            {"name": "N" * 256, "price": 5},
+            {"brand": "B" * 256, "price": 5},
+            {"price": "NaN"},
+            {"price": "123456789012.50"},
+            {"name": 42, "price": 5},
+            {"category": "C" * 256, "price": 5},
+            {"price": [5]},
+            {"images": 7, "price": 5},
+        ]
+        path = self.write(
+            "products.ndjson",
+            "".join(
+                json.dumps(
+                    {"name": "Zinc", "description": "50mg", "stock": 3, "category": "Vitamins"}
+                    | row
+                )
+                + "\n"
+                for row in rows
+            ),
+        )
+        _, _, stdout, stderr = self.run_import(path)
+
+        self.assertIn(f"Imported 0 products ({len(rows)} skipped)", stdout)
+        for error in [
+            "Line 1: name: Ensure this value has at most 255 characters",
+            "Line 2: brand: Ensure this value has at most 255 characters",
+            "Line 3: price: ",
+            "Line 4: price: Ensure that there are no more than 10 digits in total.",
+            "Line 5: name must be text",
+            "Line 6: category: Ensure this value has at most 255 characters",
+            "Line 7: price, stock and low_stock_threshold must be numbers",
+            "Line 8: images must be file paths",
+        ]:
+            self.assertIn(error, stderr)
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(ProductCategory.objects.filter(name="Vitamins").exists())
+
+    def test_ndjson_rows_create_missing_categories_once(self):
+        path = self.write(
+            "products.ndjson",
+            '{"name": "Vitamin C", "description": "1000mg", "price": 30, '
+            '"stock": 50, "category": "Vitamins", "images": ["front.png"]}\n'
+            "\n"
+            '{"name": "Zinc", "description": "", "price": 12, "stock": 3}\n'
+            "{not json\n"
+            '{"name": "Vitamin D", "description": "1000IU", "price": "18.50", '
+            '"stock": 1, "category": "vitamins", "low_stock_threshold": 0}\n',
+        )
+        _, _, stdout, stderr = self.run_import(path)
+
+        self.assertIn("Imported 2 products (2 skipped)", stdout)
+        self.assertIn("Line 3: missing description, category", stderr)
+        self.assertIn("Line 4: ", stderr)
+        vitamins = ProductCategory.objects.get(name="Vitamins")
+        self.assertEqual(
+            sorted(Product.objects.filter(category=vitamins).values_list("name", flat=True)),
+            ["Vitamin C", "Vitamin D"],
+        )
+        self.assertEqual(Product.objects.get(name="Vitamin D").low_stock_threshold, 0)
+        self.assertEqual(ProductImage.objects.get().product.name, "Vitamin C")
+
+
+class StockLedgerTest(TestCase):
+    def setUp(self):
+        category = ProductCategory.objects.create(name="Analgesics")
+        self.product = Product.objects.create(
+            name="Paracetamol", description="", price="5.00", stock=10, category=category
+        )
+        self.admin = UserAccount.objects.create_user(email="admin@example.com", role="admin")
+
+    def movements(self):
+        return list(
+            StockMovement.objects.filter(product=self.product)
+            .order_by("created_at", "id")
+            .values_list("kind", "quantity")
+        )
+
+    def assertLedgerMatchesStock(self):
+        self.product.refresh_from_db()
+        self.assertEqual(sum(quantity for _, quantity in self.movements()), self.product.stock)
+
+    def test_stock_changes_are_recorded(self):
+        client = authenticated_client(self.admin)
+        url = f"/api/products/{self.product.id}/stock/"
+        response = client.post(url, {"quantity": 5, "kind": "RESTOCK"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        response = client.post(url, {"quantity": -20}, format="json")
+        self.assertEqual(response.status_code, 400)
+        update_product(self.product, {"stock": 12})
+
+        self.assertEqual(
+            self.movements(), [("RESTOCK", 10), ("RESTOCK", 5), ("ADJUSTMENT", -3)]
+        )
+        self.assertLedgerMatchesStock()
+
+        response = client.get(url)
+        self.assertEqual(
+            [movement["quantity"] for movement in response.data["results"]], [-3, 5, 10]
+        )
+        customer = UserAccount.objects.create_user(email="ama@example.com", role="customer")
+        self.assertEqual(authenticated_client(customer).get(url).status_code, 403)
+
+    def test_stock_is_not_edited_below_held_units(self):
+        Product.objects.filter(id=self.product.id).update(reserved=4)
+        product, errors = update_product(self.product, {"stock": 1})
+        self.assertIsNone(product)
+        self.assertIn("held for carts", errors[0])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 10)
+        self.assertEqual(self.movements(), [("RESTOCK", 10)])
+
+        product, errors = update_product(self.product, {"stock": 4})
+        self.assertIsNone(errors)
+        self.assertEqual(product.stock, 4)
+
+    def test_old_movements_are_compacted(self):
+        old = timezone.now() - timedelta(days=100)
+        StockMovement.objects.bulk_create(
+            [
+                StockMovement(product=self.product, kind="SALE", quantity=-1, created_at=old)
+                for _ in range(3)
+            ]
+        )
+        StockMovement.objects.filter(kind="RESTOCK").update(created_at=old - timedelta(days=1))
+        StockMovement.objects.create(product=self.product, kind="RESTOCK", quantity=2)
+        Product.objects.filter(id=self.product.id).update(stock=9)
+
+        output = StringIO()
+        call_command("compact_stock_movements", stdout=output)
+        self.assertIn("Compacted 4 stock movements", output.getvalue())
+        self.assertEqual(self.movements(), [("BALANCE", 7), ("RESTOCK", 2)])
+        self.assertLedgerMatchesStock()
+        self.assertEqual(compact_stock_movements(), 0)
+
+
+class ProductSearchTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.analgesics = ProductCategory.objects.create(name="Analgesics")
+        self.vitamins = ProductCategory.objects.create(name="Vitamins")
+        self.paracetamol = self.create_product(
+            "Paracetamol 500mg", "Panadol", "Relieves pain and fever", self.analgesics
+        )
+        self.ibuprofen = self.create_product(
+            "Ibuprofen 200mg", "Nurofen", "Anti-inflammatory pain relief", self.analgesics
+        )
+        self.vitamin_c = self.create_product(
+            "Vitamin C 1000mg", "Redoxon", "Immune support", self.vitamins
+        )
+        search.index.build(search.index_rows())
+
+    def create_product(self, name, brand, description, category):
+        return Product.objects.create(
+            name=name,
+            brand=brand,
+            description=description,
+            price="10.00",
+            stock=50,
+            category=category,
+        )
+
+    def search(self, query):
+        response = self.client.get("/api/products/search/", {"query": query})
+        self.assertEqual(response.status_code, 200)
+        return [product["id"] for product in response.data["results"]]
+
+    def test_matches_misspelled_names(self):
+        self.assertEqual(self.search("paracetmol")[0], str(self.paracetamol.id))
+
+    def test_matches_brand_description_and_category(self):
+        self.assertIn(str(self.ibuprofen.id), self.search("nurofen"))
+        self.assertIn(str(self.vitamin_c.id), self.search("immune"))
+        self.assertEqual(
+            set(self.search("analgesics")),
+            {str(self.paracetamol.id), str(self.ibuprofen.id)},
+        )
+
+    def test_name_matches_rank_above_description_matches(self):
+        aspirin = self.create_product(
+            "Aspirin", "Bayer", "Alternative to ibuprofen", self.analgesics
+        )
+        search.index.build(search.index_rows())
+        self.assertEqual(
+            self.search("ibuprofen"), [str(self.ibuprofen.id), str(aspirin.id)]
+        )
+
+    def test_index_follows_product_saves_and_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cetirizine = self.create_product(
+                "Cetirizine 10mg", "Zyrtec", "Allergy relief", self.analgesics
+            )
+        self.assertEqual(self.search("cetirizine"), [str(cetirizine.id)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.analgesics.name = "Antihistamines"
+            self.analgesics.save()
+        self.assertIn(str(cetirizine.id), self.search("antihistamines"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cetirizine.delete()
+        self.assertEqual(self.search("cetirizine"), [])
+
+
+class CatalogCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        create_catalog(3)
+        self.product = Product.objects.first()
+
+    def test_repeated_reads_are_served_from_cache(self):
+        product_url = f"/api/products/{self.product.id}/retrieve/"
+        first = self.client.get("/api/products/").data
+        self.client.get(product_url)
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/products/").data
+            self.client.get(product_url)
+        self.assertEqual(first, second)
+
+        stats = catalog_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 2))
+
+    def test_catalog_writes_invalidate_cached_responses(self):
+        self.client.get(f"/api/products/{self.product.id}/retrieve/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = "Paracetamol Extra"
+            self.product.save()
+        response = self.client.get(f"/api/products/{self.product.id}/retrieve/")
+        self.assertEqual(response.data["name"], "Paracetamol Extra")
+
+        self.client.get("/api/products/categories/")
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductCategory.objects.create(name="Vitamins")
+        response = self.client.get("/api/products/categories/")
+        self.assertIn("Vitamins", [category["name"] for category in response.data])
+
+    def test_only_stock_crossing_zero_invalidates_cached_responses(self):
+        Product.objects.filter(id=self.product.id).update(stock=2)
+        version = catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            decrement_stock({self.product.id: 1})
+        self.assertEqual(catalog_version(), version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            decrement_stock({self.product.id: 1})
+        self.assertGreater(catalog_version(), version)
+
+    def test_missing_products_are_not_cached(self):
+        response = self.client.get("/api/products/not-a-uuid/retrieve/")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(catalog_cache_stats()["misses"], 1)
+
+    def test_concurrent_misses_build_the_payload_once(self):
+        builds = []
+
+        def build():
+            builds.append(1)
+            time.sleep(0.1)
+            return {"built": True}
+
+        threads = [
+            threading.Thread(
+                target=cached_catalog_payload, args=("products", "page-1", build)
+            )
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(catalog_cache_stats()["coalesced"], 7)
+
+
+class ImageVariantTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+
+    def upload(self, size):
+        buffer = BytesIO()
+        Image.new("RGB", size, "white").save(buffer, format="PNG")
+        return SimpleUploadedFile("packshot.png", buffer.getvalue(), "image/png")
+
+    def test_variants_are_rendered_after_commit(self):
+        category = ProductCategory.objects.create(name="Analgesics")
+        product = Product.objects.create(
+            name="Paracetamol",
+            description="500mg",
+            price="5.00",
+            stock=20,
+            category=category,
+        )
+        with self.captureOnCommitCallbacks() as callbacks:
+            image = ProductImage.objects.create(
+                product=product, image=self.upload((2400, 1600))
+            )
+        image.refresh_from_db()
+        self.assertFalse(image.thumbnail)
+        self.assertTrue(callbacks)
+
+        generate_image_variants(image.pk)
+        image.refresh_from_db()
+        with Image.open(image.thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.size, (200, 133))
+        with Image.open(image.medium.path) as medium:
+            self.assertEqual(medium.size, (800, 533))
+        with Image.open(image.webp.path) as webp:
+            self.assertEqual(webp.format, "WEBP")
+
+
+class ContentAddressedImageTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+        category = ProductCategory.objects.create(name="Analgesics")
+        self.products = [
+            Product.objects.create(
+                name=f"Paracetamol {index}",
+                description="500mg",
+                price="5.00",
+                stock=20,
+                category=category,
+            )
+            for index in range(2)
+        ]
+
+    def upload(self, name):
+        buffer = BytesIO()
+        Image.new("RGB", (400, 400), "white").save(buffer, format="PNG")
+        return SimpleUploadedFile(name, buffer.getvalue(), "image/png")
+
+    def test_identical_uploads_share_one_file(self):
+        first, second = [
+            ProductImage.objects.create(product=product, image=self.upload(name))
+            for product, name in zip(self.products, ["front.png", "packshot.png"])
+        ]
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(ImageBlob.objects.get(name=first.image.name).ref_count, 2)
+
+        generate_image_variants(first.pk)
+        generate_image_variants(second.pk)
+        second.refresh_from_db()
+        self.assertTrue(second.thumbnail)
+        self.assertEqual(ImageBlob.objects.get(name=second.thumbnail.name).ref_count, 2)
+
+    def test_unreferenced_files_are_collected(self):
+        images = [
+            ProductImage.objects.create(product=product, image=self.upload("front.png"))
+            for product in self.products
+        ]
+        name = images[0].image.name
+
+        images[0].delete()
+        call_command("collect_image_blobs", grace_hours=0, stdout=StringIO())
+        self.assertTrue(image_storage.exists(name))
+        self.assertEqual(ImageBlob.objects.get(name=name).ref_count, 1)
+
+        images[1].product.delete()
+        call_command("collect_image_blobs", grace_hours=0, stdout=StringIO())
+        self.assertFalse(image_storage.exists(name))
+        self.assertFalse(ImageBlob.objects.filter(name=name).exists())
+
+    def test_recently_released_files_are_kept_for_the_grace_period(self):
+        image = ProductImage.objects.create(
+            product=self.products[0], image=self.upload("front.png")
+        )
+        name = image.image.name
+        ImageBlob.objects.filter(name=name).update(
+            updated_at=timezone.now() - timedelta(days=2)
+        )
+
+        image.delete()
+        call_command("collect_image_blobs", grace_hours=24, stdout=StringIO())
+        self.assertTrue(image_storage.exists(name))
+
+        ImageBlob.objects.filter(name=name).update(
+            updated_at=timezone.now() - timedelta(hours=25)
+        )
+        call_command("collect_image_blobs", grace_hours=24, stdout=StringIO())
+        self.assertFalse(image_storage.exists(name))
+
+    def test_reused_files_are_not_collected_before_they_are_retained(self):
+        image = ProductImage.objects.create(
+            product=self.products[0], image=self.upload("front.png")
+        )
+        name = image.image.name
+        image.delete()
+        ImageBlob.objects.filter(name=name).update(
+            updated_at=timezone.now() - timedelta(days=2)
+        )
+
+        # The upload's file is saved before its ProductImage row retains it.
+        stored = image_storage.save("venella/products/images/a.png", self.upload("a.png"))
+        self.assertEqual(stored, name)
+        call_command("collect_image_blobs", grace_hours=24, stdout=StringIO())
+        self.assertTrue(image_storage.exists(name))
+
+    def test_files_deleted_by_the_collector_are_written_again(self):
+        image = ProductImage.objects.create(
+            product=self.products[0], image=self.upload("front.png")
+        )
+        name = image.image.name
+        image.delete()
+        call_command("collect_image_blobs", grace_hours=0, stdout=StringIO())
+        self.assertFalse(image_storage.exists(name))
+
+        image = ProductImage.objects.create(
+            product=self.products[0], image=self.upload("front.png")
+        )
+        self.assertEqual(image.image.name, name)
+        self.assertTrue(image_storage.exists(name))
+        self.assertEqual(ImageBlob.objects.get(name=name).ref_count, 1)
+
+    def test_replacing_an_image_moves_its_reference(self):
+        image = ProductImage.objects.create(
+            product=self.products[0], image=self.upload("front.png")
+        )
+        old_name = image.image.name
+        buffer = BytesIO()
+        Image.new("RGB", (400, 400), "black").save(buffer, format="PNG")
+        image.image = SimpleUploadedFile("back.png", buffer.getvalue(), "image/png")
+        image.save()
+
+        self.assertEqual(ImageBlob.objects.get(name=old_name).ref_count, 0)
+        self.assertEqual(ImageBlob.objects.get(name=image.image.name).ref_count, 1)
+        image.save()
+        self.assertEqual(ImageBlob.objects.get(name=image.image.name).ref_count, 1)
+
+    def test_images_on_disk_are_validated_by_path_and_copied(self):
+        path = os.path.join(self.media_root, "scan.png")
+        Image.new("RGB", (400, 400), "white").save(path, format="PNG")
+
+        with StreamingUploadedFileHandler() as fhandler:
+            serializer = ProductImageSerializer(
+                data={"image": fhandler.from_path(path), "product": self.products[0].id}
+            )
+            with mock.patch.object(
+                PathUploadedFile, "read", side_effect=AssertionError("read into memory")
+            ):
+                self.assertTrue(serializer.is_valid(), serializer.errors)
+            image = serializer.save()
+
+        self.assertTrue(image_storage.exists(image.image.name))
+        # The source belongs to the caller and is left where it was.
+        self.assertTrue(os.path.exists(path))
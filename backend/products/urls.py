@@ -12,6 +12,14 @@ urlpatterns = [
     path(
         "<str:product_id>/delete/", ProductViewSet.as_view({"delete": "delete_product"})
     ),
+    path(
+        "<str:product_id>/stock/",
+        ProductViewSet.as_view({"get": "list_stock_movements", "post": "adjust_stock"}),
+    ),
+    path(
+        "filter/",
+        ProductViewSet.as_view({"get": "filter_products"}),
+    ),
     path(
         "search/",
         ProductViewSet.as_view({"get": "search_products"}),
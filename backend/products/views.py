@@ -2,7 +2,11 @@ from rest_framework import viewsets, status, parsers
 from rest_framework.response import Response
 from products.selectors import *
 from products.services import *
-from core.utils.general import get_user_from_jwttoken
+from products.cache import cached_catalog_payload, request_key
+from products.serializers import StockMovementSerializer
+from products.facets import apply_product_filters, get_facet_counts
+from core.utils.general import get_user_from_jwttoken, valid_uuid
+from core.utils.pagination import KeysetPagination, RankedPagination
 from documentations.products import *
 
 
@@ -15,19 +19,50 @@ class ProductViewSet(viewsets.ViewSet):
 
     @list_products_schema
     def list_products(self, request):
-        products = get_all_products()
-        context = product_info(products, many=True)
+        def build():
+            paginator = KeysetPagination(ordering=("name", "id"))
+            products = paginator.paginate_queryset(
+                get_all_products(), request, view=self
+            )
+            context = product_info(products, many=True)
+            return paginator.get_paginated_response(context).data
+
+        context = cached_catalog_payload("products", request_key(request), build)
+        return Response(context, status=status.HTTP_200_OK)
+
+    @filter_products_schema
+    def filter_products(self, request):
+        products, errors = apply_product_filters(get_all_products(), request.query_params)
+        if errors:
+            return Response(
+                {"detail": "Invalid filter", "errors": errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        def build():
+            paginator = KeysetPagination(ordering=("name", "id"))
+            page = paginator.paginate_queryset(products, request, view=self)
+            context = paginator.get_paginated_response(
+                product_info(page, many=True)
+            ).data
+            context["facets"] = get_facet_counts()
+            return context
+
+        context = cached_catalog_payload("filter", request_key(request), build)
         return Response(context, status=status.HTTP_200_OK)
 
     @retrieve_product_schema
     def retrieve_product(self, request, product_id):
-        product = get_product_by_id(product_id)
-        if not product:
+        def build():
+            product = get_product_by_id(product_id) if valid_uuid(product_id) else None
+            return product_info(product) if product else None
+
+        context = cached_catalog_payload("product", product_id, build)
+        if context is None:
             return Response(
                 {"detail": "Product not found"},
                 status=status.HTTP_404_NOT_FOUND,
             )
-        context = product_info(product)
         return Response(context, status=status.HTTP_200_OK)
 
     @create_products_schema
@@ -98,6 +133,62 @@ class ProductViewSet(viewsets.ViewSet):
             status=status.HTTP_204_NO_CONTENT,
         )
 
+    @list_stock_movements_schema
+    def list_stock_movements(self, request, product_id):
+        user = get_user_from_jwttoken(request)
+        if not user or user.role == "customer":
+            return Response(
+                {"error": "You do not have permission to view stock movements."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        product = get_product_by_id(product_id) if valid_uuid(product_id) else None
+        if not product:
+            return Response(
+                {"detail": "Product not found"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        paginator = KeysetPagination(ordering=("-created_at", "-id"))
+        movements = paginator.paginate_queryset(
+            get_stock_movements(product.id), request, view=self
+        )
+        context = StockMovementSerializer(movements, many=True).data
+        return paginator.get_paginated_response(context)
+
+    @adjust_stock_schema
+    def adjust_stock(self, request, product_id):
+        user = get_user_from_jwttoken(request)
+        if not user or user.role != "admin":
+            return Response(
+                {"error": "You do not have permission to change stock."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        if not valid_uuid(product_id):
+            return Response(
+                {"detail": "Product not found"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        data = request.data
+        try:
+            quantity = int(data.get("quantity"))
+        except (TypeError, ValueError):
+            return Response(
+                {"detail": "Quantity must be a non-zero whole number."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        movement, errors = adjust_stock(
+            product_id, quantity, data.get("kind") or "ADJUSTMENT", data.get("note") or ""
+        )
+        if not movement:
+            return Response(
+                {"detail": "Could not change stock", "errors": errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        context = StockMovementSerializer(movement).data
+        return Response(context, status=status.HTTP_201_CREATED)
+
     @search_products_schema
     def search_products(self, request):
         query = request.query_params.get("query", "")
@@ -106,16 +197,22 @@ class ProductViewSet(viewsets.ViewSet):
                 {"detail": "Query parameter is required"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        filtered_products = get_search_products(query)
-        context = product_info(filtered_products, many=True)
-        return Response(context, status=status.HTTP_200_OK)
+        paginator = RankedPagination()
+        product_ids = paginator.paginate_queryset(
+            get_search_products(query), request, view=self
+        )
+        context = product_info(get_products_in_order(product_ids), many=True)
+        return paginator.get_paginated_response(context)
 
 
 class ProductCategoryViewSet(viewsets.ViewSet):
     @list_categories_schema
     def list_categories(self, request):
-        categories = get_all_categories()
-        context = category_representation(categories, many=True)
+        context = cached_catalog_payload(
+            "categories",
+            "all",
+            lambda: category_representation(get_all_categories(), many=True),
+        )
         return Response(context, status=status.HTTP_200_OK)
 
     @retrieve_category_schema
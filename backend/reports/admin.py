@@ -0,0 +1,6 @@
+from django.contrib import admin
+from reports.models import OrderRollup, SalesRollup
+
+# Register your models here.
+admin.site.register(OrderRollup)
+admin.site.register(SalesRollup)
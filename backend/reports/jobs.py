@@ -0,0 +1,7 @@
+from jobs.services import job
+from reports.services import update_sales_rollups
+
+
+@job("reports.update_sales_rollups")
+def update_sales_rollups_job(order_ids, sign=1):
+    update_sales_rollups(order_ids, sign)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from reports.services import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the sales rollups from the orders, for every day or for the "
+        "days from --start to --end. Run it with the job workers drained, as "
+        "rollup updates still queued would be applied on top of the rebuild."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="First day to rebuild (YYYY-MM-DD)")
+        parser.add_argument("--end", help="Last day to rebuild (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        days = {}
+        for name in ("start", "end"):
+            days[name] = options[name] and parse_date(options[name])
+            if options[name] and not days[name]:
+                raise CommandError(f"--{name} must be a date (YYYY-MM-DD).")
+
+        written = rebuild_sales_rollups(days["start"], days["end"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} rollup rows."))
@@ -0,0 +1,70 @@
+# Generated by Django 5.2 on 2026-10-18 12:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def rollup_existing_orders(apps, schema_editor):
+    from reports.services import TRUNCATE, order_totals, sales_totals
+
+    Order = apps.get_model("orders", "Order")
+    OrderItem = apps.get_model("orders", "OrderItem")
+    OrderRollup = apps.get_model("reports", "OrderRollup")
+    SalesRollup = apps.get_model("reports", "SalesRollup")
+
+    orders = Order.objects.filter(deleted_at__isnull=True).exclude(status="CANCELLED")
+    items = OrderItem.objects.filter(order__in=orders)
+    for grain in TRUNCATE:
+        OrderRollup.objects.bulk_create(
+            [OrderRollup(grain=grain, **row) for row in order_totals(orders, grain)],
+            batch_size=1000,
+        )
+        SalesRollup.objects.bulk_create(
+            [SalesRollup(grain=grain, **row) for row in sales_totals(items, grain)],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('orders', '0005_offline_sales'),
+        ('products', '0006_low_stock_alerts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grain', models.CharField(choices=[('HOUR', 'Hour'), ('DAY', 'Day')], max_length=4)),
+                ('period', models.DateTimeField()),
+                ('order_type', models.CharField(max_length=20)),
+                ('orders', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('grain', 'period', 'order_type'), name='order_rollup_key')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grain', models.CharField(choices=[('HOUR', 'Hour'), ('DAY', 'Day')], max_length=4)),
+                ('period', models.DateTimeField()),
+                ('order_type', models.CharField(max_length=20)),
+                ('orders', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.productcategory')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('grain', 'period', 'order_type', 'product'), name='sales_rollup_key')],
+            },
+        ),
+        migrations.RunPython(rollup_existing_orders, migrations.RunPython.noop),
+    ]
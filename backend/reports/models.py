@@ -0,0 +1,64 @@
+from django.db import models
+from products.models import Product, ProductCategory
+
+
+GRAIN_CHOICES = (
+    ("HOUR", "Hour"),
+    ("DAY", "Day"),
+)
+
+
+class OrderRollup(models.Model):
+    """
+    Number and value of the orders of one type placed in one hour or day,
+    leaving out cancelled and deleted orders. Kept up to date by
+    `reports.services.update_sales_rollups`.
+    """
+
+    grain = models.CharField(max_length=4, choices=GRAIN_CHOICES)
+    # Start of the hour or day, in TIME_ZONE.
+    period = models.DateTimeField()
+    order_type = models.CharField(max_length=20)
+    orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["grain", "period", "order_type"], name="order_rollup_key"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.order_type} orders of {self.period} ({self.grain})"
+
+
+class SalesRollup(models.Model):
+    """
+    Units and value of one product sold through one order type in one hour
+    or day, leaving out cancelled and deleted orders.
+    """
+
+    grain = models.CharField(max_length=4, choices=GRAIN_CHOICES)
+    period = models.DateTimeField()
+    order_type = models.CharField(max_length=20)
+    product = models.ForeignKey(Product, related_name="+", on_delete=models.CASCADE)
+    # The product's category, so category reports don't join products.
+    category = models.ForeignKey(
+        ProductCategory, null=True, related_name="+", on_delete=models.SET_NULL
+    )
+    # Orders the product was sold in.
+    orders = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["grain", "period", "order_type", "product"],
+                name="sales_rollup_key",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} sales of {self.period} ({self.grain})"
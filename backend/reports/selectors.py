@@ -0,0 +1,148 @@
+from datetime import timedelta
+
+from django.db.models import Sum
+from django.utils import timezone
+
+from core.utils.general import valid_uuid
+from orders.selectors import parse_moment
+from products.models import Product, ProductCategory
+from reports.models import OrderRollup, SalesRollup
+
+
+GRAINS = {"hour": "HOUR", "day": "DAY"}
+ORDER_TYPES = ("ONLINE", "OFFLINE")
+DEFAULT_RANGE = timedelta(days=30)
+MAX_LIMIT = 500
+
+
+def parse_report_params(params):
+    """
+    Read the grain, start, end, order_type, category and limit of a report
+    from query `params`. The range defaults to the last 30 days. Returns the
+    filters and a list of errors.
+    """
+    errors = []
+    filters = {"grain": GRAINS.get(params.get("grain", "day"))}
+    if not filters["grain"]:
+        errors.append(f"grain must be one of {', '.join(GRAINS)}.")
+
+    for name in ("start", "end"):
+        filters[name] = None
+        if value := params.get(name):
+            filters[name] = parse_moment(value)
+            if not filters[name]:
+                errors.append(f"{name} must be an ISO 8601 date or datetime.")
+    filters["end"] = filters["end"] or timezone.now()
+    filters["start"] = filters["start"] or filters["end"] - DEFAULT_RANGE
+
+    filters["order_type"] = params.get("order_type", "").upper() or None
+    if filters["order_type"] and filters["order_type"] not in ORDER_TYPES:
+        errors.append(f"order_type must be one of {', '.join(ORDER_TYPES)}.")
+
+    filters["category"] = params.get("category") or None
+    if filters["category"] and not valid_uuid(filters["category"]):
+        errors.append("category must be a category ID.")
+
+    try:
+        filters["limit"] = min(int(params.get("limit", 50)), MAX_LIMIT)
+    except ValueError:
+        errors.append("limit must be a number.")
+    else:
+        if filters["limit"] < 1:
+            errors.append("limit must be at least 1.")
+    return filters, errors
+
+
+def _rollups(model, filters):
+    rows = model.objects.filter(
+        grain=filters["grain"],
+        period__gte=filters["start"],
+        period__lt=filters["end"],
+    )
+    if filters["order_type"]:
+        rows = rows.filter(order_type=filters["order_type"])
+    return rows
+
+
+def get_sales_report(filters) -> list:
+    """Orders, revenue and units per period, with the split by order type."""
+    periods = {}
+    for row in _rollups(OrderRollup, filters).order_by("period", "order_type"):
+        period = periods.setdefault(
+            row.period,
+            {
+                "period": row.period,
+                "orders": 0,
+                "revenue": 0,
+                "units": 0,
+                "order_types": {},
+            },
+        )
+        period["orders"] += row.orders
+        period["revenue"] += row.revenue
+        period["order_types"][row.order_type] = {
+            "orders": row.orders,
+            "revenue": row.revenue,
+        }
+
+    units = (
+        _rollups(SalesRollup, filters)
+        .values("period")
+        .annotate(units=Sum("units"))
+        .order_by()
+    )
+    for row in units:
+        if row["period"] in periods:
+            periods[row["period"]]["units"] = row["units"]
+    return list(periods.values())
+
+
+def get_product_report(filters) -> list:
+    """Best selling products of the range, by revenue."""
+    rows = _rollups(SalesRollup, filters)
+    if filters["category"]:
+        rows = rows.filter(category_id=filters["category"])
+    rows = list(
+        rows.values("product_id")
+        .annotate(orders=Sum("orders"), units=Sum("units"), revenue=Sum("revenue"))
+        .order_by("-revenue", "product_id")[: filters["limit"]]
+    )
+    names = dict(
+        Product.objects.filter(id__in=[row["product_id"] for row in rows]).values_list(
+            "id", "name"
+        )
+    )
+    return [
+        {
+            "product": row["product_id"],
+            "name": names.get(row["product_id"]),
+            "orders": row["orders"],
+            "units": row["units"],
+            "revenue": row["revenue"],
+        }
+        for row in rows
+    ]
+
+
+def get_category_report(filters) -> list:
+    """Units and revenue per category over the range, by revenue."""
+    rows = list(
+        _rollups(SalesRollup, filters)
+        .values("category_id")
+        .annotate(units=Sum("units"), revenue=Sum("revenue"))
+        .order_by("-revenue", "category_id")[: filters["limit"]]
+    )
+    names = dict(
+        ProductCategory.objects.filter(
+            id__in=[row["category_id"] for row in rows if row["category_id"]]
+        ).values_list("id", "name")
+    )
+    return [
+        {
+            "category": row["category_id"],
+            "name": names.get(row["category_id"]),
+            "units": row["units"],
+            "revenue": row["revenue"],
+        }
+        for row in rows
+    ]
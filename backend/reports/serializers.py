@@ -0,0 +1,29 @@
+from rest_framework import serializers
+
+
+class OrderTypeTotalsSerializer(serializers.Serializer):
+    orders = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class SalesReportSerializer(serializers.Serializer):
+    period = serializers.DateTimeField()
+    orders = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    units = serializers.IntegerField()
+    order_types = serializers.DictField(child=OrderTypeTotalsSerializer())
+
+
+class ProductReportSerializer(serializers.Serializer):
+    product = serializers.UUIDField()
+    name = serializers.CharField(allow_null=True)
+    orders = serializers.IntegerField()
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class CategoryReportSerializer(serializers.Serializer):
+    category = serializers.UUIDField(allow_null=True)
+    name = serializers.CharField(allow_null=True)
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
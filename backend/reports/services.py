@@ -0,0 +1,156 @@
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from jobs.services import enqueue
+from orders.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from reports.models import OrderRollup, SalesRollup
+
+
+TRUNCATE = {"HOUR": TruncHour, "DAY": TruncDay}
+
+ORDER_KEY = ("period", "order_type")
+SALES_KEY = ("period", "order_type", "product_id")
+
+ITEMS = {Order: OrderItem, ArchivedOrder: ArchivedOrderItem}
+
+
+def order_totals(orders, grain: str):
+    return (
+        orders.annotate(period=TRUNCATE[grain]("created_at"))
+        .values("period", "order_type")
+        .annotate(orders=Count("id"), revenue=Sum("total_amount"))
+        .order_by()
+    )
+
+
+def sales_totals(items, grain: str):
+    return (
+        items.annotate(
+            period=TRUNCATE[grain]("order__created_at"),
+            order_type=F("order__order_type"),
+            category_id=F("product__category_id"),
+        )
+        .values("period", "order_type", "product_id", "category_id")
+        .annotate(
+            orders=Count("order_id", distinct=True),
+            units=Sum("quantity"),
+            revenue=Sum(
+                F("quantity") * F("amount"),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+        )
+        .order_by()
+    )
+
+
+def rollup_rows(grain: str, order_querysets) -> tuple:
+    """
+    The OrderRollup and SalesRollup rows of the orders in `order_querysets`
+    (of Order or ArchivedOrder, so that archived orders are counted too),
+    summed by key.
+    """
+    order_rows, sales_rows = {}, {}
+    for orders in order_querysets:
+        items = ITEMS[orders.model].objects.filter(order__in=orders)
+        for rows, key, totals in (
+            (order_rows, ORDER_KEY, order_totals(orders, grain)),
+            (sales_rows, SALES_KEY, sales_totals(items, grain)),
+        ):
+            for row in totals:
+                merged = rows.setdefault(tuple(row[field] for field in key), row)
+                if merged is not row:
+                    for name in ("orders", "units", "revenue"):
+                        if name in row:
+                            merged[name] += row[name]
+    return list(order_rows.values()), list(sales_rows.values())
+
+
+def queue_sales_rollup_update(order_ids, sign: int = 1):
+    """
+    Add the orders to the rollups (or, with sign=-1, take them out) from a
+    background job once the current transaction commits.
+    """
+    order_ids = [str(order_id) for order_id in order_ids]
+    if order_ids:
+        enqueue("reports.update_sales_rollups", {"order_ids": order_ids, "sign": sign})
+
+
+def update_sales_rollups(order_ids, sign: int = 1):
+    """
+    Add the sales of `order_ids` to every rollup they fall in, or take them
+    out again with sign=-1. Only the rows of the orders' hours and days are
+    written, so the cost depends on the orders, not on the history.
+    """
+    order_ids = list(order_ids)
+    # The orders may have been archived since the update was queued.
+    order_querysets = [
+        Order.all_objects.filter(id__in=order_ids),
+        ArchivedOrder.objects.filter(id__in=order_ids),
+    ]
+    with transaction.atomic():
+        for grain in TRUNCATE:
+            order_rows, sales_rows = rollup_rows(grain, order_querysets)
+            adjust_rollups(OrderRollup, ORDER_KEY, grain, order_rows, sign)
+            adjust_rollups(SalesRollup, SALES_KEY, grain, sales_rows, sign)
+
+
+def adjust_rollups(model, key: tuple, grain: str, rows, sign: int):
+    rows = list(rows)
+    measures = [
+        name for name in ("orders", "units", "revenue") if hasattr(model, name)
+    ]
+    model.objects.bulk_create(
+        [model(grain=grain, **{field: row[field] for field in key}) for row in rows],
+        ignore_conflicts=True,
+    )
+    for row in rows:
+        changes = {name: F(name) + sign * row[name] for name in measures}
+        if "category_id" in row:
+            changes["category_id"] = row["category_id"]
+        model.objects.filter(grain=grain, **{field: row[field] for field in key}).update(
+            **changes
+        )
+
+
+def rebuild_sales_rollups(start=None, end=None):
+    """
+    Recompute the rollups of the days from `start` up to `end` (dates, both
+    optional) from the orders. Returns the number of rows written.
+    """
+    order_querysets = [
+        Order.objects.exclude(status="CANCELLED"),
+        ArchivedOrder.objects.filter(deleted_at__isnull=True).exclude(status="CANCELLED"),
+    ]
+    rollups = [OrderRollup.objects.all(), SalesRollup.objects.all()]
+    if start:
+        start = timezone.make_aware(datetime.combine(start, time.min))
+        order_querysets = [orders.filter(created_at__gte=start) for orders in order_querysets]
+        rollups = [rows.filter(period__gte=start) for rows in rollups]
+    if end:
+        end = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
+        order_querysets = [orders.filter(created_at__lt=end) for orders in order_querysets]
+        rollups = [rows.filter(period__lt=end) for rows in rollups]
+
+    written = 0
+    with transaction.atomic():
+        for rows in rollups:
+            rows.delete()
+        for grain in TRUNCATE:
+            order_rows, sales_rows = rollup_rows(grain, order_querysets)
+            written += len(
+                OrderRollup.objects.bulk_create(
+                    [OrderRollup(grain=grain, **row) for row in order_rows],
+                    batch_size=1000,
+                )
+            )
+            written += len(
+                SalesRollup.objects.bulk_create(
+                    [SalesRollup(grain=grain, **row) for row in sales_rows],
+                    batch_size=1000,
+                )
+            )
+    return written
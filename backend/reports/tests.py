@@ -0,0 +1,156 @@
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.test import TestCase
+
+from core.models.accounts import UserAccount
+from core.utils.testing import authenticated_client
+from jobs.services import run_due_jobs
+from orders.models import Order, OrderItem
+from orders.selectors import get_in_store_customer_id
+from orders.services import delete_order, order_status_changed, sync_offline_sales
+from products.models import Product, ProductCategory
+from reports.models import OrderRollup, SalesRollup
+from reports.services import rebuild_sales_rollups
+
+
+def at(day, hour=9):
+    return f"2026-03-{day:02}T{hour:02}:15:00Z"
+
+
+class SalesRollupTest(TestCase):
+    def setUp(self):
+        get_in_store_customer_id.cache_clear()
+        self.in_store = UserAccount.objects.create_user(
+            email="customer@venella.com", role="customer"
+        )
+        self.manager = UserAccount.objects.create_user(
+            email="kofi@example.com", role="salesperson"
+        )
+        self.analgesics = ProductCategory.objects.create(name="Analgesics")
+        self.vitamins = ProductCategory.objects.create(name="Vitamins")
+        self.paracetamol, self.vitamin_c = Product.objects.bulk_create(
+            [
+                Product(name="Paracetamol", description="", price="5.00", stock=100, category=self.analgesics),
+                Product(name="Vitamin C", description="", price="20.00", stock=100, category=self.vitamins),
+            ]
+        )
+
+    def tearDown(self):
+        get_in_store_customer_id.cache_clear()
+
+    def sell(self, reference, sold_at, *lines):
+        with self.captureOnCommitCallbacks(execute=True):
+            results, _ = sync_offline_sales(
+                [
+                    {
+                        "client_reference": reference,
+                        "sold_at": sold_at,
+                        "products": [
+                            {"product": str(product.id), "quantity": quantity}
+                            for product, quantity in lines
+                        ],
+                    }
+                ]
+            )
+        run_due_jobs()
+        return Order.objects.get(id=results[0]["order"])
+
+    def online_order(self, created_at, product, quantity):
+        order = Order.objects.create(
+            customer=self.in_store,
+            total_amount=Decimal(product.price) * quantity,
+            shipping_address="Accra",
+            created_at=created_at,
+        )
+        OrderItem.objects.create(
+            order=order, product=product, quantity=quantity, amount=product.price
+        )
+        return order
+
+    def rollups(self):
+        return sorted(
+            SalesRollup.objects.values_list(
+                "grain", "period", "order_type", "product__name", "orders", "units", "revenue"
+            )
+        ) + sorted(
+            OrderRollup.objects.values_list("grain", "period", "order_type", "orders", "revenue")
+        )
+
+    def test_sales_are_rolled_up_as_orders_change(self):
+        first = self.sell("till/1", at(2), (self.paracetamol, 2), (self.vitamin_c, 1))
+        self.sell("till/2", at(2, 15), (self.paracetamol, 1))
+        day = datetime(2026, 3, 2, tzinfo=dt_timezone.utc)
+        paracetamol = SalesRollup.objects.get(grain="DAY", product=self.paracetamol)
+        self.assertEqual(
+            (paracetamol.period, paracetamol.orders, paracetamol.units, paracetamol.revenue),
+            (day, 2, 3, 15),
+        )
+        self.assertEqual(
+            SalesRollup.objects.filter(grain="HOUR", product=self.paracetamol).count(), 2
+        )
+        self.assertEqual(OrderRollup.objects.get(grain="DAY").revenue, 35)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.status = "CANCELLED"
+            first.save()
+            order_status_changed(first, "DELIVERED")
+        run_due_jobs()
+        paracetamol.refresh_from_db()
+        self.assertEqual((paracetamol.orders, paracetamol.units), (1, 1))
+        self.assertEqual(OrderRollup.objects.get(grain="DAY").orders, 1)
+
+        incremental = self.rollups()
+        rebuild_sales_rollups()
+        self.assertEqual(
+            [row for row in self.rollups() if row[-2]], [row for row in incremental if row[-2]]
+        )
+
+    def test_deleted_orders_are_taken_out(self):
+        order = self.sell("till/1", at(3), (self.vitamin_c, 2))
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_order(order)
+        run_due_jobs()
+        self.assertEqual(OrderRollup.objects.get(grain="DAY").orders, 0)
+
+    def test_reports_read_the_rollups(self):
+        self.sell("till/1", at(2), (self.paracetamol, 2))
+        self.sell("till/2", at(3), (self.vitamin_c, 1))
+        self.online_order(datetime(2026, 3, 3, 10, tzinfo=dt_timezone.utc), self.paracetamol, 4)
+        rebuild_sales_rollups()
+
+        client = authenticated_client(self.manager)
+        params = {"start": "2026-03-01", "end": "2026-03-04"}
+        with self.assertNumQueries(4):
+            response = client.get("/api/reports/sales/", params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row["period"][:10], row["orders"], row["revenue"], row["units"]) for row in response.data],
+            [("2026-03-02", 1, "10.00", 2), ("2026-03-03", 2, "40.00", 5)],
+        )
+        self.assertEqual(
+            response.data[1]["order_types"],
+            {
+                "OFFLINE": {"orders": 1, "revenue": "20.00"},
+                "ONLINE": {"orders": 1, "revenue": "20.00"},
+            },
+        )
+
+        response = client.get("/api/reports/products/", {**params, "order_type": "online"})
+        self.assertEqual(
+            [(row["name"], row["units"], row["revenue"]) for row in response.data],
+            [("Paracetamol", 4, "20.00")],
+        )
+        response = client.get("/api/reports/categories/", params)
+        self.assertEqual(
+            [(row["name"], row["units"]) for row in response.data],
+            [("Analgesics", 6), ("Vitamins", 1)],
+        )
+
+        response = client.get("/api/reports/sales/", {"grain": "week"})
+        self.assertEqual(response.status_code, 400)
+        for limit in ("-1", "0"):
+            response = client.get("/api/reports/products/", {"limit": limit})
+            self.assertEqual(response.status_code, 400)
+        response = authenticated_client(self.in_store).get("/api/reports/sales/")
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,8 @@
+from django.urls import path
+from reports.views import ReportViewSet
+
+urlpatterns = [
+    path("sales/", ReportViewSet.as_view({"get": "sales_report"})),
+    path("products/", ReportViewSet.as_view({"get": "product_report"})),
+    path("categories/", ReportViewSet.as_view({"get": "category_report"})),
+]
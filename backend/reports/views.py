@@ -0,0 +1,46 @@
+from rest_framework import viewsets, status
+from rest_framework.response import Response
+from core.utils.general import get_user_from_jwttoken
+from reports.selectors import *
+from reports.serializers import (
+    CategoryReportSerializer,
+    ProductReportSerializer,
+    SalesReportSerializer,
+)
+from documentations.reports import *
+
+
+class ReportViewSet(viewsets.ViewSet):
+    """Sales reports, read from the rollup tables only."""
+
+    def report(self, request, selector, serializer_class):
+        user = get_user_from_jwttoken(request)
+        if not user:
+            return Response(
+                {"detail": "Authentication credentials were not provided."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+        if user.role == "customer":
+            return Response(
+                {"detail": "You do not have permission to view reports."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        filters, errors = parse_report_params(request.query_params)
+        if errors:
+            return Response({"detail": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        context = serializer_class(selector(filters), many=True).data
+        return Response(context, status=status.HTTP_200_OK)
+
+    @sales_report_schema
+    def sales_report(self, request):
+        return self.report(request, get_sales_report, SalesReportSerializer)
+
+    @product_report_schema
+    def product_report(self, request):
+        return self.report(request, get_product_report, ProductReportSerializer)
+
+    @category_report_schema
+    def category_report(self, request):
+        return self.report(request, get_category_report, CategoryReportSerializer)
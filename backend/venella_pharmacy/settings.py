@@ -51,6 +51,8 @@ INSTALLED_APPS = [
     "carts.apps.CartsConfig",
     "notifications.apps.NotificationsConfig",
     "payments.apps.PaymentsConfig",
+    "jobs.apps.JobsConfig",
+    "reports.apps.ReportsConfig",
 ]
 
 REST_FRAMEWORK = {
@@ -116,6 +118,25 @@ WSGI_APPLICATION = "venella_pharmacy.wsgi.application"
 DATABASES = {"default": dj_database_url.config(default=config("DATABASE_URL"))}
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The catalog cache is invalidated by bumping a version key, so production
+# must use a backend shared by all workers (e.g. Redis or Memcached).
+
+CACHES = {
+    "default": {
+        "BACKEND": config(
+            "CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": config("CACHE_LOCATION", default="venella-pharmacy"),
+    }
+}
+
+CATALOG_CACHE_ALIAS = config("CATALOG_CACHE_ALIAS", default="default")
+CATALOG_CACHE_TIMEOUT = config("CATALOG_CACHE_TIMEOUT", default=3600, cast=int)
+CATALOG_CACHE_LOCK_TIMEOUT = config("CATALOG_CACHE_LOCK_TIMEOUT", default=10, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -155,6 +176,12 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Thumbnail/medium/WebP variants of product images are rendered after upload
+# by a pool of IMAGE_VARIANT_WORKERS threads, with at most
+# IMAGE_VARIANT_QUEUE_SIZE images waiting.
+IMAGE_VARIANT_WORKERS = config("IMAGE_VARIANT_WORKERS", default=2, cast=int)
+IMAGE_VARIANT_QUEUE_SIZE = config("IMAGE_VARIANT_QUEUE_SIZE", default=100, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -168,6 +195,67 @@ CORS_ALLOW_CREDENTIALS = True
 
 PHONENUMBER_DB_FORMAT = "INTERNATIONAL"
 
+# Cursor pagination used by the list endpoints; clients may ask for smaller
+# or larger pages with ?page_size= up to MAX_PAGE_SIZE.
+PAGE_SIZE = config("PAGE_SIZE", default=50, cast=int)
+MAX_PAGE_SIZE = config("MAX_PAGE_SIZE", default=200, cast=int)
+
+# Product search is served from an in-process trigram index; each worker
+# rebuilds its copy once it is older than the TTL (seconds) to pick up writes
+# made by other workers.
+PRODUCT_SEARCH_INDEX_TTL = config("PRODUCT_SEARCH_INDEX_TTL", default=300, cast=int)
+PRODUCT_SEARCH_MAX_RESULTS = config("PRODUCT_SEARCH_MAX_RESULTS", default=500, cast=int)
+
+# A product is alerted about again only once this many hours have passed
+# since its last low-stock alert. When more than LOW_STOCK_ALERT_DIGEST_SIZE
+# products go low together they are listed in a single notification.
+LOW_STOCK_ALERT_SUPPRESSION_HOURS = config(
+    "LOW_STOCK_ALERT_SUPPRESSION_HOURS", default=24, cast=int
+)
+LOW_STOCK_ALERT_DIGEST_SIZE = config("LOW_STOCK_ALERT_DIGEST_SIZE", default=20, cast=int)
+
+# Responses to requests sent with an Idempotency-Key header are replayed to
+# retries for IDEMPOTENCY_KEY_TTL_HOURS. A retry arriving while the original
+# is still running waits up to IDEMPOTENCY_WAIT_TIMEOUT seconds for it, and a
+# request that hasn't finished after IDEMPOTENCY_LOCK_TIMEOUT seconds is
+# presumed dead so its key can be used again.
+IDEMPOTENCY_KEY_TTL_HOURS = config("IDEMPOTENCY_KEY_TTL_HOURS", default=24, cast=int)
+IDEMPOTENCY_WAIT_TIMEOUT = config("IDEMPOTENCY_WAIT_TIMEOUT", default=10, cast=int)
+IDEMPOTENCY_LOCK_TIMEOUT = config("IDEMPOTENCY_LOCK_TIMEOUT", default=300, cast=int)
+
+# Delivered and cancelled orders are moved to the archive tables by
+# `manage.py archive_orders` once they are this many days old.
+ORDER_ARCHIVE_AFTER_DAYS = config("ORDER_ARCHIVE_AFTER_DAYS", default=365, cast=int)
+
+# Stock movements older than this many days are folded into one balance
+# movement per product by `manage.py compact_stock_movements`.
+STOCK_MOVEMENT_RETENTION_DAYS = config(
+    "STOCK_MOVEMENT_RETENTION_DAYS", default=90, cast=int
+)
+
+# How long units added to a cart are held for it. Lapsed holds are given
+# back by `manage.py release_expired_holds`.
+CART_HOLD_MINUTES = config("CART_HOLD_MINUTES", default=15, cast=int)
+
+# Most offline in-store sales a till can sync in one request.
+POS_SYNC_MAX_SALES = config("POS_SYNC_MAX_SALES", default=1000, cast=int)
+
+# Most orders whose status can be changed in one bulk request.
+ORDER_STATUS_BULK_MAX = config("ORDER_STATUS_BULK_MAX", default=500, cast=int)
+
+# Background jobs (`manage.py run_workers`). A failing job is retried after
+# JOB_RETRY_BACKOFF seconds, doubling with every attempt, until it has been
+# tried JOB_MAX_ATTEMPTS times. A job whose worker hasn't finished it after
+# JOB_LOCK_TIMEOUT seconds is presumed abandoned and run again. Finished jobs
+# are kept for JOB_RETENTION_HOURS. With JOBS_EAGER set, jobs run in the
+# process that queued them as soon as its transaction commits, which needs no
+# worker but puts their cost back on the request.
+JOBS_EAGER = config("JOBS_EAGER", default=False, cast=bool)
+JOB_MAX_ATTEMPTS = config("JOB_MAX_ATTEMPTS", default=5, cast=int)
+JOB_RETRY_BACKOFF = config("JOB_RETRY_BACKOFF", default=30, cast=int)
+JOB_LOCK_TIMEOUT = config("JOB_LOCK_TIMEOUT", default=600, cast=int)
+JOB_RETENTION_HOURS = config("JOB_RETENTION_HOURS", default=168, cast=int)
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Venella Pharmacy Project",
     "DESCRIPTION": "Venella Pharmacy Project API Documentation",
@@ -175,6 +263,9 @@ SPECTACULAR_SETTINGS = {
     "SERVE_INCLUDE_SCHEMA": False,
     "SERVE_URLCONF": "venella_pharmacy.urls",
     "COMPONENT_SPLIT_REQUEST": True,
+    "ENUM_NAME_OVERRIDES": {
+        "NewOrderStatusEnum": ["PENDING", "PROCESSING", "DELIVERED", "CANCELLED"],
+    },
     "SWAGGER_UI_SETTINGS": {
         # "deepLinking": True,
         "persistAuthorization": True,
@@ -33,6 +33,7 @@ urlpatterns = [
     path("api/carts/", include("carts.urls")),
     path("api/notifications/", include("notifications.urls")),
     path("api/payments/", include("payments.urls")),
+    path("api/reports/", include("reports.urls")),
     # documentation
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
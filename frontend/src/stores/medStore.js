@@ -64,8 +64,14 @@ export const useMedStore = defineStore('medStore', {
       const toast = useToast();
       this.isLoading = true;
       try {
-        const res = await axiosInstance.get('/api/products/')
-        this.products = res.data.filter(product => product.stock > 0)
+        const products = []
+        let url = '/api/products/'
+        while (url) {
+          const res = await axiosInstance.get(url)
+          products.push(...res.data.results)
+          url = res.data.next
+        }
+        this.products = products.filter(product => product.stock > 0)
       } catch (error) {
         toast.error('Error fetching products.');
       } finally {
@@ -83,7 +89,7 @@ export const useMedStore = defineStore('medStore', {
       }
       try {
         const res = await axiosInstance.get(`/api/products/search/?query=${encodeURIComponent(query)}`)
-        this.searchResults = res.data.filter(product => product.stock > 0)
+        this.searchResults = res.data.results.filter(product => product.stock > 0)
       } catch (error) {
         toast.error('Error searching products.');
         this.searchResults = [];